@@ -0,0 +1,163 @@
+"""
+Benchmark the git tool hot paths against locally generated repositories.
+
+    python -m benchmarks.bench_git --files 2000 --depth 500 --diff-files 50 \
+        --iterations 50 --concurrency 8 --output bench.json [--compare baseline.json]
+
+Nothing touches the network: clones come from a local bare repository.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.stats import compare, summarize
+from benchmarks.synthetic import RepoSpec, dirty, make_bare, make_repo
+from services.git_service import GitService
+
+BENCHMARKS = ("status", "diff", "commit", "clone", "tool_status", "tool_diff")
+
+
+def _timed(fn: Callable[[int], object], i: int) -> float:
+    t0 = time.perf_counter()
+    res = fn(i)
+    elapsed = time.perf_counter() - t0
+    if getattr(res, "ok", True) is False:
+        raise RuntimeError(f"benchmark call failed: {res}")
+    return elapsed
+
+
+def run_threads(fn: Callable[[int], object], iterations: int, concurrency: int) -> Tuple[List[float], float]:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda i: _timed(fn, i), range(iterations)))
+    return latencies, time.perf_counter() - t0
+
+
+def run_async(coro_fn, iterations: int, concurrency: int) -> Tuple[List[float], float]:
+    async def _main():
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with sem:
+                t0 = time.perf_counter()
+                res = await coro_fn(i)
+                elapsed = time.perf_counter() - t0
+                if not res.get("ok"):
+                    raise RuntimeError(f"benchmark call failed: {res}")
+                return elapsed
+
+        t0 = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in range(iterations)))
+        return list(latencies), time.perf_counter() - t0
+
+    return asyncio.run(_main())
+
+
+def run_benchmarks(spec: RepoSpec, iterations: int, concurrency: int, only=BENCHMARKS, workdir: str = "") -> Dict:
+    git = GitService()
+    root = workdir or tempfile.mkdtemp(prefix="git-mcp-bench-")
+    results: Dict[str, Dict] = {}
+    try:
+        repo = make_repo(os.path.join(root, "repo"), spec)
+        bare = make_bare(repo, os.path.join(root, "remote.git"))
+
+        if "status" in only:
+            results["status"] = summarize(*run_threads(lambda i: git.status(repo, 60), iterations, concurrency))
+
+        if "diff" in only:
+            results["diff"] = summarize(*run_threads(
+                lambda i: git.diff(repo, False, max_chars=200000, timeout_sec=60), iterations, concurrency))
+
+        if "commit" in only:
+            # commits serialize on index.lock, so measure them one at a time
+            latencies = []
+            t_wall = 0.0
+            for i in range(iterations):
+                dirty(repo, spec, salt=i + 1)
+                t0 = time.perf_counter()
+                res = git.commit(repo, f"bench {i}", 60)
+                dt = time.perf_counter() - t0
+                if not res.ok:
+                    raise RuntimeError(f"benchmark call failed: {res}")
+                latencies.append(dt)
+                t_wall += dt
+            results["commit"] = summarize(latencies, t_wall)
+            dirty(repo, spec, salt=0)
+
+        if "clone" in only:
+            clones = os.path.join(root, "clones")
+            results["clone"] = summarize(*run_threads(
+                lambda i: git.clone(bare, os.path.join(clones, str(i)), 300), iterations, concurrency))
+            shutil.rmtree(clones, ignore_errors=True)
+
+        tool_benchmarks = [b for b in ("tool_status", "tool_diff") if b in only]
+        if tool_benchmarks:
+            try:
+                import main
+            except ImportError as e:
+                results["tool_layer_skipped"] = {"reason": str(e)}
+            else:
+                if "tool_status" in tool_benchmarks:
+                    results["tool_status"] = summarize(*run_async(
+                        lambda i: main.git_status(repo, 60), iterations, concurrency))
+                if "tool_diff" in tool_benchmarks:
+                    results["tool_diff"] = summarize(*run_async(
+                        lambda i: main.git_diff(repo, max_chars=200000, timeout_sec=60), iterations, concurrency))
+    finally:
+        if not workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "iterations": iterations,
+            "concurrency": concurrency,
+            "spec": spec.__dict__,
+        },
+        "results": results,
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--files", type=int, default=RepoSpec.files)
+    p.add_argument("--depth", type=int, default=RepoSpec.depth, help="number of commits")
+    p.add_argument("--file-lines", type=int, default=RepoSpec.file_lines)
+    p.add_argument("--diff-files", type=int, default=RepoSpec.diff_files, help="dirty files in the working tree")
+    p.add_argument("--iterations", type=int, default=20)
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--only", default=",".join(BENCHMARKS), help="comma-separated subset of: " + ", ".join(BENCHMARKS))
+    p.add_argument("--output", default="", help="write JSON results here")
+    p.add_argument("--compare", default="", help="baseline JSON to compare against")
+    args = p.parse_args(argv)
+
+    spec = RepoSpec(files=args.files, depth=args.depth, file_lines=args.file_lines, diff_files=args.diff_files)
+    report = run_benchmarks(spec, args.iterations, args.concurrency, only=tuple(args.only.split(",")))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(json.load(f), report)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
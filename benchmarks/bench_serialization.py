@@ -0,0 +1,121 @@
+"""
+Measure per-call overhead of building and serializing tool results.
+
+    python -m benchmarks.bench_serialization --iterations 20000 [--output ser.json]
+
+Compares the current dataclass ToolResult/ErrorInfo (to_dict) against the
+previous pydantic models (model_dump), for a typical success payload and an
+error carrying a CmdResult, with and without the final json.dumps.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from benchmarks.stats import summarize
+from models.cmd_result import CmdResult
+from models.result import ErrorInfo, ToolResult
+
+
+class PydanticErrorInfo(BaseModel):
+    code: str
+    message: str
+    hint: Optional[str] = None
+    details: Dict[str, Any] = Field(default_factory=dict)
+
+
+class PydanticToolResult(BaseModel):
+    ok: bool
+    data: Dict[str, Any] = Field(default_factory=dict)
+    error: Optional[PydanticErrorInfo] = None
+
+
+CMD = CmdResult(
+    ok=False, cmd="git status --porcelain", cwd="/repo", code=128, elapsed_sec=0.004,
+    stdout="", stderr="fatal: not a git repository", stdout_truncated=False, stderr_truncated=False,
+)
+DATA = {
+    "repo_dir": "/repo",
+    "matches": [{"path": f"src/mod{i}.py", "line": i, "column": 5, "text": "def handler(request):"} for i in range(50)],
+    "count": 50,
+    "next_cursor": "50",
+}
+
+
+def _ok_dataclass() -> Dict[str, Any]:
+    return ToolResult(ok=True, data=DATA).to_dict()
+
+
+def _err_dataclass() -> Dict[str, Any]:
+    return ToolResult(ok=False, error=ErrorInfo(code="command_failed", message="git status failed.", details=CMD)).to_dict()
+
+
+def _ok_pydantic() -> Dict[str, Any]:
+    return PydanticToolResult(ok=True, data=DATA).model_dump()
+
+
+def _err_pydantic() -> Dict[str, Any]:
+    return PydanticToolResult(ok=False, error=PydanticErrorInfo(code="command_failed", message="git status failed.", details=CMD.to_dict())).model_dump()
+
+
+CASES: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "ok_dataclass": _ok_dataclass,
+    "ok_pydantic": _ok_pydantic,
+    "error_dataclass": _err_dataclass,
+    "error_pydantic": _err_pydantic,
+}
+
+
+def run(fn: Callable[[], Dict[str, Any]], iterations: int, to_json: bool) -> Dict[str, Any]:
+    latencies: List[float] = []
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        s = time.perf_counter()
+        out = fn()
+        if to_json:
+            json.dumps(out)
+        latencies.append(time.perf_counter() - s)
+    res = summarize(latencies, time.perf_counter() - t0)
+    res["mean_us"] = round(sum(latencies) / len(latencies) * 1e6, 2) if latencies else 0.0
+    return res
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--iterations", type=int, default=20000)
+    p.add_argument("--output", default="", help="write results as JSON to this file")
+    args = p.parse_args(argv)
+
+    results = {}
+    for name, fn in CASES.items():
+        fn()  # warm up
+        results[name] = run(fn, args.iterations, to_json=False)
+        results[f"{name}+json"] = run(fn, args.iterations, to_json=True)
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "iterations": args.iterations,
+        "results": results,
+        "speedup": {
+            case: round(results[f"{case}_pydantic"]["mean_us"] / results[f"{case}_dataclass"]["mean_us"], 2)
+            for case in ("ok", "error")
+            if results[f"{case}_dataclass"]["mean_us"]
+        },
+    }
+    out = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(out)
+    print(out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
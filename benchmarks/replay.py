@@ -0,0 +1,288 @@
+"""
+Replay recorded MCP tool traffic (CALL_RECORD_FILE) against a local server.
+
+    python -m benchmarks.replay calls.jsonl --concurrency 8 [--speed 1.0] \
+        [--mode inprocess|stdio|http --url http://127.0.0.1:8000/mcp] [--output replay.json]
+
+Every repository the log refers to (repo_dir, repo_dirs, repo_url) is mapped
+to a synthetic local repository, clone destinations to fresh temp directories,
+so nothing from the recorded hosts is needed and nothing touches the network.
+Tools that talk to remote services are skipped unless listed with --include.
+--speed 0 (default) issues calls as fast as --concurrency allows; --speed 1.0
+keeps the recorded inter-arrival times (2.0 replays twice as fast).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from benchmarks.stats import summarize
+from benchmarks.synthetic import RepoSpec, make_bare, make_repo
+
+# Tools that need a remote or an external service; replaying them would fail or have side effects.
+REMOTE_TOOLS = ("git_push", "git_push_multi", "git_fetch", "open_pr_to_base", "send_email")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Caller = Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+def load_calls(path: str) -> List[Dict[str, Any]]:
+    calls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                call = json.loads(line)
+            except ValueError:
+                continue
+            if call.get("tool") and isinstance(call.get("args"), dict):
+                calls.append(call)
+    return sorted(calls, key=lambda c: c.get("ts", 0))
+
+
+class RepoMapper:
+    """Recorded repository paths/URLs -> synthetic local repositories, created on first use."""
+
+    def __init__(self, root: str, spec: RepoSpec):
+        self.root = root
+        self.spec = spec
+        self._repos: Dict[str, str] = {}
+        self._bares: Dict[str, str] = {}
+        self._dests = 0
+
+    def repo(self, original: str) -> str:
+        if original not in self._repos:
+            self._repos[original] = make_repo(os.path.join(self.root, "repos", str(len(self._repos))), self.spec)
+        return self._repos[original]
+
+    def remote(self, original: str) -> str:
+        if original not in self._bares:
+            src = self.repo(original)
+            self._bares[original] = make_bare(src, os.path.join(self.root, "remotes", f"{len(self._bares)}.git"))
+        return self._bares[original]
+
+    def dest(self) -> str:
+        self._dests += 1
+        return os.path.join(self.root, "clones", str(self._dests))
+
+    def rewrite(self, args: Dict[str, Any], error_code: str = "") -> Dict[str, Any]:
+        out = dict(args)
+        if isinstance(out.get("repo_dir"), str):
+            # keep recorded "not a repo" calls failing the same way
+            out["repo_dir"] = os.path.join(self.root, "not-a-repo") if error_code == "not_a_git_repo" else self.repo(out["repo_dir"])
+        if isinstance(out.get("repo_dirs"), list):
+            out["repo_dirs"] = [self.repo(d) for d in out["repo_dirs"]]
+        if isinstance(out.get("repo_url"), str):
+            out["repo_url"] = self.remote(out["repo_url"])
+        if "dest_dir" in out:
+            out["dest_dir"] = self.dest()
+        # background jobs would finish after the measurement; replay them synchronously
+        if "background" in out:
+            out["background"] = False
+        return out
+
+
+def prepare(calls: List[Dict[str, Any]], mapper: RepoMapper, include: Tuple[str, ...] = ()) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """Rewrite arguments and drop remote-only tools; synthetic repos are built here, before timing starts."""
+    prepared, skipped = [], {}
+    for call in calls:
+        tool = call["tool"]
+        if tool in REMOTE_TOOLS and tool not in include:
+            skipped[tool] = skipped.get(tool, 0) + 1
+            continue
+        prepared.append({**call, "args": mapper.rewrite(call["args"], call.get("error_code") or "")})
+    return prepared, skipped
+
+
+async def replay(calls: List[Dict[str, Any]], call_tool: Caller, concurrency: int, speed: float = 0.0) -> Dict[str, Any]:
+    sem = asyncio.Semaphore(max(1, concurrency))
+    t_first = calls[0].get("ts", 0) if calls else 0
+    per_tool: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    latencies: List[float] = []
+
+    async def one(call):
+        if speed > 0:
+            delay = (call.get("ts", t_first) - t_first) / speed - (time.perf_counter() - t0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with sem:
+            s = time.perf_counter()
+            try:
+                res = await call_tool(call["tool"], call["args"])
+                code = None if res.get("ok") else ((res.get("error") or {}).get("code") or "failed")
+            except Exception as e:  # a crashing call is a result too
+                code = type(e).__name__
+            dt = time.perf_counter() - s
+        latencies.append(dt)
+        per_tool.setdefault(call["tool"], []).append(dt)
+        if code:
+            errors[f"{call['tool']}:{code}"] = errors.get(f"{call['tool']}:{code}", 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(c) for c in calls))
+    wall = time.perf_counter() - t0
+    return {
+        "overall": summarize(latencies, wall),
+        "per_tool": {tool: summarize(lat, wall) for tool, lat in sorted(per_tool.items())},
+        "errors": errors,
+    }
+
+
+def recorded_stats(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Latency percentiles as recorded in production, per tool, for side-by-side comparison."""
+    per_tool: Dict[str, List[float]] = {}
+    for call in calls:
+        if isinstance(call.get("elapsed_sec"), (int, float)):
+            per_tool.setdefault(call["tool"], []).append(call["elapsed_sec"])
+    span = (calls[-1].get("ts", 0) - calls[0].get("ts", 0)) if calls else 0
+    return {tool: summarize(lat, span) for tool, lat in sorted(per_tool.items())}
+
+
+def _inprocess_caller() -> Caller:
+    import main
+
+    async def call_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        # through FastMCP, so JSON arguments are validated and turned into models as over the wire
+        out = await main.mcp.call_tool(name, args)
+        if isinstance(out, tuple):  # (content, structured) for tools with an output schema
+            return _content_dict(out[0], (out[1] or {}).get("result", out[1]))
+        return _content_dict(out)
+    return call_tool
+
+
+def _content_dict(blocks, structured: Any = None, is_error: bool = False) -> Dict[str, Any]:
+    """A tool result as a dict, from structured content or the JSON text block."""
+    if structured:
+        return structured if isinstance(structured, dict) else {"ok": False}
+    for block in blocks or []:
+        text = getattr(block, "text", None)
+        if text:
+            try:
+                return json.loads(text)
+            except ValueError:
+                break
+    return {"ok": not is_error}
+
+
+def _result_dict(res) -> Dict[str, Any]:
+    data = getattr(res, "structuredContent", None)
+    if isinstance(data, dict):
+        data = data.get("result", data)
+    return _content_dict(getattr(res, "content", None), data, getattr(res, "isError", False))
+
+
+async def _run_with_session(mode: str, url: str, run: Callable[[Caller], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    from mcp import ClientSession
+
+    if mode == "stdio":
+        from mcp import StdioServerParameters
+        from mcp.client.stdio import stdio_client
+
+        # the replayed server must not record the replay into the production log (set, so .env cannot re-enable it)
+        env = {**os.environ, "CALL_RECORD_FILE": ""}
+        transport = stdio_client(StdioServerParameters(
+            command=sys.executable, args=[os.path.join(REPO_ROOT, "main.py")], cwd=REPO_ROOT, env=env,
+        ))
+    else:
+        from mcp.client.streamable_http import streamablehttp_client
+
+        transport = streamablehttp_client(url)
+
+    async with transport as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+
+            async def call_tool(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+                return _result_dict(await session.call_tool(name, args))
+            return await run(call_tool)
+
+
+def run_replay(
+    log_path: str,
+    concurrency: int = 4,
+    speed: float = 0.0,
+    mode: str = "inprocess",
+    url: str = "http://127.0.0.1:8000/mcp",
+    spec: RepoSpec = RepoSpec(),
+    include: Tuple[str, ...] = (),
+    limit: int = 0,
+    workdir: str = "",
+) -> Dict[str, Any]:
+    calls = load_calls(log_path)
+    if limit > 0:
+        calls = calls[:limit]
+    root = workdir or tempfile.mkdtemp(prefix="git-mcp-replay-")
+    try:
+        t0 = time.perf_counter()
+        prepared, skipped = prepare(calls, RepoMapper(root, spec), include)
+        setup_sec = time.perf_counter() - t0
+
+        run = lambda caller: replay(prepared, caller, concurrency, speed)  # noqa: E731
+        if mode == "inprocess":
+            results = asyncio.run(run(_inprocess_caller()))
+        else:
+            results = asyncio.run(_run_with_session(mode, url, run))
+    finally:
+        if not workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "log": log_path,
+            "mode": mode,
+            "concurrency": concurrency,
+            "speed": speed,
+            "calls": len(prepared),
+            "skipped": skipped,
+            "setup_sec": round(setup_sec, 3),
+            "spec": spec.__dict__,
+        },
+        "results": results,
+        "recorded": recorded_stats(calls),
+    }
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("log", help="JSON-lines call log written with CALL_RECORD_FILE")
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--speed", type=float, default=0.0, help="0: as fast as possible; 1.0: recorded pacing")
+    p.add_argument("--mode", choices=["inprocess", "stdio", "http"], default="inprocess")
+    p.add_argument("--url", default="http://127.0.0.1:8000/mcp", help="server endpoint for --mode http")
+    p.add_argument("--include", default="", help="comma-separated remote tools to replay anyway: " + ", ".join(REMOTE_TOOLS))
+    p.add_argument("--limit", type=int, default=0, help="replay only the first N calls")
+    p.add_argument("--files", type=int, default=RepoSpec.files, help="files per synthetic repository")
+    p.add_argument("--depth", type=int, default=RepoSpec.depth, help="commits per synthetic repository")
+    p.add_argument("--diff-files", type=int, default=RepoSpec.diff_files, help="dirty files per synthetic repository")
+    p.add_argument("--output", default="", help="write JSON results here")
+    args = p.parse_args(argv)
+
+    spec = RepoSpec(files=args.files, depth=args.depth, diff_files=args.diff_files)
+    include = tuple(t for t in args.include.split(",") if t)
+    report = run_replay(args.log, args.concurrency, args.speed, args.mode, args.url, spec, include, args.limit)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # nearest-rank, so p99 of a small sample is its max rather than an interpolation
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies_sec: List[float], wall_sec: float) -> Dict[str, Any]:
+    n = len(latencies_sec)
+    return {
+        "count": n,
+        "wall_sec": round(wall_sec, 4),
+        "throughput_ops": round(n / wall_sec, 2) if wall_sec > 0 else 0.0,
+        "mean_ms": round(sum(latencies_sec) / n * 1000, 3) if n else 0.0,
+        "p50_ms": round(percentile(latencies_sec, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies_sec, 99) * 1000, 3),
+        "max_ms": round(max(latencies_sec) * 1000, 3) if n else 0.0,
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], keys=("p50_ms", "p99_ms", "throughput_ops")) -> Dict[str, Any]:
+    """Ratio current/baseline per benchmark and metric (>1 for latency means slower)."""
+    out: Dict[str, Any] = {}
+    for name, cur in current.get("results", {}).items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        out[name] = {k: round(cur[k] / base[k], 3) for k in keys if base.get(k)}
+    return out
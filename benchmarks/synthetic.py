@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import os
+import subprocess
+from dataclasses import dataclass
+
+_ENV = {
+    **os.environ,
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+
+@dataclass(frozen=True)
+class RepoSpec:
+    """Shape of a generated repository."""
+    files: int = 200
+    depth: int = 50
+    file_lines: int = 40
+    diff_files: int = 20
+    files_per_commit: int = 5
+
+
+def _git(args, cwd, stdin: bytes = None) -> None:
+    subprocess.run(["git", *args], cwd=cwd, input=stdin, env=_ENV, check=True, capture_output=True)
+
+
+def _file_path(i: int) -> str:
+    return f"src/pkg{i % 10}/mod_{i}.py"
+
+
+def _file_body(i: int, rev: int, lines: int) -> bytes:
+    return "".join(f"def f_{i}_{n}():\n    return {rev * 1000 + n}\n" for n in range(lines // 2)).encode()
+
+
+def _fast_import_stream(spec: RepoSpec) -> bytes:
+    # fast-import builds deep histories far quicker than one `git commit` per level
+    out = []
+    ts = 1_700_000_000
+    for rev in range(spec.depth):
+        out.append(b"commit refs/heads/master\n")
+        out.append(f"committer bench <bench@example.com> {ts + rev} +0000\n".encode())
+        msg = f"commit {rev}".encode()
+        out.append(b"data %d\n%s\n" % (len(msg), msg))
+        if rev == 0:
+            touched = range(spec.files)
+        else:
+            start = (rev * spec.files_per_commit) % max(spec.files, 1)
+            touched = [(start + k) % spec.files for k in range(spec.files_per_commit)]
+        for i in touched:
+            body = _file_body(i, rev, spec.file_lines)
+            out.append(f"M 100644 inline {_file_path(i)}\n".encode())
+            out.append(b"data %d\n%s\n" % (len(body), body))
+    return b"".join(out)
+
+
+def make_repo(path: str, spec: RepoSpec) -> str:
+    """Create a non-bare repo with `spec.depth` commits and `spec.diff_files` dirty files."""
+    os.makedirs(path, exist_ok=True)
+    _git(["init", "-q", "-b", "master"], cwd=path)
+    _git(["config", "user.name", "bench"], cwd=path)
+    _git(["config", "user.email", "bench@example.com"], cwd=path)
+    _git(["fast-import", "--quiet"], cwd=path, stdin=_fast_import_stream(spec))
+    _git(["checkout", "-q", "-f", "master"], cwd=path)
+    dirty(path, spec, salt=0)
+    return path
+
+
+def dirty(path: str, spec: RepoSpec, salt: int) -> None:
+    """Rewrite `spec.diff_files` tracked files so status/diff/commit have work to do."""
+    for i in range(min(spec.diff_files, spec.files)):
+        with open(os.path.join(path, _file_path(i)), "ab") as f:
+            f.write(f"# edit {salt}\n".encode() * 3)
+
+
+def make_bare(src: str, dest: str) -> str:
+    _git(["clone", "-q", "--bare", src, dest], cwd=None)
+    return dest
@@ -1,34 +1,145 @@
 from __future__ import annotations
 
-import asyncio
+import argparse
+import functools
+import uuid
+import weakref
+
+from mcp.server.auth.middleware.auth_context import get_access_token
 from mcp.server.fastmcp import FastMCP
 from dotenv import load_dotenv
 
 from services.git_service import GitService
-from services.gh_service import GhService
-from services.email_service import EmailService
-from models.git_models import GitCloneIn, GitDiffIn, GitCommitIn, GitPushIn, GitStatusIn
+from services.index_service import IndexService
+from services.snapshot_service import SnapshotService
+from models.git_models import GitCloneIn, GitDiffIn, GitCommitIn, GitPushIn, GitStatusIn, GitLogIn, GitCompareBranchesIn, BranchPair, GitFetchIn, GitPushMultiIn, GitGrepIn, GitIndexSearchIn, GitBlameIn, GitShowFileIn, GitLsTreeIn, GitDiffSummaryIn, GitSnapshotIn, GitSnapshotIdIn, GitSnapshotListIn
 from models.gh_models import OpenPrToBaseIn
-from models.email_models import SendEmailIn
+from models.job_models import JobIdIn, JobWaitIn
 from settings import build_settings, get_default_env_path
 from utils.validate import validate_repo_dir
 from models.result import ToolResult, ErrorInfo
 from utils import errors
-    
+from utils.cancel import run_cancellable
+from utils.jobs import JobTable
+from utils.payload import diff_store
+from utils.quotas import ClientQuotas
+from utils import diff_rules, recorder, supervisor, timeouts
+from utils.tracing import configure_from_settings, span, traced
+
 env_path = get_default_env_path()
 load_dotenv(dotenv_path=env_path, override=False)
 
 settings = build_settings()
+configure_from_settings(settings)
+timeouts.configure_from_settings(settings)
+supervisor.configure_from_settings(settings)
+diff_rules.configure_from_settings(settings)
+recorder.configure_from_settings(settings)
 
-mcp = FastMCP("git-mcp-server")
+mcp = FastMCP("git-mcp-server", host=settings.MCP_HOST, port=settings.MCP_PORT)
+quotas = ClientQuotas(settings.CLIENT_MAX_CONCURRENCY)
+jobs = JobTable(settings.JOB_MAX_JOBS, settings.JOB_RESULT_TTL_SEC)
 
 git = GitService()
-gh = GhService()
-email = EmailService(settings=settings)
-
-
-
-@mcp.tool(description="""
+index = IndexService(git)
+snapshots = SnapshotService(settings.SNAPSHOT_MAX_PER_REPO)
+
+
+# Services/models only some tools need are built on first use: the email stack
+# (smtplib, email.mime, email-validator) is not imported unless send_email runs.
+@functools.lru_cache(maxsize=None)
+def _gh():
+    from services.gh_service import GhService
+    return GhService()
+
+
+@functools.lru_cache(maxsize=None)
+def _email():
+    from services.email_service import EmailService
+    return EmailService(settings=settings)
+
+
+# server-side session object -> random quota key; never reused, unlike id(), and not chosen by the client
+_session_keys: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _client_key() -> str:
+    """
+    Identify the caller for quotas: the authenticated OAuth client when the
+    server runs with auth, otherwise the server-side session (one per
+    connected client on HTTP/SSE). Request `_meta.client_id` is client-chosen
+    and deliberately ignored.
+    """
+    token = get_access_token()
+    if token is not None and token.client_id:
+        return f"client-{token.client_id}"
+    try:
+        session = mcp.get_context().session
+    except ValueError:
+        return "local"
+    key = _session_keys.get(session)
+    if key is None:
+        key = _session_keys.setdefault(session, f"session-{uuid.uuid4().hex}")
+    return key
+
+
+def _with_client_quota(fn):
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        client = _client_key()
+        if not quotas.try_acquire(client):
+            return ToolResult(
+                ok=False,
+                error=ErrorInfo(
+                    code=errors.CLIENT_QUOTA_EXCEEDED,
+                    message="Too many concurrent tool calls from this client.",
+                    hint="Wait for running calls to finish, then retry.",
+                    details={"max_concurrent": quotas.max_concurrent},
+                ),
+            ).to_dict()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            quotas.release(client)
+    return wrapper
+
+
+def _start_job(kind: str, params: dict, fn, *args) -> dict:
+    """Run a service call as a background job and return its id right away."""
+    job = jobs.start(kind, params, fn, *args)
+    if job is None:
+        return ToolResult(
+            ok=False,
+            error=ErrorInfo(
+                code=errors.JOB_TABLE_FULL,
+                message="Too many background jobs are running.",
+                hint="Wait for running jobs to finish (job_wait) or cancel some (job_cancel).",
+                details={"max_jobs": jobs.max_jobs},
+            ),
+        ).to_dict()
+    return ToolResult(ok=True, data=job.to_dict()).to_dict()
+
+
+def _job_not_found(job_id: str) -> dict:
+    return ToolResult(
+        ok=False,
+        error=ErrorInfo(
+            code=errors.JOB_NOT_FOUND,
+            message="Unknown job id, or its result has expired.",
+            details={"job_id": job_id, "ttl_sec": jobs.ttl_sec},
+        ),
+    ).to_dict()
+
+
+def _tool(description: str):
+    """Register an MCP tool wrapped in a root trace span, the call recorder and the per-client quota."""
+    def decorator(fn):
+        wrapped = traced(f"tool.{fn.__name__}", "repo_dir", "repo_url", "dest_dir")(recorder.recorded(_with_client_quota(fn)))
+        return mcp.tool(description=description)(wrapped)
+    return decorator
+
+
+@_tool(description="""
 Return repository status using 'git status --porcelain'.
 
 Use when:
@@ -39,19 +150,23 @@ Use when:
 Inputs:
 - repo_dir: path to local git repository
 - timeout_sec: command timeout
+- submodules: also report every submodule (recursively) in one response: checked-out vs recorded
+  commit, modified/untracked counts, plus a summary. Submodules are inspected in parallel (submodule_jobs).
 
 Returns (ToolResult):
-- ok=true: data.status_porcelain contains the porcelain output (empty string means clean)
+- ok=true: data.status_porcelain contains the porcelain output (empty string means clean);
+  with submodules=true also data.submodules[] ({path, commit, state, describe, modified, untracked, dirty})
+  and data.submodule_summary
 - ok=false: error.code/message and details
 """)
-async def git_status(repo_dir: str, timeout_sec: int = 30) -> dict:
-    _ = GitStatusIn(repo_dir=repo_dir, timeout_sec=timeout_sec)  # validation
-    res = await asyncio.to_thread(git.status, repo_dir, timeout_sec)
-    return res.model_dump()
+async def git_status(repo_dir: str, timeout_sec: int = 30, submodules: bool = False, submodule_jobs: int = 8) -> dict:
+    _ = GitStatusIn(repo_dir=repo_dir, timeout_sec=timeout_sec, submodules=submodules, submodule_jobs=submodule_jobs)  # validation
+    res = await run_cancellable(git.status, repo_dir, timeout_sec, submodules, submodule_jobs)
+    return res.to_dict()
 
 
 
-@mcp.tool(description="""
+@_tool(description="""
 Clone a remote Git repository into a local directory (non-interactive).
 
 Use when:
@@ -61,18 +176,32 @@ Inputs:
 - repo_url: repository URL (https/ssh)
 - dest_dir: local directory path (must be empty or not exist)
 - timeout_sec: command timeout (seconds)
+- recurse_submodules: also clone submodules, submodule_jobs at a time (shallow_submodules: depth 1)
+- background: return data.job_id immediately and run the clone as a job (see job_wait / job_status)
 
 Returns (ToolResult):
-- ok=true: data contains dest_dir, elapsed_sec, stdout/stderr (may be truncated)
+- ok=true: data contains dest_dir, elapsed_sec, stdout/stderr (may be truncated);
+  with recurse_submodules=true also data.submodules[] ({path, commit, state, describe})
 - ok=false: error.code + error.message + optional hint/details
 """)
-async def git_clone(repo_url: str, dest_dir: str, timeout_sec: int = 60) -> dict:
-    _ = GitCloneIn(repo_url=repo_url, dest_dir=dest_dir, timeout_sec=timeout_sec)  # validation
-    res = await asyncio.to_thread(git.clone, repo_url, dest_dir, timeout_sec)
-    return res.model_dump()
+async def git_clone(
+    repo_url: str,
+    dest_dir: str,
+    timeout_sec: int = 60,
+    recurse_submodules: bool = False,
+    submodule_jobs: int = 8,
+    shallow_submodules: bool = False,
+    background: bool = False,
+) -> dict:
+    _ = GitCloneIn(repo_url=repo_url, dest_dir=dest_dir, timeout_sec=timeout_sec, recurse_submodules=recurse_submodules, submodule_jobs=submodule_jobs, shallow_submodules=shallow_submodules, background=background)  # validation
+    args = (repo_url, dest_dir, timeout_sec, recurse_submodules, submodule_jobs, shallow_submodules)
+    if background:
+        return _start_job("git_clone", {"repo_url": repo_url, "dest_dir": dest_dir}, git.clone, *args)
+    res = await run_cancellable(git.clone, *args)
+    return res.to_dict()
 
 
-@mcp.tool(description="""
+@_tool(description="""
 Show git diff for a repository.
 
 Use when:
@@ -84,8 +213,20 @@ Options:
 - name_only: list changed file names only
 - stat: show diff stats
 - max_chars: truncate output to avoid huge responses
-
-Returns ToolResult with data.diff and data.truncated flag.
+- output: "text" (default, data.diff), "gzip_base64" (data.diff_gzip_base64, binary-safe)
+  or "resource" (data.resource_uri; read it with the git-diff:// resource)
+- max_bytes: size cap for the gzip_base64/resource outputs
+- summarize_noise (opt-in): lockfiles, generated files (linguist-generated, -diff), Git LFS files/pointers
+  and files with very many changed lines are left out of the patch and listed in data.summarized_files
+  ({path, reason, added, deleted}) instead; costs extra git runs (numstat, check-attr) per call
+- exclude_globs: with summarize_noise, extra globs to summarize the same way (e.g. ["*.snap", "dist/*"])
+- diff_algorithm: myers / minimal / patience / histogram
+- rename_threshold / copy_threshold (percent, 0 = off), find_copies_harder, rename_limit (diff.renameLimit)
+- rename_budget_sec: if rename detection makes the diff slower than this, it is redone with
+  --no-renames (data.renames = "disabled_after_budget"); only applied when there are added and
+  deleted (or copy-source) files to pair up
+
+Returns ToolResult with data.diff (or the payload fields above) and data.truncated flag.
 """)
 async def git_diff(
     repo_dir: str,
@@ -94,13 +235,67 @@ async def git_diff(
     stat: bool = False,
     max_chars: int = 20000,
     timeout_sec: int = 60,
+    output: str = "text",
+    max_bytes: int = 10_000_000,
+    summarize_noise: bool = False,
+    exclude_globs: list[str] | None = None,
+    diff_algorithm: str = "",
+    rename_threshold: int = 50,
+    copy_threshold: int = 0,
+    find_copies_harder: bool = False,
+    rename_limit: int = 1000,
+    rename_budget_sec: float = 15.0,
 ) -> dict:
-    _ = GitDiffIn(repo_dir=repo_dir, staged=staged, name_only=name_only, stat=stat, max_chars=max_chars, timeout_sec=timeout_sec)
-    res = await asyncio.to_thread(git.diff, repo_dir, staged, name_only, stat, max_chars, timeout_sec)
-    return res.model_dump()
+    _ = GitDiffIn(
+        repo_dir=repo_dir, staged=staged, name_only=name_only, stat=stat, max_chars=max_chars, timeout_sec=timeout_sec,
+        output=output, max_bytes=max_bytes, summarize_noise=summarize_noise, exclude_globs=exclude_globs or [],
+        diff_algorithm=diff_algorithm, rename_threshold=rename_threshold, copy_threshold=copy_threshold,
+        find_copies_harder=find_copies_harder, rename_limit=rename_limit, rename_budget_sec=rename_budget_sec,
+    )
+    res = await run_cancellable(
+        git.diff, repo_dir, staged, name_only, stat, max_chars, timeout_sec, output, max_bytes, summarize_noise, exclude_globs or [],
+        diff_algorithm, rename_threshold, copy_threshold, find_copies_harder, rename_limit, rename_budget_sec,
+    )
+    return res.to_dict()
+
+
+@_tool(description="""
+Summarize a diff as changed symbols per file, without the patch text.
+
+Use when:
+- You need to triage a change ("which functions/classes changed?") rather than read every line.
+
+Modes:
+- default: working tree vs index; staged=true: index vs HEAD; base + head: between two revisions
+
+Python files are attributed to functions/classes (Class.method) via the ast module; other files use
+git's hunk header context. Summaries of revision diffs are cached per tree pair, staged ones per
+HEAD tree and index checksum (nothing is written to the repository).
 
+Returns ToolResult with data.files[]: {path, status, added, deleted, method, symbols: [{symbol, added, deleted}]}.
+""")
+async def git_diff_summary(
+    repo_dir: str,
+    staged: bool = False,
+    base: str = "",
+    head: str = "",
+    max_files: int = 500,
+    timeout_sec: int = 60,
+) -> dict:
+    _ = GitDiffSummaryIn(repo_dir=repo_dir, staged=staged, base=base, head=head, max_files=max_files, timeout_sec=timeout_sec)
+    res = await run_cancellable(git.diff_summary, repo_dir, staged, base, head, max_files, timeout_sec)
+    return res.to_dict()
 
-@mcp.tool(description="""
+
+@mcp.resource("git-diff://{digest}", mime_type="text/x-diff", description="Raw diff bytes returned by git_diff(output='resource').")
+def git_diff_resource(digest: str) -> bytes:
+    data = diff_store.get(digest)
+    if data is None:
+        raise ValueError("Unknown or expired diff resource. Call git_diff again.")
+    return data
+
+
+@_tool(description="""
 Stage all changes and create a git commit (non-interactive).
 
 Use when:
@@ -115,11 +310,11 @@ Returns ToolResult:
 """)
 async def git_commit(repo_dir: str, message: str, timeout_sec: int = 60) -> dict:
     _ = GitCommitIn(repo_dir=repo_dir, message=message, timeout_sec=timeout_sec)
-    res = await asyncio.to_thread(git.commit, repo_dir, message, timeout_sec)
-    return res.model_dump()
+    res = await run_cancellable(git.commit, repo_dir, message, timeout_sec)
+    return res.to_dict()
 
 
-@mcp.tool(description="""
+@_tool(description="""
 Push current branch (or specified branch) to a remote.
 
 Use when:
@@ -128,6 +323,9 @@ Use when:
 Notes:
 - Non-interactive: will NOT open login prompts.
 - Use set_upstream=true for first push of a new branch (git push -u).
+- recurse_submodules: "check" refuses to push if a submodule commit is not on its remote,
+  "on-demand" pushes those submodules first.
+- background=true returns data.job_id immediately (see job_wait / job_status).
 
 Returns ToolResult.
 """)
@@ -137,13 +335,394 @@ async def git_push(
     branch: str = "",
     set_upstream: bool = False,
     timeout_sec: int = 60,
+    recurse_submodules: str = "",
+    background: bool = False,
+) -> dict:
+    _ = GitPushIn(repo_dir=repo_dir, remote=remote, branch=branch, set_upstream=set_upstream, timeout_sec=timeout_sec, recurse_submodules=recurse_submodules, background=background)
+    args = (repo_dir, remote, branch, set_upstream, timeout_sec, recurse_submodules)
+    if background:
+        return _start_job("git_push", {"repo_dir": repo_dir, "remote": remote, "branch": branch}, git.push, *args)
+    res = await run_cancellable(git.push, *args)
+    return res.to_dict()
+
+
+@_tool(description="""
+Get the status of a background job (started with background=true).
+
+Returns ToolResult with data.status ("running", "succeeded", "failed" or "cancelled"),
+data.elapsed_sec and, once finished, data.result (the tool's own ToolResult).
+""")
+async def job_status(job_id: str) -> dict:
+    _ = JobIdIn(job_id=job_id)
+    job = jobs.get(job_id)
+    if job is None:
+        return _job_not_found(job_id)
+    return ToolResult(ok=True, data=job.to_dict()).to_dict()
+
+
+@_tool(description="""
+Wait until a background job finishes (or timeout_sec passes) and return its status.
+
+Use when:
+- You started a clone/push with background=true and now need its result.
+  Call it again if data.status is still "running".
+""")
+async def job_wait(job_id: str, timeout_sec: int = 30) -> dict:
+    _ = JobWaitIn(job_id=job_id, timeout_sec=timeout_sec)
+    job = await jobs.wait(job_id, timeout_sec)
+    if job is None:
+        return _job_not_found(job_id)
+    return ToolResult(ok=True, data=job.to_dict()).to_dict()
+
+
+@_tool(description="""
+Cancel a running background job. Its git processes are killed.
+""")
+async def job_cancel(job_id: str) -> dict:
+    _ = JobIdIn(job_id=job_id)
+    job = jobs.cancel(job_id)
+    if job is None:
+        return _job_not_found(job_id)
+    return ToolResult(ok=True, data=job.to_dict(include_result=False)).to_dict()
+
+
+@_tool(description="""
+List background jobs (running, and finished ones whose results have not expired yet).
+""")
+async def job_list() -> dict:
+    return ToolResult(ok=True, data={"jobs": [j.to_dict(include_result=False) for j in jobs.list()]}).to_dict()
+
+
+@_tool(description="""
+Show commit history as structured records (oid, parents, author, date, subject).
+
+Use when:
+- You need to inspect recent history, find when a file changed, or list commits in a range.
+
+Options:
+- rev_range: revision or range (e.g. "main..HEAD"); empty means HEAD
+- paths: only commits touching these paths
+- author / since / until: filters
+- max_count + cursor: pagination (pass data.next_cursor to get the next page)
+- write_commit_graph: write a commit-graph with changed-path Bloom filters first if missing
+  (makes path-limited history fast on large repositories)
+
+Returns ToolResult with data.commits, data.next_cursor ("" when no more pages) and data.commit_graph.
+""")
+async def git_log(
+    repo_dir: str,
+    rev_range: str = "",
+    paths: list[str] | None = None,
+    author: str = "",
+    since: str = "",
+    until: str = "",
+    max_count: int = 50,
+    cursor: str = "",
+    write_commit_graph: bool = False,
+    timeout_sec: int = 60,
+) -> dict:
+    _ = GitLogIn(repo_dir=repo_dir, rev_range=rev_range, paths=paths or [], author=author, since=since, until=until, max_count=max_count, cursor=cursor, write_commit_graph=write_commit_graph, timeout_sec=timeout_sec)
+    res = await run_cancellable(git.log, repo_dir, rev_range, paths or [], author, since, until, max_count, cursor, write_commit_graph, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+Compare branch pairs: ahead/behind counts, merge-base and merged status, in one call.
+
+Use when:
+- Before pushing / opening a PR, to check whether the branch is behind its base or already merged.
+
+Inputs:
+- pairs: list of {base, head}; head defaults to HEAD
+
+Returns ToolResult with data.results[]: base_oid, head_oid, ahead, behind, merge_base,
+fully_merged (head has no commits missing from base), up_to_date (head contains base).
+Results are cached per (base_oid, head_oid) since they never change for the same commits.
+""")
+async def git_compare_branches(repo_dir: str, pairs: list[BranchPair], timeout_sec: int = 60) -> dict:
+    _ = GitCompareBranchesIn(repo_dir=repo_dir, pairs=pairs, timeout_sec=timeout_sec)
+    res = await run_cancellable(git.compare_branches, repo_dir, [(p.base, p.head) for p in pairs], timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+Fetch from a remote into one or many local repositories (instead of re-cloning).
+
+Use when:
+- You need fresh remote refs for repositories that are already cloned.
+
+Inputs:
+- repo_dir: a single repository, or repo_dirs: several repositories (fetched in parallel, max_parallel at a time)
+- refspecs: narrow what is fetched (e.g. ["main"])
+- no_tags, prune, depth: usual git fetch options
+- negotiation_tips: only advertise these local refs during negotiation (faster on repos with many refs)
+- submodule_jobs: fetch changed submodules with this parallelism
+- keep_pack: store even small fetches as a pack (fetch.unpackLimit=1) so their size is always reported;
+  this changes the repository's object layout (more small packs until gc)
+
+Returns ToolResult:
+- single repo: data.bytes_received (pack size as reported by git's transfer progress; null when git
+  unpacked a small fetch into loose objects without reporting a size), data.elapsed_sec, stdout/stderr
+- several repos: data.results[] (one ToolResult per repo), succeeded/failed counts and total bytes_received
+""")
+async def git_fetch(
+    repo_dir: str = "",
+    repo_dirs: list[str] | None = None,
+    remote: str = "origin",
+    refspecs: list[str] | None = None,
+    no_tags: bool = False,
+    negotiation_tips: list[str] | None = None,
+    prune: bool = False,
+    depth: int = 0,
+    submodule_jobs: int = 0,
+    max_parallel: int = 4,
+    timeout_sec: int = 120,
+    keep_pack: bool = False,
+) -> dict:
+    dirs = list(repo_dirs or []) + ([repo_dir] if repo_dir else [])
+    kwargs = dict(
+        remote=remote, refspecs=refspecs or [], no_tags=no_tags, negotiation_tips=negotiation_tips or [],
+        prune=prune, depth=depth, submodule_jobs=submodule_jobs, timeout_sec=timeout_sec, keep_pack=keep_pack,
+    )
+    _ = GitFetchIn(repo_dirs=dirs, max_parallel=max_parallel, **kwargs)
+    if len(dirs) == 1:
+        res = await run_cancellable(functools.partial(git.fetch, dirs[0], **kwargs))
+    else:
+        res = await run_cancellable(functools.partial(git.fetch_many, dirs, max_parallel, **kwargs))
+    return res.to_dict()
+
+
+@_tool(description="""
+Push several refs to several remotes in one call (e.g. a release branch plus its tag to two remotes).
+
+Use when:
+- A release or sync flow needs the same refs on multiple remotes.
+
+Behavior:
+- One git push (one connection) per remote, remotes pushed in parallel.
+- atomic=true (default): each remote accepts all refs or none.
+- Non-interactive: will NOT open login prompts.
+
+Returns ToolResult with data.remotes[]: per-remote ok flag and per-ref status
+(new / fast_forward / forced / deleted / up_to_date / rejected) parsed from git push --porcelain.
+""")
+async def git_push_multi(
+    repo_dir: str,
+    remotes: list[str],
+    refspecs: list[str],
+    atomic: bool = True,
+    set_upstream: bool = False,
+    timeout_sec: int = 60,
 ) -> dict:
-    _ = GitPushIn(repo_dir=repo_dir, remote=remote, branch=branch, set_upstream=set_upstream, timeout_sec=timeout_sec)
-    res = await asyncio.to_thread(git.push, repo_dir, remote, branch, set_upstream, timeout_sec)
-    return res.model_dump()
+    _ = GitPushMultiIn(repo_dir=repo_dir, remotes=remotes, refspecs=refspecs, atomic=atomic, set_upstream=set_upstream, timeout_sec=timeout_sec)
+    res = await run_cancellable(git.push_multi, repo_dir, remotes, refspecs, atomic, set_upstream, timeout_sec)
+    return res.to_dict()
 
 
-@mcp.tool(description="""
+@_tool(description="""
+Search file contents with git grep (multithreaded, over the working tree or any revision).
+
+Use when:
+- You need to find where something is defined or used, instead of reading files one by one.
+
+Options:
+- rev: search a revision (e.g. HEAD, main) instead of the working tree
+- pathspecs: limit to paths/globs
+- ignore_case / fixed_strings / word
+- max_results + cursor: pagination (pass data.next_cursor to get the next page)
+
+Returns ToolResult with data.matches[]: {path, line, column, text}. Binary files are skipped.
+""")
+async def git_grep(
+    repo_dir: str,
+    pattern: str,
+    rev: str = "",
+    pathspecs: list[str] | None = None,
+    ignore_case: bool = False,
+    fixed_strings: bool = False,
+    word: bool = False,
+    max_results: int = 200,
+    cursor: str = "",
+    threads: int = 0,
+    timeout_sec: int = 60,
+) -> dict:
+    _ = GitGrepIn(repo_dir=repo_dir, pattern=pattern, rev=rev, pathspecs=pathspecs or [], ignore_case=ignore_case, fixed_strings=fixed_strings, word=word, max_results=max_results, cursor=cursor, threads=threads, timeout_sec=timeout_sec)
+    res = await run_cancellable(git.grep, repo_dir, pattern, rev, pathspecs or [], ignore_case, fixed_strings, word, max_results, cursor, threads, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+Search a revision using a persistent per-repo trigram index, verified with git grep.
+
+Use when:
+- You search the same repository repeatedly; after the first call (which builds the index)
+  only files that can contain the pattern's literal text are grepped.
+
+Notes:
+- The index lives in .git/mcp-index/ and is updated incrementally from the blobs changed
+  between the indexed tree and rev's tree.
+- Patterns without a literal run of 3+ characters fall back to a full git grep.
+
+Returns ToolResult with data.matches[] ({path, line, column, text}) and data.index (mode, files, candidates).
+""")
+async def git_index_search(
+    repo_dir: str,
+    pattern: str,
+    rev: str = "HEAD",
+    ignore_case: bool = False,
+    fixed_strings: bool = False,
+    max_results: int = 200,
+    cursor: str = "",
+    timeout_sec: int = 120,
+) -> dict:
+    _ = GitIndexSearchIn(repo_dir=repo_dir, pattern=pattern, rev=rev, ignore_case=ignore_case, fixed_strings=fixed_strings, max_results=max_results, cursor=cursor, timeout_sec=timeout_sec)
+    res = await run_cancellable(index.search, repo_dir, pattern, rev, ignore_case, fixed_strings, max_results, cursor, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+Show who last changed each line of a file (git blame) at a revision.
+
+Use when:
+- Reviewing code and you need authorship/history context for specific lines.
+
+Options:
+- start_line / end_line: limit to a line range (much faster on large files)
+- include_text: also return the line text
+
+Returns ToolResult with data.ranges[] ({start, end, commit, orig_start, orig_path}) and
+data.commits ({oid: {author, author_email, author_time, summary}}). Results are cached per commit.
+""")
+async def git_blame(
+    repo_dir: str,
+    path: str,
+    rev: str = "HEAD",
+    start_line: int = 0,
+    end_line: int = 0,
+    include_text: bool = False,
+    timeout_sec: int = 60,
+) -> dict:
+    _ = GitBlameIn(repo_dir=repo_dir, path=path, rev=rev, start_line=start_line, end_line=end_line, include_text=include_text, timeout_sec=timeout_sec)
+    res = await run_cancellable(git.blame, repo_dir, path, rev, start_line, end_line, include_text, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+Read a file's contents at a revision, without touching the working tree.
+
+Use when:
+- You need to see a file as of a branch/tag/commit (instead of calling git_diff to get its contents).
+
+Options:
+- offset + max_bytes: read a byte range of large files (data.truncated tells whether more follows)
+
+Returns ToolResult with data.content. Binary files (NUL in the first 8000 bytes) are returned
+base64-encoded with data.encoding="base64".
+""")
+async def git_show_file(
+    repo_dir: str,
+    path: str,
+    rev: str = "HEAD",
+    offset: int = 0,
+    max_bytes: int = 200_000,
+    timeout_sec: int = 60,
+) -> dict:
+    _ = GitShowFileIn(repo_dir=repo_dir, path=path, rev=rev, offset=offset, max_bytes=max_bytes, timeout_sec=timeout_sec)
+    res = await run_cancellable(git.show_file, repo_dir, path, rev, offset, max_bytes, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+List files and directories at a revision (git ls-tree).
+
+Use when:
+- You need to explore a repository's layout at a branch/tag/commit.
+
+Options:
+- path: directory to list (a file path returns that single entry; a missing path is invalid_input)
+- recursive: list every file below path
+- max_entries + cursor: pagination (pass data.next_cursor to get the next page)
+
+Returns ToolResult with data.entries[]: {path, type, mode, oid, size}.
+""")
+async def git_ls_tree(
+    repo_dir: str,
+    rev: str = "HEAD",
+    path: str = "",
+    recursive: bool = False,
+    max_entries: int = 500,
+    cursor: str = "",
+    timeout_sec: int = 60,
+) -> dict:
+    _ = GitLsTreeIn(repo_dir=repo_dir, rev=rev, path=path, recursive=recursive, max_entries=max_entries, cursor=cursor, timeout_sec=timeout_sec)
+    res = await run_cancellable(git.ls_tree, repo_dir, rev, path, recursive, max_entries, cursor, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+Snapshot a repository's HEAD, index, working tree and untracked files so they can be restored later.
+
+Use when:
+- You are about to try a change that may need to be rolled back (instead of re-cloning or resetting).
+
+Notes:
+- Tracked state is stored as git objects (git write-tree / git stash create); untracked files are
+  reflinked where the filesystem supports it, otherwise copied, into .git/mcp-snapshots/.
+- Ignored files are left out unless include_ignored=true.
+- At most SNAPSHOT_MAX_PER_REPO snapshots are kept per repository; the oldest are evicted (data.evicted).
+
+Returns ToolResult with data.snapshot_id, head, branch, untracked_files, copy_methods and evicted[].
+""")
+async def git_snapshot(
+    repo_dir: str,
+    label: str = "",
+    include_ignored: bool = False,
+    hardlink_untracked: bool = False,
+    timeout_sec: int = 120,
+) -> dict:
+    _ = GitSnapshotIn(repo_dir=repo_dir, label=label, include_ignored=include_ignored, hardlink_untracked=hardlink_untracked, timeout_sec=timeout_sec)
+    res = await run_cancellable(snapshots.snapshot, repo_dir, label, include_ignored, hardlink_untracked, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+Restore a snapshot taken with git_snapshot.
+
+Behavior:
+- Checks out the branch that was current at snapshot time and resets it to the snapshot's HEAD.
+- Tracked files, the index and untracked files are put back exactly; local changes and untracked
+  files created since the snapshot are discarded.
+- The snapshot is kept and can be restored again.
+
+Returns ToolResult with data.head, branch and previous_head.
+""")
+async def git_snapshot_restore(repo_dir: str, snapshot_id: str, timeout_sec: int = 120) -> dict:
+    _ = GitSnapshotIdIn(repo_dir=repo_dir, snapshot_id=snapshot_id, timeout_sec=timeout_sec)
+    res = await run_cancellable(snapshots.restore, repo_dir, snapshot_id, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
+List a repository's snapshots, newest first.
+
+Returns ToolResult with data.snapshots[]: {snapshot_id, label, created_at, head, branch, untracked_files}.
+""")
+async def git_snapshot_list(repo_dir: str) -> dict:
+    _ = GitSnapshotListIn(repo_dir=repo_dir)
+    res = await run_cancellable(snapshots.list_snapshots, repo_dir)
+    return res.to_dict()
+
+
+@_tool(description="""
+Delete a snapshot and release its objects and copied files.
+""")
+async def git_snapshot_delete(repo_dir: str, snapshot_id: str, timeout_sec: int = 30) -> dict:
+    _ = GitSnapshotIdIn(repo_dir=repo_dir, snapshot_id=snapshot_id, timeout_sec=timeout_sec)
+    res = await run_cancellable(snapshots.delete, repo_dir, snapshot_id, timeout_sec)
+    return res.to_dict()
+
+
+@_tool(description="""
 Create a Pull Request from the current branch to a base branch using GitHub CLI (gh).
 
 Use when:
@@ -169,12 +748,15 @@ async def open_pr_to_base(
     _ = OpenPrToBaseIn(repo_dir=repo_dir, title=title, body=body, remote=remote, base=base, draft=draft, timeout_sec=timeout_sec)
 
     # validate repo & detect branch
-    res_validate = await asyncio.to_thread(lambda: __validate_repo_for_pr(repo_dir))
+    with span("pr.validate"):
+        res_validate = await run_cancellable(__validate_repo_for_pr, repo_dir)
     if not res_validate["ok"]:
         return res_validate
 
     repo_dir_abs = res_validate["repo_dir_abs"]
-    branch = await asyncio.to_thread(git.current_branch, repo_dir_abs, 20)
+    with span("pr.detect_branch") as sp:
+        branch = await run_cancellable(git.current_branch, repo_dir_abs, 20)
+        sp.set(branch=branch)
     if not branch:
         return ToolResult(
             ok=False,
@@ -183,7 +765,7 @@ async def open_pr_to_base(
                 message="Failed to detect current branch.",
                 details={"repo_dir": repo_dir_abs},
             )
-        ).model_dump()
+        ).to_dict()
 
     if branch in ("main", "master"):
         return ToolResult(
@@ -194,17 +776,21 @@ async def open_pr_to_base(
                 details={"current_branch": branch}
                 
             )
-        ).model_dump()
+        ).to_dict()
         
     # ensure upstream
-    has_up = await asyncio.to_thread(git.has_upstream, repo_dir_abs, 10)
+    with span("pr.check_upstream") as sp:
+        has_up = await run_cancellable(git.has_upstream, repo_dir_abs, 10)
+        sp.set(has_upstream=has_up)
     if not has_up:
-        push_res = await asyncio.to_thread(git.push, repo_dir_abs, remote, branch, True, timeout_sec)
+        with span("pr.push"):
+            push_res = await run_cancellable(git.push, repo_dir_abs, remote, branch, True, timeout_sec)
         if not push_res.ok:
-            return push_res.model_dump()
+            return push_res.to_dict()
 
-    pr_res = await asyncio.to_thread(gh.create_pr, repo_dir_abs, title, body, base, branch, draft, timeout_sec)
-    return pr_res.model_dump()
+    with span("pr.create"):
+        pr_res = await run_cancellable(_gh().create_pr, repo_dir_abs, title, body, base, branch, draft, timeout_sec)
+    return pr_res.to_dict()
 
 
 def __validate_repo_for_pr(repo_dir: str) -> dict:
@@ -219,11 +805,11 @@ def __validate_repo_for_pr(repo_dir: str) -> dict:
                 message="Not a git repository.",
                 details={"repo_dir": repo_dir_abs}
                 )
-            ).model_dump()
+            ).to_dict()
     return {"ok": True, "repo_dir_abs": repo_dir_abs}
 
 
-@mcp.tool(description="""
+@_tool(description="""
 Send an email notification (SMTP).
 
 Use when:
@@ -239,10 +825,38 @@ Returns ToolResult:
 - ok=false: missing SMTP config or send failure
 """)
 async def send_email(to: str, subject: str, body: str) -> dict:
+    from models.email_models import SendEmailIn
+
     _ = SendEmailIn(to=to, subject=subject, body=body)
-    res = await asyncio.to_thread(email.send, to, subject, body)
-    return res.model_dump()
+    res = await run_cancellable(_email().send, to, subject, body)
+    return res.to_dict()
+
+
+def _parse_args(argv=None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Git MCP server")
+    p.add_argument(
+        "--transport",
+        choices=["stdio", "sse", "streamable-http"],
+        default=settings.MCP_TRANSPORT,
+        help="stdio (one server per client) or a long-running shared HTTP server",
+    )
+    p.add_argument("--host", default=settings.MCP_HOST)
+    p.add_argument("--port", type=int, default=settings.MCP_PORT)
+    p.add_argument(
+        "--startup-report",
+        action="store_true",
+        help="print an import-time breakdown of server startup (python -X importtime) and exit",
+    )
+    return p.parse_args(argv)
 
 
 if __name__ == "__main__":
-    mcp.run()
+    args = _parse_args()
+    if args.startup_report:
+        import json
+        from utils.startup import startup_report
+        print(json.dumps(startup_report(), indent=2))
+        raise SystemExit(0)
+    mcp.settings.host = args.host
+    mcp.settings.port = args.port
+    mcp.run(transport=args.transport)
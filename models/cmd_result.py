@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 from typing import Optional, Dict, Any
 
 
@@ -20,9 +20,24 @@ class CmdResult:
     stdout_truncated: bool
     stderr_truncated: bool
     error: Optional[str] = None
+    # Raw stdout when run with binary=True (stdout is then left empty).
+    # A memoryview over the pipe buffer, so it is never copied or decoded.
+    stdout_bytes: Optional[memoryview] = field(default=None, repr=False, compare=False)
 
     def to_dict(self) -> Dict[str, Any]:
         """
         Convert to plain dict for embedding inside ToolResult.details.
+        Raw bytes are left out; they are not JSON-serializable.
         """
-        return asdict(self)
+        return {
+            "ok": self.ok,
+            "cmd": self.cmd,
+            "cwd": self.cwd,
+            "code": self.code,
+            "elapsed_sec": self.elapsed_sec,
+            "stdout": self.stdout,
+            "stderr": self.stderr,
+            "stdout_truncated": self.stdout_truncated,
+            "stderr_truncated": self.stderr_truncated,
+            "error": self.error,
+        }
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import List, Literal
+
 from pydantic import BaseModel, Field
 
 class GitCloneIn(BaseModel):
@@ -17,6 +19,24 @@ class GitCloneIn(BaseModel):
         le=600,
         description="Timeout in seconds."
     )
+    recurse_submodules: bool = Field(
+        False,
+        description="If true: also clone all submodules (git clone --recurse-submodules)."
+    )
+    submodule_jobs: int = Field(
+        8,
+        ge=0,
+        le=64,
+        description="Submodules cloned in parallel (--jobs); 0 uses git's submodule.fetchJobs."
+    )
+    shallow_submodules: bool = Field(
+        False,
+        description="If true: clone submodules with depth 1 (--shallow-submodules)."
+    )
+    background: bool = Field(
+        False,
+        description="If true: run as a background job and return data.job_id immediately."
+    )
 
 
 class GitStatusIn(BaseModel):
@@ -30,6 +50,16 @@ class GitStatusIn(BaseModel):
         le=300,
         description="Timeout in seconds."
     )
+    submodules: bool = Field(
+        False,
+        description="If true: add per-submodule state (recursive) and a summary."
+    )
+    submodule_jobs: int = Field(
+        8,
+        ge=1,
+        le=64,
+        description="Submodules inspected in parallel."
+    )
 
 
 class GitDiffIn(BaseModel):
@@ -61,6 +91,56 @@ class GitDiffIn(BaseModel):
         le=600,
         description="Timeout in seconds."
     )
+    output: Literal["text", "gzip_base64", "resource"] = Field(
+        "text",
+        description="text: inline diff; gzip_base64: compressed inline payload; resource: MCP resource URI to fetch."
+    )
+    max_bytes: int = Field(
+        10_000_000,
+        ge=1000,
+        le=100_000_000,
+        description="Maximum diff size in bytes for the gzip_base64/resource outputs."
+    )
+    summarize_noise: bool = Field(
+        False,
+        description="If true: list lockfiles, generated, LFS and very large files in summarized_files instead of diffing them."
+    )
+    exclude_globs: List[str] = Field(
+        default_factory=list,
+        description="With summarize_noise: extra globs of files to summarize instead of diff (e.g. *.snap)."
+    )
+    diff_algorithm: Literal["", "myers", "minimal", "patience", "histogram"] = Field(
+        "",
+        description="git diff --diff-algorithm (empty: git's default)."
+    )
+    rename_threshold: int = Field(
+        50,
+        ge=0,
+        le=100,
+        description="Rename detection similarity in percent (-M). 0 disables rename detection."
+    )
+    copy_threshold: int = Field(
+        0,
+        ge=0,
+        le=100,
+        description="Copy detection similarity in percent (-C). 0 disables copy detection."
+    )
+    find_copies_harder: bool = Field(
+        False,
+        description="If true: also consider unmodified files as copy sources (expensive; needs copy_threshold)."
+    )
+    rename_limit: int = Field(
+        1000,
+        ge=0,
+        le=100000,
+        description="diff.renameLimit: max files considered for inexact rename/copy detection (0: git's default)."
+    )
+    rename_budget_sec: float = Field(
+        15.0,
+        ge=0,
+        le=600,
+        description="If the diff with rename detection takes longer, redo it without (0: no budget)."
+    )
 
 
 class GitCommitIn(BaseModel):
@@ -105,3 +185,460 @@ class GitPushIn(BaseModel):
         le=600,
         description="Timeout in seconds."
     )
+    recurse_submodules: Literal["", "check", "on-demand", "only", "no"] = Field(
+        "",
+        description="Submodule handling (--recurse-submodules): check, on-demand (push submodules first), only or no."
+    )
+    background: bool = Field(
+        False,
+        description="If true: run as a background job and return data.job_id immediately."
+    )
+
+
+class GitLogIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    rev_range: str = Field(
+        "",
+        description="Revision or range (e.g. main, v1.0..HEAD). Empty: HEAD."
+    )
+    paths: List[str] = Field(
+        default_factory=list,
+        description="Limit history to commits touching these paths."
+    )
+    author: str = Field(
+        "",
+        description="Only commits whose author matches this pattern."
+    )
+    since: str = Field(
+        "",
+        description="Only commits after this date (e.g. 2024-01-01, '2 weeks ago')."
+    )
+    until: str = Field(
+        "",
+        description="Only commits before this date."
+    )
+    max_count: int = Field(
+        50,
+        ge=1,
+        le=500,
+        description="Page size."
+    )
+    cursor: str = Field(
+        "",
+        description="Pagination cursor (data.next_cursor of the previous page)."
+    )
+    write_commit_graph: bool = Field(
+        False,
+        description="If true: write a commit-graph with changed-path filters first when the repo has none."
+    )
+    timeout_sec: int = Field(
+        60,
+        ge=1,
+        le=600,
+        description="Timeout in seconds."
+    )
+
+
+class BranchPair(BaseModel):
+    base: str = Field(
+        ...,
+        min_length=1,
+        description="Base ref (e.g. main, origin/main)."
+    )
+    head: str = Field(
+        "HEAD",
+        description="Ref compared against base (default: HEAD)."
+    )
+
+
+class GitCompareBranchesIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    pairs: List[BranchPair] = Field(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="Branch pairs to compare."
+    )
+    timeout_sec: int = Field(
+        60,
+        ge=1,
+        le=600,
+        description="Timeout in seconds."
+    )
+
+
+class GitFetchIn(BaseModel):
+    repo_dirs: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        description="Local repositories to fetch."
+    )
+    remote: str = Field(
+        "origin",
+        description="Remote name (default: origin)."
+    )
+    refspecs: List[str] = Field(
+        default_factory=list,
+        description="Only fetch these refspecs (e.g. main, refs/heads/feature:refs/remotes/origin/feature)."
+    )
+    no_tags: bool = Field(
+        False,
+        description="If true: do not fetch tags (git fetch --no-tags)."
+    )
+    negotiation_tips: List[str] = Field(
+        default_factory=list,
+        description="Only report these local refs/globs as 'have' during negotiation (--negotiation-tip)."
+    )
+    prune: bool = Field(
+        False,
+        description="If true: remove remote-tracking refs that no longer exist on the remote."
+    )
+    depth: int = Field(
+        0,
+        ge=0,
+        le=100000,
+        description="If > 0: limit fetched history depth (--depth)."
+    )
+    submodule_jobs: int = Field(
+        0,
+        ge=0,
+        le=64,
+        description="If > 0: fetch submodules on demand with this parallelism (fetch.parallel)."
+    )
+    keep_pack: bool = Field(
+        False,
+        description="If true: keep even small fetches as a pack (fetch.unpackLimit=1) so bytes_received is always reported. Changes how fetched objects are stored."
+    )
+    max_parallel: int = Field(
+        4,
+        ge=1,
+        le=32,
+        description="Maximum number of repositories fetched at the same time."
+    )
+    timeout_sec: int = Field(
+        120,
+        ge=1,
+        le=1800,
+        description="Timeout in seconds (per repository)."
+    )
+
+
+class GitPushMultiIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    remotes: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=20,
+        description="Remotes to push to (pushed in parallel)."
+    )
+    refspecs: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=200,
+        description="Refspecs to push to every remote (e.g. main, refs/tags/v1.2.0)."
+    )
+    atomic: bool = Field(
+        True,
+        description="If true: each remote updates all refs or none (git push --atomic)."
+    )
+    set_upstream: bool = Field(
+        False,
+        description="If true: use git push -u (create upstream)."
+    )
+    timeout_sec: int = Field(
+        60,
+        ge=1,
+        le=600,
+        description="Timeout in seconds (per remote)."
+    )
+
+
+class GitGrepIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    pattern: str = Field(
+        ...,
+        min_length=1,
+        description="Search pattern (extended regex unless fixed_strings is true)."
+    )
+    rev: str = Field(
+        "",
+        description="Search this revision instead of the working tree (e.g. HEAD, main, a commit oid)."
+    )
+    pathspecs: List[str] = Field(
+        default_factory=list,
+        description="Limit the search to these paths/globs (e.g. src/, *.py)."
+    )
+    ignore_case: bool = Field(
+        False,
+        description="If true: case-insensitive match."
+    )
+    fixed_strings: bool = Field(
+        False,
+        description="If true: treat pattern as a literal string."
+    )
+    word: bool = Field(
+        False,
+        description="If true: match whole words only."
+    )
+    max_results: int = Field(
+        200,
+        ge=1,
+        le=2000,
+        description="Page size (number of matching lines)."
+    )
+    cursor: str = Field(
+        "",
+        description="Pagination cursor (data.next_cursor of the previous page)."
+    )
+    threads: int = Field(
+        0,
+        ge=0,
+        le=64,
+        description="git grep worker threads (0: number of CPUs)."
+    )
+    timeout_sec: int = Field(
+        60,
+        ge=1,
+        le=600,
+        description="Timeout in seconds."
+    )
+
+
+class GitIndexSearchIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    pattern: str = Field(
+        ...,
+        min_length=1,
+        description="Search pattern (extended regex unless fixed_strings is true)."
+    )
+    rev: str = Field(
+        "HEAD",
+        description="Revision to search (the index is built for its tree)."
+    )
+    ignore_case: bool = Field(
+        False,
+        description="If true: case-insensitive match."
+    )
+    fixed_strings: bool = Field(
+        False,
+        description="If true: treat pattern as a literal string."
+    )
+    max_results: int = Field(
+        200,
+        ge=1,
+        le=2000,
+        description="Page size (number of matching lines)."
+    )
+    cursor: str = Field(
+        "",
+        description="Pagination cursor (data.next_cursor of the previous page)."
+    )
+    timeout_sec: int = Field(
+        120,
+        ge=1,
+        le=1800,
+        description="Timeout in seconds (the first search of a repo builds the index)."
+    )
+
+
+class GitBlameIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    path: str = Field(
+        ...,
+        min_length=1,
+        description="File path relative to the repository root."
+    )
+    rev: str = Field(
+        "HEAD",
+        description="Revision to blame at (branch, tag or commit oid)."
+    )
+    start_line: int = Field(
+        0,
+        ge=0,
+        description="First line to blame (1-based, 0: start of file)."
+    )
+    end_line: int = Field(
+        0,
+        ge=0,
+        description="Last line to blame (inclusive, 0: end of file)."
+    )
+    include_text: bool = Field(
+        False,
+        description="If true: include the text of each line (uses --porcelain)."
+    )
+    timeout_sec: int = Field(
+        60,
+        ge=1,
+        le=600,
+        description="Timeout in seconds."
+    )
+
+
+class GitShowFileIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    path: str = Field(
+        ...,
+        min_length=1,
+        description="File path relative to the repository root."
+    )
+    rev: str = Field(
+        "HEAD",
+        description="Revision to read the file at (branch, tag or commit oid)."
+    )
+    offset: int = Field(
+        0,
+        ge=0,
+        description="Byte offset to start reading at."
+    )
+    max_bytes: int = Field(
+        200_000,
+        ge=1,
+        le=5_000_000,
+        description="Maximum number of bytes to return."
+    )
+    timeout_sec: int = Field(
+        60,
+        ge=1,
+        le=600,
+        description="Timeout in seconds."
+    )
+
+
+class GitLsTreeIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    rev: str = Field(
+        "HEAD",
+        description="Revision to list (branch, tag or commit oid)."
+    )
+    path: str = Field(
+        "",
+        description="Directory to list (empty: repository root)."
+    )
+    recursive: bool = Field(
+        False,
+        description="If true: list all files below path."
+    )
+    max_entries: int = Field(
+        500,
+        ge=1,
+        le=10000,
+        description="Page size (number of entries)."
+    )
+    cursor: str = Field(
+        "",
+        description="Pagination cursor (data.next_cursor of the previous page)."
+    )
+    timeout_sec: int = Field(
+        60,
+        ge=1,
+        le=600,
+        description="Timeout in seconds."
+    )
+
+
+class GitDiffSummaryIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    staged: bool = Field(
+        False,
+        description="If true: summarize staged changes (index vs HEAD)."
+    )
+    base: str = Field(
+        "",
+        description="Compare two revisions: base (requires head)."
+    )
+    head: str = Field(
+        "",
+        description="Compare two revisions: head (requires base)."
+    )
+    max_files: int = Field(
+        500,
+        ge=1,
+        le=10000,
+        description="Maximum number of files to return."
+    )
+    timeout_sec: int = Field(
+        60,
+        ge=1,
+        le=600,
+        description="Timeout in seconds."
+    )
+
+
+class GitSnapshotIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    label: str = Field(
+        "",
+        max_length=200,
+        description="Optional note stored with the snapshot."
+    )
+    include_ignored: bool = Field(
+        False,
+        description="If true: also capture ignored files (and remove ignored files created since on restore)."
+    )
+    hardlink_untracked: bool = Field(
+        False,
+        description="If true: hard-link untracked files instead of copying them. Faster, but in-place edits "
+                    "to those files after the snapshot also change the snapshot."
+    )
+    timeout_sec: int = Field(
+        120,
+        ge=1,
+        le=1800,
+        description="Timeout in seconds."
+    )
+
+
+class GitSnapshotIdIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
+    snapshot_id: str = Field(
+        ...,
+        min_length=1,
+        description="Snapshot id returned by git_snapshot."
+    )
+    timeout_sec: int = Field(
+        120,
+        ge=1,
+        le=1800,
+        description="Timeout in seconds."
+    )
+
+
+class GitSnapshotListIn(BaseModel):
+    repo_dir: str = Field(
+        ...,
+        description="Path to the local repository directory."
+    )
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from pydantic import BaseModel, Field
+
+
+class JobIdIn(BaseModel):
+    job_id: str = Field(
+        ...,
+        min_length=1,
+        description="Job id returned by a tool called with background=true."
+    )
+
+
+class JobWaitIn(BaseModel):
+    job_id: str = Field(
+        ...,
+        min_length=1,
+        description="Job id returned by a tool called with background=true."
+    )
+    timeout_sec: int = Field(
+        30,
+        ge=0,
+        le=300,
+        description="How long to wait for the job to finish before returning its current status."
+    )
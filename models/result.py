@@ -1,38 +1,47 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from typing import Any, Dict, Optional
-from pydantic import BaseModel, Field
-
-
-class ErrorInfo(BaseModel):
-    code: str = Field(
-        ...,
-        description="A short, stable identifier for the error type (logic / validation / dependency)."
-    )
-    message: str = Field(
-        ...,
-        description="Human-readable message for the user or agent."
-    )
-    hint: Optional[str] = Field(
-        None,
-        description="Guidance for fixing the issue (e.g., gh auth login)."
-    )
-    details: Dict[str, Any] = Field(
-        default_factory=dict,
-        description="Technical or diagnostic details."
-    )
-
-
-class ToolResult(BaseModel):
-    ok: bool = Field(
-        ...,
-        description="Indicates whether the operation succeeded."
-    )
-    data: Dict[str, Any] = Field(
-        default_factory=dict,
-        description="Result or output of the operation."
-    )
-    error: Optional[ErrorInfo] = Field(
-        None,
-        description="Present only if ok is false."
-    )
+
+
+def _plain(value: Any) -> Any:
+    """Internal result objects (e.g. CmdResult) become dicts; everything else is kept as is."""
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if callable(to_dict) else value
+
+
+@dataclass(slots=True)
+class ErrorInfo:
+    # A short, stable identifier for the error type (logic / validation / dependency), see utils.errors.
+    code: str
+    # Human-readable message for the user or agent.
+    message: str
+    # Guidance for fixing the issue (e.g., gh auth login).
+    hint: Optional[str] = None
+    # Technical or diagnostic details. A CmdResult (or values that are one) is stored as its dict.
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        details = _plain(self.details)
+        self.details = {k: _plain(v) for k, v in details.items()} if details else {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"code": self.code, "message": self.message, "hint": self.hint, "details": self.details}
+
+
+@dataclass(slots=True)
+class ToolResult:
+    """
+    Envelope returned by every tool. Plain slotted dataclass rather than a
+    pydantic model: results are built by our own code, so validation buys
+    nothing and construction/serialization stay cheap on the hot path.
+    """
+    # Indicates whether the operation succeeded.
+    ok: bool
+    # Result or output of the operation.
+    data: Dict[str, Any] = field(default_factory=dict)
+    # Present only if ok is false.
+    error: Optional[ErrorInfo] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"ok": self.ok, "data": self.data, "error": self.error.to_dict() if self.error is not None else None}
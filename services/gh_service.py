@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from models.result import ToolResult, ErrorInfo
 from utils.process import run_cmd_blocking
+from utils.tracing import traced
 from utils import errors
 
 class GhService:
+    @traced("gh.create_pr", "repo_dir_abs", "base", "head")
     def create_pr(
         self,
         repo_dir_abs: str,
@@ -1,17 +1,93 @@
 from __future__ import annotations
 
+import base64
+import dataclasses
 import os
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from models.result import ToolResult, ErrorInfo
 from utils.paths import abspath, is_dir_empty
-from utils.process import run_cmd_blocking
+from utils.concurrency import map_in_threads
+from utils.git_parse import LOG_FORMAT, iter_cat_file_batch, parse_blame, parse_fetch_progress, parse_grep_line, parse_log_records, parse_ls_tree_entry, parse_push_porcelain, parse_submodule_status
+from utils.lru import LRUCache
+from utils.payload import diff_store, gzip_base64
+from utils.process import run_cmd_blocking, stream_cmd
+from utils.singleflight import single_flight
+from utils.timeouts import normalize_remote_url
+from utils.tracing import traced
 from utils.validate import validate_repo_dir
-from utils import errors
+from utils import diff_rules, errors
+from utils.diff_summary import parse_unified_zero, parser_for, summarize_file
+from utils.diff_rules import CHECK_ATTRS, LFS_POINTER_MAX_LINES, LFS_POINTER_OID_RE, looks_like_lfs_pointer, parse_check_attr, parse_numstat
+
+DIFF_ALGORITHMS = ("", "myers", "minimal", "patience", "histogram")
+PUSH_RECURSE_SUBMODULES = ("", "check", "on-demand", "only", "no")
+
+# (base_oid, head_oid) -> ahead/behind/merge-base. Commits are immutable, so entries never go stale.
+_compare_cache = LRUCache(maxsize=4096)
+# (repo, commit_oid, path, line range, include_text) -> blame ranges. Blame at a fixed commit never changes.
+_blame_cache = LRUCache(maxsize=256)
+# (repo, old_tree, new_tree or index stamp) -> per-file symbol summary. Trees are immutable, and
+# a rewritten index gets a new checksum, so each entry is computed once.
+_diff_summary_cache = LRUCache(maxsize=256)
+
+
+def _not_a_repo(repo_dir_abs: str) -> ToolResult:
+    return ToolResult(
+        ok=False,
+        error=ErrorInfo(
+            code=errors.NOT_A_GIT_REPO,
+            message="Not a git repository.",
+            hint="Pass the repository root folder (must contain .git).",
+            details={"repo_dir": repo_dir_abs},
+        ),
+    )
+
+
+def _invalid_input(message: str, **details) -> ToolResult:
+    return ToolResult(ok=False, error=ErrorInfo(code=errors.INVALID_INPUT, message=message, details=details))
+
+
+def _cmd_error(res, message: str, hint: Optional[str] = None) -> ToolResult:
+    code = errors.CMD_TIMEOUT if res.error == "timeout" else errors.CMD_FAILED
+    return ToolResult(ok=False, error=ErrorInfo(code=code, message=message, hint=hint, details=res.to_dict()))
+
+
+def _has_commit_graph(repo_dir_abs: str) -> bool:
+    info = os.path.join(repo_dir_abs, ".git", "objects", "info")
+    return os.path.isfile(os.path.join(info, "commit-graph")) or os.path.isdir(os.path.join(info, "commit-graphs"))
+
+
+def _index_stamp(index_path: str, hash_bytes: int) -> str:
+    """
+    Identity of the index file without writing anything: its trailing checksum
+    plus size and mtime (the checksum is all zeros with index.skipHash). Git
+    replaces the index by rename, so a read never sees a half-written file.
+    Empty if the index is missing (nothing staged yet) or unreadable.
+    """
+    try:
+        with open(index_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if st.st_size < hash_bytes:
+                return ""
+            f.seek(st.st_size - hash_bytes)
+            trailer = f.read(hash_bytes)
+    except OSError:
+        return ""
+    return f"index:{trailer.hex()}:{st.st_size}:{st.st_mtime_ns}"
 
 
 class GitService:
-    def clone(self, repo_url: str, dest_dir: str, timeout_sec: int = 60) -> ToolResult:
+    @traced("git.clone", "repo_url", "dest_dir")
+    def clone(
+        self,
+        repo_url: str,
+        dest_dir: str,
+        timeout_sec: int = 60,
+        recurse_submodules: bool = False,
+        submodule_jobs: int = 0,
+        shallow_submodules: bool = False,
+    ) -> ToolResult:
         dest_dir_abs = abspath(dest_dir)
         if os.path.exists(dest_dir_abs) and not os.path.isdir(dest_dir_abs):
             return ToolResult(
@@ -43,10 +119,20 @@ class GitService:
             "-c", "core.longpaths=true",
             "-c", "credential.interactive=never",
             "clone",
-            repo_url,
-            dest_dir_abs,
         ]
-        res = run_cmd_blocking(cmd, cwd=None, timeout_sec=timeout_sec, max_chars=4000)
+        if recurse_submodules:
+            cmd.append("--recurse-submodules")
+            # clone submodules in parallel (git's default is submodule.fetchJobs, usually 1)
+            if submodule_jobs > 0:
+                cmd.append(f"--jobs={submodule_jobs}")
+            if shallow_submodules:
+                cmd.append("--shallow-submodules")
+        cmd += [repo_url, dest_dir_abs]
+        # clones have no cwd; keep their adaptive timeout history per remote
+        res = run_cmd_blocking(
+            cmd, cwd=None, timeout_sec=timeout_sec, max_chars=4000,
+            timeout_key="clone:" + normalize_remote_url(repo_url) + (":submodules" if recurse_submodules else ""),
+        )
 
         if not res.ok:
             code = errors.CMD_TIMEOUT if res.error == "timeout" else errors.CMD_FAILED
@@ -60,19 +146,24 @@ class GitService:
                 ),
             )
 
-        return ToolResult(
-            ok=True,
-            data={
-                "repo_url": repo_url,
-                "dest_dir": dest_dir_abs,
-                "git_dir_exists": os.path.isdir(os.path.join(dest_dir_abs, ".git")),
-                "elapsed_sec": res.elapsed_sec,
-                "stdout": res.stdout,
-                "stderr": res.stderr,
-            },
-        )
+        data = {
+            "repo_url": repo_url,
+            "dest_dir": dest_dir_abs,
+            "git_dir_exists": os.path.isdir(os.path.join(dest_dir_abs, ".git")),
+            "elapsed_sec": res.elapsed_sec,
+            "stdout": res.stdout,
+            "stderr": res.stderr,
+        }
+        if recurse_submodules:
+            sub_res = run_cmd_blocking(
+                ["git", "submodule", "status", "--recursive"], cwd=dest_dir_abs, timeout_sec=timeout_sec, max_chars=2_000_000,
+            )
+            data["submodules"] = parse_submodule_status(sub_res.stdout) if sub_res.ok else []
+        return ToolResult(ok=True, data=data)
 
-    def status(self, repo_dir: str, timeout_sec: int = 30) -> ToolResult:
+    @traced("git.status", "repo_dir")
+    @single_flight
+    def status(self, repo_dir: str, timeout_sec: int = 30, submodules: bool = False, submodule_jobs: int = 8) -> ToolResult:
         ok, repo_dir_abs = validate_repo_dir(repo_dir)
         if not ok:
             return ToolResult(
@@ -97,8 +188,41 @@ class GitService:
                     details=res.to_dict()),
             )
 
-        return ToolResult(ok=True, data={"repo_dir": repo_dir_abs, "status_porcelain": res.stdout})
+        data = {"repo_dir": repo_dir_abs, "status_porcelain": res.stdout}
+        if submodules:
+            sub_res = run_cmd_blocking(
+                ["git", "submodule", "status", "--recursive"], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=2_000_000,
+            )
+            if not sub_res.ok:
+                return _cmd_error(sub_res, "git submodule status failed.")
+            subs = parse_submodule_status(sub_res.stdout)
+            map_in_threads(lambda sub: self._submodule_worktree_state(repo_dir_abs, sub, timeout_sec), subs, submodule_jobs)
+            data["submodules"] = subs
+            data["submodule_summary"] = {
+                "total": len(subs),
+                **{state: sum(1 for sub in subs if sub["state"] == state) for state in ("not_initialized", "commit_changed", "conflict")},
+                "dirty": sum(1 for sub in subs if sub.get("dirty")),
+            }
+        return ToolResult(ok=True, data=data)
+
+    def _submodule_worktree_state(self, repo_dir_abs: str, sub: Dict, timeout_sec: int) -> None:
+        """Add modified/untracked counts of a checked-out submodule (nested submodules are reported on their own)."""
+        if sub["state"] == "not_initialized":
+            return
+        res = run_cmd_blocking(
+            ["git", "status", "--porcelain", "--ignore-submodules=all"],
+            cwd=os.path.join(repo_dir_abs, sub["path"]), timeout_sec=timeout_sec, max_chars=2_000_000,
+        )
+        if not res.ok:
+            sub["error"] = res.stderr.strip()[:500]
+            return
+        lines = res.stdout.splitlines()
+        sub["untracked"] = sum(1 for line in lines if line.startswith("??"))
+        sub["modified"] = len(lines) - sub["untracked"]
+        sub["dirty"] = bool(lines)
 
+    @traced("git.diff", "repo_dir", "staged")
+    @single_flight
     def diff(
         self,
         repo_dir: str,
@@ -107,6 +231,16 @@ class GitService:
         stat: bool = False,
         max_chars: int = 20000,
         timeout_sec: int = 60,
+        output: str = "text",
+        max_bytes: int = 10_000_000,
+        summarize_noise: bool = False,
+        exclude_globs: Optional[List[str]] = None,
+        diff_algorithm: str = "",
+        rename_threshold: int = 50,
+        copy_threshold: int = 0,
+        find_copies_harder: bool = False,
+        rename_limit: int = 1000,
+        rename_budget_sec: float = 15.0,
     ) -> ToolResult:
         ok, repo_dir_abs = validate_repo_dir(repo_dir)
         if not ok:
@@ -119,16 +253,58 @@ class GitService:
                     details={"repo_dir": repo_dir_abs},
                     ),
             )
+        if diff_algorithm not in DIFF_ALGORITHMS:
+            return _invalid_input(f"diff_algorithm must be one of {', '.join(a for a in DIFF_ALGORITHMS if a)} (or empty).", diff_algorithm=diff_algorithm)
 
-        args = ["git", "diff"]
+        # diff.renameLimit caps the quadratic rename/copy matrix; beyond it git skips inexact detection
+        args = ["git", "-c", f"diff.renameLimit={rename_limit}", "diff"] if rename_limit else ["git", "diff"]
         if staged:
             args.append("--staged")
         if name_only:
             args.append("--name-only")
         if stat:
             args.append("--stat")
+        if diff_algorithm:
+            args.append(f"--diff-algorithm={diff_algorithm}")
+        if output != "text":
+            # binary-safe: raw bytes, never decoded; --binary keeps the patch applicable
+            args.append("--binary")
+
+        detect_renames = rename_threshold > 0 or copy_threshold > 0
+        rename_args: List[str] = []
+        if rename_threshold > 0:
+            rename_args.append(f"-M{rename_threshold}%")
+        if copy_threshold > 0:
+            rename_args.append(f"-C{copy_threshold}%")
+            if find_copies_harder:
+                rename_args.append("--find-copies-harder")
+        if not detect_renames:
+            rename_args.append("--no-renames")
 
-        res = run_cmd_blocking(args, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=max_chars)
+        pathspecs: List[str] = []
+        summarized: List[Dict] = []
+        if summarize_noise and not name_only and not stat:
+            summarized = self._noise_summaries(repo_dir_abs, staged, exclude_globs or [], timeout_sec)
+            if summarized:
+                pathspecs = ["--", *(f":(exclude,literal){f['path']}" for f in summarized)]
+
+        def run(opts: List[str], limit: float):
+            if output == "text":
+                return run_cmd_blocking(args + opts + pathspecs, cwd=repo_dir_abs, timeout_sec=limit, max_chars=max_chars)
+            return run_cmd_blocking(args + opts + pathspecs, cwd=repo_dir_abs, timeout_sec=limit, max_chars=max_bytes, binary=True)
+
+        # Rename/copy detection is the part that blows up on big refactors. Give it a
+        # budget, then redo the diff without it rather than time out the whole call.
+        # Only when a cheap name-status probe shows it can pair anything up: otherwise
+        # a diff that is merely big would be killed and run twice for nothing.
+        renames = "detected" if detect_renames else "off"
+        budgeted = detect_renames and 0 < rename_budget_sec < timeout_sec
+        if budgeted:
+            budgeted = self._renames_possible(repo_dir_abs, staged, pathspecs, copy_threshold > 0, find_copies_harder, timeout_sec)
+        res = run(rename_args, rename_budget_sec if budgeted else timeout_sec)
+        if budgeted and res.error == "timeout":
+            renames = "disabled_after_budget"
+            res = run(["--no-renames"], max(timeout_sec - rename_budget_sec, 1))
         if not res.ok:
             return ToolResult(
                 ok=False, 
@@ -140,19 +316,96 @@ class GitService:
                     )
                 )
 
-        return ToolResult(
-            ok=True,
-            data={
-                "repo_dir": repo_dir_abs,
-                "staged": staged,
-                "name_only": name_only,
-                "stat": stat,
-                "diff": res.stdout,
-                "stderr": res.stderr,
-                "truncated": bool(res.stdout_truncated),
-            },
-        )
+        data = {
+            "repo_dir": repo_dir_abs,
+            "staged": staged,
+            "name_only": name_only,
+            "stat": stat,
+            "stderr": res.stderr,
+            "truncated": bool(res.stdout_truncated),
+            "summarized_files": summarized,
+            "renames": renames,
+        }
+        if output == "text":
+            data["diff"] = res.stdout
+        else:
+            raw = res.stdout_bytes if res.stdout_bytes is not None else memoryview(b"")
+            data["diff_bytes"] = len(raw)
+            if output == "gzip_base64":
+                data["diff_gzip_base64"] = gzip_base64(raw)
+            else:
+                data["resource_uri"] = diff_store.put(raw)
+                data["mime_type"] = "text/x-diff"
+        return ToolResult(ok=True, data=data)
 
+    def _renames_possible(self, repo_dir_abs: str, staged: bool, pathspecs: List[str], copies: bool, copies_harder: bool, timeout_sec: int) -> bool:
+        """
+        Whether rename/copy detection could pair anything: renames need an added
+        and a deleted file, copies an added file and a source (a modified file,
+        or any file with --find-copies-harder). True if the probe fails.
+        """
+        args = ["git", "diff", "--name-status", "-z", "--no-renames"]
+        if staged:
+            args.append("--staged")
+        res = run_cmd_blocking(args + pathspecs, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=50_000_000)
+        if not res.ok or res.stdout_truncated:
+            return True
+        statuses = set(res.stdout.split("\x00")[0::2])
+        if "A" not in statuses:
+            return False
+        return "D" in statuses or (copies and ("M" in statuses or copies_harder))
+
+    def _noise_summaries(self, repo_dir_abs: str, staged: bool, extra_globs: List[str], timeout_sec: int) -> List[Dict]:
+        """
+        Changed files that should be reported as one-line summaries rather than
+        patches (see utils.diff_rules). Costs one numstat and one check-attr run,
+        plus a `-G` run only when a changed file looks like an LFS pointer. Best
+        effort: on any git error nothing is summarized and the diff is produced as before.
+        """
+        rules = diff_rules.rules()
+        base = ["git", "diff", "--staged"] if staged else ["git", "diff"]
+        numstat = run_cmd_blocking(base + ["--numstat", "-z", "--no-renames"], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=50_000_000)
+        if not numstat.ok:
+            return []
+        rows = parse_numstat(numstat.stdout)
+        if not rows:
+            return []
+
+        attrs: Dict[str, Dict[str, str]] = {}
+        if rules.use_attributes:
+            check = ["git", "check-attr", "-z"] + (["--cached"] if staged else []) + list(CHECK_ATTRS)
+            res = run_cmd_blocking(check + ["--", *(p for p, _, _ in rows)], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=50_000_000)
+            if res.ok:
+                attrs = parse_check_attr(res.stdout)
+
+        out: List[Dict] = []
+        pointer_candidates: List[str] = []
+        for path, added, deleted in rows:
+            reason = rules.classify(path, added, deleted, attrs.get(path, {}), extra_globs)
+            if reason:
+                out.append({"path": path, "reason": reason, "added": added, "deleted": deleted})
+            elif (
+                rules.detect_lfs_pointers and added is not None and deleted is not None
+                and 0 < added <= LFS_POINTER_MAX_LINES and deleted <= LFS_POINTER_MAX_LINES
+                # most small edits are not pointers; only confirm files that look like one on disk
+                and looks_like_lfs_pointer(os.path.join(repo_dir_abs, path))
+            ):
+                pointer_candidates.append(path)
+
+        # LFS pointers committed without filter=lfs in .gitattributes (e.g. a missing/partial setup)
+        if pointer_candidates:
+            res = run_cmd_blocking(
+                base + ["--name-only", "-z", f"-G{LFS_POINTER_OID_RE}", "--", *(f":(literal){p}" for p in pointer_candidates)],
+                cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=50_000_000,
+            )
+            if res.ok:
+                counts = {p: (a, d) for p, a, d in rows}
+                for path in filter(None, res.stdout.split("\x00")):
+                    if path in counts:
+                        out.append({"path": path, "reason": "lfs pointer", "added": counts[path][0], "deleted": counts[path][1]})
+        return out
+
+    @traced("git.commit", "repo_dir")
     def commit(self, repo_dir: str, message: str, timeout_sec: int = 60) -> ToolResult:
         ok, repo_dir_abs = validate_repo_dir(repo_dir)
         if not ok:
@@ -172,7 +425,7 @@ class GitService:
                 error=ErrorInfo(
                     code=errors.CMD_FAILED,
                     message="git status failed.",
-                    details=status_res,
+                    details=status_res.to_dict(),
                     )
                 )
 
@@ -190,7 +443,7 @@ class GitService:
                     code=errors.CMD_FAILED,
                     message="git add failed.", 
                     hint="Check file permissions and repo state. See stderr for details.",
-                    details=add_res,
+                    details=add_res.to_dict(),
                     )
                 )
 
@@ -207,7 +460,7 @@ class GitService:
                     code=errors.CMD_FAILED,
                     message="git commit failed.",
                     hint="Common causes: missing user.name/user.email, hooks failing, or no staged changes. Check stderr.",
-                    details=commit_res,
+                    details=commit_res.to_dict(),
                     )
                 )
 
@@ -216,12 +469,14 @@ class GitService:
             data={"repo_dir": repo_dir_abs, "message": "Commit created successfully.", "stdout": commit_res.stdout, "stderr": commit_res.stderr}
             )
 
+    @traced("git.current_branch", "repo_dir_abs")
     def current_branch(self, repo_dir_abs: str, timeout_sec: int = 20) -> Optional[str]:
         res = run_cmd_blocking(["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=2000)
         if not res.ok:
             return None
         return (res.stdout or "").strip()
 
+    @traced("git.has_upstream", "repo_dir_abs")
     def has_upstream(self, repo_dir_abs: str, timeout_sec: int = 10) -> bool:
         res = run_cmd_blocking(
             ["git", "rev-parse", "--abbrev-ref", "--symbolic-full-name", "@{u}"],
@@ -231,6 +486,7 @@ class GitService:
         )
         return bool(res.ok)
 
+    @traced("git.push", "repo_dir", "remote", "branch")
     def push(
         self,
         repo_dir: str,
@@ -238,6 +494,7 @@ class GitService:
         branch: str = "",
         set_upstream: bool = False,
         timeout_sec: int = 60,
+        recurse_submodules: str = "",
     ) -> ToolResult:
         ok, repo_dir_abs = validate_repo_dir(repo_dir)
         if not ok:
@@ -263,9 +520,15 @@ class GitService:
                         )
                     )
 
+        if recurse_submodules not in PUSH_RECURSE_SUBMODULES:
+            return _invalid_input("Unknown recurse_submodules mode.", recurse_submodules=recurse_submodules, allowed=list(PUSH_RECURSE_SUBMODULES))
+
         args = ["git", "push"]
         if set_upstream:
             args.append("-u")
+        if recurse_submodules:
+            # check: refuse if a submodule commit is not on its remote; on-demand: push those submodules first
+            args.append(f"--recurse-submodules={recurse_submodules}")
         args += [remote, branch]
 
         res = run_cmd_blocking(args, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=4000)
@@ -288,3 +551,680 @@ class GitService:
                 "branch": branch, **res.to_dict()
                 }
             )
+
+    @traced("git.log", "repo_dir", "rev_range")
+    @single_flight
+    def log(
+        self,
+        repo_dir: str,
+        rev_range: str = "",
+        paths: Optional[List[str]] = None,
+        author: str = "",
+        since: str = "",
+        until: str = "",
+        max_count: int = 50,
+        cursor: str = "",
+        write_commit_graph: bool = False,
+        timeout_sec: int = 60,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+
+        if rev_range.startswith("-"):
+            return _invalid_input("rev_range must be a revision or range, not an option.", rev_range=rev_range)
+        try:
+            skip = int(cursor) if cursor else 0
+        except ValueError:
+            return _invalid_input("Invalid cursor. Pass data.next_cursor from a previous call.", cursor=cursor)
+
+        # Path-limited walks are only fast with commit-graph changed-path (Bloom) filters.
+        graph_written = False
+        if write_commit_graph and not _has_commit_graph(repo_dir_abs):
+            graph_res = run_cmd_blocking(
+                ["git", "commit-graph", "write", "--reachable", "--changed-paths"],
+                cwd=repo_dir_abs,
+                timeout_sec=timeout_sec,
+                max_chars=2000,
+            )
+            graph_written = graph_res.ok
+
+        # one extra record tells us whether there is another page
+        args = [
+            "git", "-c", "core.commitGraph=true", "log", "-z",
+            f"--format={LOG_FORMAT}",
+            f"--max-count={max_count + 1}",
+            f"--skip={skip}",
+        ]
+        if author:
+            args.append(f"--author={author}")
+        if since:
+            args.append(f"--since={since}")
+        if until:
+            args.append(f"--until={until}")
+        args.append("--end-of-options")
+        if rev_range:
+            args.append(rev_range)
+        args.append("--")
+        args += list(paths or [])
+
+        res = run_cmd_blocking(args, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=5_000_000)
+        if not res.ok:
+            return _cmd_error(res, "git log failed.", "Check rev_range and paths. An empty repository has no history.")
+
+        commits = parse_log_records(res.stdout)
+        has_more = len(commits) > max_count
+        commits = commits[:max_count]
+        return ToolResult(
+            ok=True,
+            data={
+                "repo_dir": repo_dir_abs,
+                "commits": commits,
+                "count": len(commits),
+                "next_cursor": str(skip + len(commits)) if has_more else "",
+                "commit_graph": _has_commit_graph(repo_dir_abs),
+                "commit_graph_written": graph_written,
+            },
+        )
+
+    def _resolve_commits(self, repo_dir_abs: str, refs: List[str], timeout_sec: int, peel: str = "commit") -> Dict[str, Optional[str]]:
+        """Resolve refs to commit (or `peel`) oids with one rev-parse; fall back to one call per ref on error."""
+        specs = [f"{r}^{{{peel}}}" for r in refs]
+        res = run_cmd_blocking(["git", "rev-parse", "--end-of-options", *specs], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=200000)
+        if res.ok:
+            # without --verify, rev-parse echoes --end-of-options back
+            oids = [o for o in res.stdout.split() if o != "--end-of-options"]
+            if len(oids) == len(refs):
+                return dict(zip(refs, oids))
+        out: Dict[str, Optional[str]] = {}
+        for ref, spec in zip(refs, specs):
+            one = run_cmd_blocking(["git", "rev-parse", "--verify", "--quiet", "--end-of-options", spec], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=200)
+            out[ref] = one.stdout.strip() if one.ok else None
+        return out
+
+    @traced("git.compare_branches", "repo_dir")
+    @single_flight
+    def compare_branches(self, repo_dir: str, pairs: List[Tuple[str, str]], timeout_sec: int = 60) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+
+        pairs = [(base, head or "HEAD") for base, head in pairs]
+        refs = sorted({r for pair in pairs for r in pair})
+        if any(r.startswith("-") for r in refs):
+            return _invalid_input("Refs must not start with '-'.", refs=refs)
+        oids = self._resolve_commits(repo_dir_abs, refs, timeout_sec)
+
+        results = []
+        for base, head in pairs:
+            item = {"base": base, "head": head, "base_oid": oids.get(base), "head_oid": oids.get(head)}
+            if not item["base_oid"] or not item["head_oid"]:
+                item["error"] = "unknown revision"
+                results.append(item)
+                continue
+
+            key = (item["base_oid"], item["head_oid"])
+            cached = _compare_cache.get(key)
+            if cached is None:
+                mirrored = _compare_cache.get((key[1], key[0]))
+                if mirrored is not None:
+                    cached = {**mirrored, "ahead": mirrored["behind"], "behind": mirrored["ahead"]}
+            if cached is None:
+                counts = run_cmd_blocking(
+                    ["git", "rev-list", "--left-right", "--count", f"{key[0]}...{key[1]}"],
+                    cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=200,
+                )
+                if not counts.ok:
+                    return _cmd_error(counts, "git rev-list failed.")
+                behind, ahead = (int(x) for x in counts.stdout.split())
+                mb = run_cmd_blocking(["git", "merge-base", key[0], key[1]], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=200)
+                # exit code 1 with no output: unrelated histories
+                cached = {"ahead": ahead, "behind": behind, "merge_base": mb.stdout.strip() if mb.ok else None}
+                _compare_cache.put(key, cached)
+                item["cached"] = False
+            else:
+                item["cached"] = True
+
+            item.update(cached)
+            item["fully_merged"] = cached["ahead"] == 0
+            item["up_to_date"] = cached["behind"] == 0
+            results.append(item)
+
+        return ToolResult(ok=True, data={"repo_dir": repo_dir_abs, "results": results})
+
+    @traced("git.fetch", "repo_dir", "remote")
+    def fetch(
+        self,
+        repo_dir: str,
+        remote: str = "origin",
+        refspecs: Optional[List[str]] = None,
+        no_tags: bool = False,
+        negotiation_tips: Optional[List[str]] = None,
+        prune: bool = False,
+        depth: int = 0,
+        submodule_jobs: int = 0,
+        timeout_sec: int = 120,
+        keep_pack: bool = False,
+    ) -> ToolResult:
+        """
+        bytes_received is read from git's "Receiving objects" progress line,
+        which index-pack prints when the fetched objects are kept as a pack.
+        Fetches below fetch.unpackLimit (100 objects by default) are exploded
+        into loose objects without a size, so bytes_received is None for them.
+        keep_pack=True sets fetch.unpackLimit=1 for this fetch: every non-empty
+        fetch is stored as a pack and reports its size, at the cost of more
+        small packs in the repository until git gc/maintenance repacks them.
+        """
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+
+        refspecs = list(refspecs or [])
+        negotiation_tips = list(negotiation_tips or [])
+        if any(x.startswith("-") for x in [remote, *refspecs, *negotiation_tips]):
+            return _invalid_input("remote, refspecs and negotiation tips must not start with '-'.")
+
+        args = ["git"]
+        if keep_pack:
+            args += ["-c", "fetch.unpackLimit=1"]
+        if submodule_jobs > 0:
+            args += ["-c", f"fetch.parallel={submodule_jobs}"]
+        args += ["fetch", "--progress"]
+        if no_tags:
+            args.append("--no-tags")
+        if prune:
+            args.append("--prune")
+        if depth > 0:
+            args.append(f"--depth={depth}")
+        # only advertise these tips during negotiation: far fewer "have" lines on repos with many refs
+        args += [f"--negotiation-tip={tip}" for tip in negotiation_tips]
+        if submodule_jobs > 0:
+            args.append("--recurse-submodules=on-demand")
+        args += ["--end-of-options", remote, *refspecs]
+
+        # progress redraws can be long; they are collapsed before the stderr is returned
+        res = run_cmd_blocking(args, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=1_000_000)
+        stderr, bytes_received = parse_fetch_progress(res.stderr)
+        res = dataclasses.replace(res, stderr=stderr[:8000], stderr_truncated=res.stderr_truncated or len(stderr) > 8000)
+        if not res.ok:
+            return _cmd_error(
+                res, "git fetch failed.",
+                "Check the remote name/URL and credentials. This tool is non-interactive (no prompts).",
+            )
+
+        return ToolResult(
+            ok=True,
+            data={
+                "repo_dir": repo_dir_abs,
+                "remote": remote,
+                "refspecs": refspecs,
+                "bytes_received": bytes_received,
+                "elapsed_sec": res.elapsed_sec,
+                "stdout": res.stdout,
+                "stderr": res.stderr,
+            },
+        )
+
+    @traced("git.fetch_many")
+    def fetch_many(self, repo_dirs: List[str], max_parallel: int = 4, **fetch_kwargs) -> ToolResult:
+        """Fetch several repositories with bounded parallelism; one result per repo, in order."""
+        results = map_in_threads(lambda d: self.fetch(d, **fetch_kwargs), repo_dirs, max_parallel)
+        items = [{"repo_dir": d, **r.to_dict()} for d, r in zip(repo_dirs, results)]
+        return ToolResult(
+            ok=True,
+            data={
+                "results": items,
+                "succeeded": sum(1 for r in results if r.ok),
+                "failed": sum(1 for r in results if not r.ok),
+                "bytes_received": sum((r.data.get("bytes_received") or 0) for r in results if r.ok),
+            },
+        )
+
+    def _push_one_remote(self, repo_dir_abs: str, remote: str, refspecs: List[str], atomic: bool, set_upstream: bool, timeout_sec: int) -> Dict:
+        # one invocation (one connection) per remote carries every refspec
+        args = ["git", "push", "--porcelain"]
+        if atomic:
+            args.append("--atomic")
+        if set_upstream:
+            args.append("-u")
+        args += ["--end-of-options", remote, *refspecs]
+        res = run_cmd_blocking(args, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=20000)
+        refs = parse_push_porcelain(res.stdout)
+        item = {
+            "remote": remote,
+            "ok": res.ok,
+            "refs": refs,
+            "rejected": [r["dst"] for r in refs if r["status"] == "rejected"],
+            "elapsed_sec": res.elapsed_sec,
+            "stderr": res.stderr,
+        }
+        if not res.ok:
+            item["error"] = errors.CMD_TIMEOUT if res.error == "timeout" else errors.CMD_FAILED
+        return item
+
+    @traced("git.push_multi", "repo_dir")
+    def push_multi(
+        self,
+        repo_dir: str,
+        remotes: List[str],
+        refspecs: List[str],
+        atomic: bool = True,
+        set_upstream: bool = False,
+        timeout_sec: int = 60,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        if not remotes or not refspecs:
+            return _invalid_input("At least one remote and one refspec are required.")
+        if any(x.startswith("-") for x in [*remotes, *refspecs]):
+            return _invalid_input("Remotes and refspecs must not start with '-'.")
+
+        results = map_in_threads(
+            lambda remote: self._push_one_remote(repo_dir_abs, remote, refspecs, atomic, set_upstream, timeout_sec),
+            remotes,
+            len(remotes),
+        )
+        data = {"repo_dir": repo_dir_abs, "atomic": atomic, "refspecs": refspecs, "remotes": results}
+        failed = [r["remote"] for r in results if not r["ok"]]
+        if failed:
+            return ToolResult(
+                ok=False,
+                error=ErrorInfo(
+                    code=errors.CMD_FAILED,
+                    message=f"git push failed for remote(s): {', '.join(failed)}.",
+                    hint="With atomic=true a remote either accepts every ref or none. See details.remotes[].refs for per-ref status.",
+                    details=data,
+                ),
+            )
+        return ToolResult(ok=True, data=data)
+
+    @traced("git.grep", "repo_dir", "rev")
+    @single_flight
+    def grep(
+        self,
+        repo_dir: str,
+        pattern: str,
+        rev: str = "",
+        pathspecs: Optional[List[str]] = None,
+        ignore_case: bool = False,
+        fixed_strings: bool = False,
+        word: bool = False,
+        max_results: int = 200,
+        cursor: str = "",
+        threads: int = 0,
+        timeout_sec: int = 60,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        if rev.startswith("-"):
+            return _invalid_input("rev must be a revision, not an option.", rev=rev)
+        try:
+            skip = int(cursor) if cursor else 0
+        except ValueError:
+            return _invalid_input("Invalid cursor. Pass data.next_cursor from a previous call.", cursor=cursor)
+
+        args = ["git", "grep", "-z", "-n", "--column", "-I", "--no-color", f"--threads={threads or os.cpu_count() or 1}"]
+        if ignore_case:
+            args.append("-i")
+        if word:
+            args.append("-w")
+        args.append("-F" if fixed_strings else "-E")
+        args += ["-e", pattern]
+        if rev:
+            args.append(rev)
+        args.append("--")
+        args += list(pathspecs or [])
+
+        # stream and stop git as soon as this page (plus one look-ahead match) is complete
+        matches = []
+        wanted = skip + max_results + 1
+        seen = 0
+        with stream_cmd(args, cwd=repo_dir_abs, timeout_sec=timeout_sec) as stream:
+            for line in stream.lines():
+                m = parse_grep_line(line, rev)
+                if not m:
+                    continue
+                seen += 1
+                if seen > skip:
+                    matches.append(m)
+                if seen >= wanted:
+                    break
+        res = stream.result
+
+        # exit code 1 means "no match"
+        if not res.ok and not (res.code == 1 and not res.error):
+            return _cmd_error(res, "git grep failed.", "Check the pattern syntax, rev and pathspecs.")
+
+        has_more = len(matches) > max_results
+        matches = matches[:max_results]
+        return ToolResult(
+            ok=True,
+            data={
+                "repo_dir": repo_dir_abs,
+                "rev": rev,
+                "matches": matches,
+                "count": len(matches),
+                "next_cursor": str(skip + len(matches)) if has_more else "",
+                "elapsed_sec": res.elapsed_sec,
+            },
+        )
+
+    @traced("git.blame", "repo_dir", "path", "rev")
+    @single_flight
+    def blame(
+        self,
+        repo_dir: str,
+        path: str,
+        rev: str = "HEAD",
+        start_line: int = 0,
+        end_line: int = 0,
+        include_text: bool = False,
+        timeout_sec: int = 60,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        if not rev or rev.startswith("-"):
+            return _invalid_input("rev must be a revision, not an option.", rev=rev)
+        if start_line < 0 or end_line < 0 or (end_line and end_line < max(start_line, 1)):
+            return _invalid_input("Invalid line range.", start_line=start_line, end_line=end_line)
+
+        commit = self._resolve_commits(repo_dir_abs, [rev], timeout_sec).get(rev)
+        if not commit:
+            return _invalid_input("Unknown revision.", rev=rev)
+
+        key = (repo_dir_abs, commit, path, start_line, end_line, include_text)
+        cached = _blame_cache.get(key)
+        hit = cached is not None
+        if not hit:
+            # --incremental is much smaller when the line text is not needed
+            args = ["git", "blame", "--porcelain" if include_text else "--incremental"]
+            if start_line or end_line:
+                args += ["-L", f"{start_line or 1},{end_line or ''}"]
+            args += [commit, "--", path]
+            res = run_cmd_blocking(args, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=50_000_000)
+            if not res.ok:
+                return _cmd_error(res, "git blame failed.", "Check that path exists at rev and the line range is inside the file.")
+            ranges, commits = parse_blame(res.stdout)
+            if not include_text:
+                for r in ranges:
+                    del r["text"]
+            cached = {"ranges": ranges, "commits": commits}
+            _blame_cache.put(key, cached)
+
+        return ToolResult(
+            ok=True,
+            data={
+                "repo_dir": repo_dir_abs,
+                "path": path,
+                "rev": rev,
+                "commit": commit,
+                **cached,
+                "cached": hit,
+            },
+        )
+
+    @traced("git.show_file", "repo_dir", "path", "rev")
+    @single_flight
+    def show_file(
+        self,
+        repo_dir: str,
+        path: str,
+        rev: str = "HEAD",
+        offset: int = 0,
+        max_bytes: int = 200_000,
+        timeout_sec: int = 60,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        if not rev or rev.startswith("-"):
+            return _invalid_input("rev must be a revision, not an option.", rev=rev)
+        if offset < 0 or max_bytes < 1:
+            return _invalid_input("offset must be >= 0 and max_bytes >= 1.", offset=offset, max_bytes=max_bytes)
+
+        # the object spec goes over stdin, so nothing in rev/path is parsed as an option
+        check = run_cmd_blocking(
+            ["git", "cat-file", "--batch-check"], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=500,
+            input_bytes=f"{rev}:{path}\n".encode("utf-8"),
+        )
+        if not check.ok:
+            return _cmd_error(check, "git cat-file failed.")
+        parts = check.stdout.split()
+        if len(parts) != 3:
+            return _invalid_input("Path does not exist at this revision.", path=path, rev=rev)
+        oid, otype, size = parts[0], parts[1], int(parts[2])
+        if otype != "blob":
+            return _invalid_input(f"Path is a {otype}, not a file. Use git_ls_tree to list directories.", path=path, rev=rev)
+
+        # read only what is needed (binary sniffing looks at the first 8000 bytes, like git)
+        want = min(size, max(offset + max_bytes, 8000))
+        buf = bytearray()
+        with stream_cmd(["git", "cat-file", "blob", oid], cwd=repo_dir_abs, timeout_sec=timeout_sec) as stream:
+            for chunk in stream.chunks():
+                buf += chunk
+                if len(buf) >= want:
+                    break
+        if not stream.result.ok:
+            return _cmd_error(stream.result, "git cat-file failed.")
+
+        binary = b"\x00" in buf[:8000]
+        content = bytes(buf[offset:offset + max_bytes])
+        return ToolResult(
+            ok=True,
+            data={
+                "repo_dir": repo_dir_abs,
+                "path": path,
+                "rev": rev,
+                "oid": oid,
+                "size": size,
+                "offset": offset,
+                "returned_bytes": len(content),
+                "truncated": offset + len(content) < size,
+                "binary": binary,
+                "encoding": "base64" if binary else "utf-8",
+                "content": base64.b64encode(content).decode("ascii") if binary else content.decode("utf-8", errors="replace"),
+            },
+        )
+
+    @traced("git.ls_tree", "repo_dir", "rev")
+    @single_flight
+    def ls_tree(
+        self,
+        repo_dir: str,
+        rev: str = "HEAD",
+        path: str = "",
+        recursive: bool = False,
+        max_entries: int = 500,
+        cursor: str = "",
+        timeout_sec: int = 60,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        if not rev or rev.startswith("-"):
+            return _invalid_input("rev must be a revision, not an option.", rev=rev)
+        try:
+            skip = int(cursor) if cursor else 0
+        except ValueError:
+            return _invalid_input("Invalid cursor. Pass data.next_cursor from a previous call.", cursor=cursor)
+
+        args = ["git", "ls-tree", "-z", "-l"]
+        if recursive:
+            args.append("-r")
+        # ls-tree takes no "--": everything after the tree-ish is a path
+        args += ["--end-of-options", rev]
+        if path:
+            path = path.rstrip("/")
+            kind = run_cmd_blocking(["git", "cat-file", "-t", f"{rev}:{path}"], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=200)
+            if not kind.ok:
+                return _invalid_input("path does not exist in rev.", rev=rev, path=path)
+            # a trailing slash lists a directory's contents rather than the directory entry;
+            # any other path (file, symlink) is listed as its own single entry
+            args.append(path + "/" if kind.stdout.strip() == "tree" else path)
+
+        # stream and stop git once this page (plus one look-ahead entry) is complete
+        entries = []
+        wanted = skip + max_entries + 1
+        seen = 0
+        pending = b""
+        with stream_cmd(args, cwd=repo_dir_abs, timeout_sec=timeout_sec) as stream:
+            for chunk in stream.chunks():
+                *records, pending = (pending + chunk).split(b"\x00")
+                for rec in records:
+                    entry = parse_ls_tree_entry(rec)
+                    if not entry:
+                        continue
+                    seen += 1
+                    if seen > skip:
+                        entries.append(entry)
+                if seen >= wanted:
+                    break
+        res = stream.result
+        if not res.ok:
+            return _cmd_error(res, "git ls-tree failed.", "Check that rev exists.")
+
+        has_more = len(entries) > max_entries
+        entries = entries[:max_entries]
+        return ToolResult(
+            ok=True,
+            data={
+                "repo_dir": repo_dir_abs,
+                "rev": rev,
+                "path": path,
+                "entries": entries,
+                "count": len(entries),
+                "next_cursor": str(skip + len(entries)) if has_more else "",
+            },
+        )
+
+    def _blob_sizes(self, repo_dir_abs: str, oids: List[str], timeout_sec: int) -> Dict[str, int]:
+        """Sizes of the given blobs (one cat-file --batch-check call); missing oids and non-blobs are left out."""
+        if not oids:
+            return {}
+        res = run_cmd_blocking(
+            ["git", "cat-file", "--batch-check"], cwd=repo_dir_abs, timeout_sec=timeout_sec,
+            max_chars=len(oids) * 80, input_bytes="".join(f"{o}\n" for o in oids).encode(),
+        )
+        sizes = {}
+        for line in res.stdout.splitlines():
+            parts = line.split()
+            if len(parts) == 3 and parts[1] == "blob":
+                sizes[parts[0]] = int(parts[2])
+        return sizes
+
+    def _read_blobs(self, repo_dir_abs: str, oids: List[str], timeout_sec: int, max_bytes: int = 2_000_000) -> Dict[str, str]:
+        """
+        Text of the given blobs. Sizes are checked first, so blobs over max_bytes
+        are never read and cannot crowd the others out of the output cap.
+        """
+        sizes = self._blob_sizes(repo_dir_abs, oids, timeout_sec)
+        wanted = [o for o in oids if 0 <= sizes.get(o, -1) <= max_bytes]
+        if not wanted:
+            return {}
+        res = run_cmd_blocking(
+            ["git", "cat-file", "--batch"], cwd=repo_dir_abs, timeout_sec=timeout_sec,
+            max_chars=sum(sizes[o] + 100 for o in wanted), binary=True, input_bytes="".join(f"{o}\n" for o in wanted).encode(),
+        )
+        if not res.ok:
+            return {}
+        out: Dict[str, str] = {}
+        try:
+            for oid, content in iter_cat_file_batch(res.stdout_bytes):
+                out[oid] = bytes(content).decode("utf-8", errors="replace")
+        except ValueError:
+            # cut short: keep the blobs that arrived whole, the rest fall back to hunk headers
+            pass
+        return out
+
+    @traced("git.diff_summary", "repo_dir", "staged")
+    @single_flight
+    def diff_summary(
+        self,
+        repo_dir: str,
+        staged: bool = False,
+        base: str = "",
+        head: str = "",
+        max_files: int = 500,
+        timeout_sec: int = 60,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        if bool(base) != bool(head):
+            return _invalid_input("Pass both base and head, or neither.", base=base, head=head)
+        if base.startswith("-") or head.startswith("-"):
+            return _invalid_input("base/head must be revisions, not options.", base=base, head=head)
+
+        # Work out what is compared. Two revisions are identified by their trees; the index
+        # by HEAD's tree plus the index file's own checksum (no write-tree: this call is
+        # read-only). The working tree has no stable identity, so it is never cached.
+        old_tree = new_tree = ""
+        key = None
+        if base:
+            trees = self._resolve_commits(repo_dir_abs, [base, head], timeout_sec, peel="tree")
+            old_tree, new_tree = trees.get(base) or "", trees.get(head) or ""
+            if not old_tree or not new_tree:
+                return _invalid_input("Unknown revision.", base=base, head=head)
+            key = (repo_dir_abs, old_tree, new_tree)
+        elif staged:
+            res = run_cmd_blocking(
+                ["git", "rev-parse", "--git-path", "index", "HEAD^{tree}"], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=4000,
+            )
+            lines = res.stdout.splitlines() if res.ok else []
+            if len(lines) == 2:
+                old_tree = lines[1].strip()
+                stamp = _index_stamp(os.path.join(repo_dir_abs, lines[0].strip()), len(old_tree) // 2)
+                if stamp:
+                    key = (repo_dir_abs, old_tree, stamp)
+
+        files = _diff_summary_cache.get(key) if key else None
+        cached = files is not None
+        if not cached:
+            args = ["git", "-c", "core.quotePath=false", "diff", "-U0", "--full-index", "--no-color", "--no-ext-diff", "-M"]
+            if base:
+                args += [old_tree, new_tree]
+            elif staged:
+                args.append("--staged")
+            res = run_cmd_blocking(args, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=200_000_000)
+            if not res.ok:
+                return _cmd_error(res, "git diff failed.", "If the repo has no commits yet, try committing first.")
+            parsed = parse_unified_zero(res.stdout)
+
+            # Fetch both sides of files that have a symbol parser; new working-tree content comes from disk.
+            worktree = not base and not staged
+            wanted = [f for f in parsed if parser_for(f["path"]) and not f["binary"]]
+            oids = {o for f in wanted for o in (f["old_oid"], f["new_oid"]) if o and o.strip("0")}
+            blobs = self._read_blobs(repo_dir_abs, sorted(oids), timeout_sec)
+            files = []
+            for f in parsed:
+                old_src = blobs.get(f["old_oid"]) if f["status"] != "added" else None
+                new_src = blobs.get(f["new_oid"]) if f["status"] != "deleted" else None
+                # the working-tree side is not in the object store (git only hashes it for the index line)
+                if worktree and f in wanted and f["status"] != "deleted":
+                    try:
+                        with open(os.path.join(repo_dir_abs, f["path"]), "r", encoding="utf-8", errors="replace") as fh:
+                            new_src = fh.read()
+                    except OSError:
+                        new_src = None
+                files.append(summarize_file(f, old_src, new_src))
+            if key:
+                _diff_summary_cache.put(key, files)
+
+        return ToolResult(
+            ok=True,
+            data={
+                "repo_dir": repo_dir_abs,
+                "staged": staged,
+                "base_tree": old_tree,
+                "head_tree": new_tree,
+                "files": files[:max_files],
+                "file_count": len(files),
+                "added": sum(f["added"] for f in files),
+                "deleted": sum(f["deleted"] for f in files),
+                "truncated": len(files) > max_files,
+                "cached": cached,
+            },
+        )
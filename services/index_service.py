@@ -0,0 +1,430 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.result import ToolResult
+from services.git_service import GitService, _cmd_error, _invalid_input, _not_a_repo
+from utils.git_parse import iter_cat_file_batch, parse_ls_tree_entry
+from utils.process import run_cmd_blocking
+from utils.tracing import span, traced
+from utils.validate import validate_repo_dir
+
+INDEX_VERSION = 2
+INDEX_DIR = "mcp-index"
+INDEX_FILE = "trigrams.json.gz"
+
+# Larger blobs are not indexed; their paths are kept in `unindexed` and always verified by git grep.
+MAX_FILE_BYTES = 1_000_000
+CAT_FILE_BATCH = 1000
+# Above this many candidate files the pathspec list stops paying off; grep everything.
+MAX_VERIFY_PATHS = 2000
+# Rebuild from scratch once most indexed blobs are no longer referenced by the tree.
+STALE_REBUILD_RATIO = 0.5
+
+
+def trigrams(data: bytes) -> Set[bytes]:
+    """Case-folded (ASCII) byte trigrams of a blob."""
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+# ERE metacharacters that a backslash makes literal; any other escape (\d, \t, \<, \w ...) is
+# dialect-specific, so the scanner gives up on it rather than guess how git's regex engine reads it.
+_ERE_SPECIALS = set(".[]()*+?{}|^$\\")
+_INTERVAL = re.compile(r"\{(\d+)(,\d*)?\}")
+
+
+def required_literals(pattern: str, fixed_strings: bool = False) -> List[str]:
+    """
+    Literal substrings every match of POSIX ERE `pattern` (as git grep -E
+    reads it) must contain. Only plain concatenations count: a quantifier
+    drops the character it applies to, groups, `.` and anchors end a run, and
+    alternation, bracket expressions or unknown escapes give up entirely
+    (an empty result means "no filtering"), so the result is always safe.
+    """
+    if fixed_strings:
+        return [pattern]
+
+    runs: List[str] = []
+    cur: List[str] = []
+    prev_atom = False
+    i, n = 0, len(pattern)
+
+    def flush() -> None:
+        if cur:
+            runs.append("".join(cur))
+            cur.clear()
+
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            if i + 1 >= n or pattern[i + 1] not in _ERE_SPECIALS:
+                return []
+            cur.append(pattern[i + 1])
+            prev_atom = True
+            i += 2
+        elif c in "[|":
+            return []
+        elif c in "*+?{":
+            if not prev_atom:
+                return []
+            if c == "{":
+                m = _INTERVAL.match(pattern, i)
+                if not m:
+                    return []
+                i = m.end()
+            else:
+                i += 1
+            # the repeated atom may be optional (or repeated): it ends the run and is not required
+            if cur:
+                cur.pop()
+            flush()
+            prev_atom = False
+        elif c == "(":
+            # groups are opaque: find the closing parenthesis and treat the group as one atom
+            flush()
+            depth, j = 0, i
+            while j < n:
+                ch = pattern[j]
+                if ch == "\\":
+                    j += 2
+                    continue
+                if ch == "[":
+                    return []
+                depth += ch == "("
+                depth -= ch == ")"
+                j += 1
+                if depth == 0:
+                    break
+            if depth:
+                return []
+            i = j
+            prev_atom = True
+        elif c in ".^$)":
+            if c == ")":
+                return []
+            flush()
+            prev_atom = c == "."
+            i += 1
+        else:
+            cur.append(c)
+            prev_atom = True
+            i += 1
+    flush()
+    return [r for r in runs if len(r.encode("utf-8")) >= 3]
+
+
+class TrigramIndex:
+    """
+    Per-repo trigram -> blob postings, persisted under .git/mcp-index/.
+    Blobs get integer ids in insertion order, so appending keeps posting lists
+    sorted. Blobs that drop out of the tree stay in the postings and are
+    filtered through `paths` at query time; the index is rebuilt once they
+    dominate. Text files too large to index are listed in `unindexed` and are
+    candidates for every query.
+    """
+
+    def __init__(self):
+        self.commit = ""
+        self.tree = ""
+        self.blobs: List[str] = []
+        self.blob_ids: Dict[str, int] = {}
+        self.paths: Dict[str, int] = {}
+        self.unindexed: Set[str] = set()
+        self.postings: Dict[str, List[int]] = {}
+
+    @classmethod
+    def load(cls, path: str) -> Optional["TrigramIndex"]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if raw.get("version") != INDEX_VERSION:
+            return None
+        idx = cls()
+        idx.commit, idx.tree = raw["commit"], raw["tree"]
+        idx.blobs = raw["blobs"]
+        idx.blob_ids = {oid: i for i, oid in enumerate(idx.blobs)}
+        idx.paths = raw["paths"]
+        idx.unindexed = set(raw["unindexed"])
+        idx.postings = raw["postings"]
+        return idx
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "commit": self.commit,
+                "tree": self.tree,
+                "blobs": self.blobs,
+                "paths": self.paths,
+                "unindexed": sorted(self.unindexed),
+                "postings": self.postings,
+            }, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def stale_ratio(self) -> float:
+        if not self.blobs:
+            return 0.0
+        return 1.0 - len(set(self.paths.values())) / len(self.blobs)
+
+    def add_blob(self, oid: str, data: bytes) -> int:
+        bid = self.blob_ids.get(oid)
+        if bid is not None:
+            return bid
+        bid = len(self.blobs)
+        self.blobs.append(oid)
+        self.blob_ids[oid] = bid
+        for tri in trigrams(data):
+            self.postings.setdefault(tri.hex(), []).append(bid)
+        return bid
+
+    def candidates(self, literals: Iterable[str]) -> Optional[List[str]]:
+        """Paths that may match, or None if the literals give no trigram to filter on."""
+        blob_set: Optional[Set[int]] = None
+        for lit in literals:
+            data = lit.encode("utf-8")
+            for tri in trigrams(data):
+                ids = set(self.postings.get(tri.hex(), ()))
+                blob_set = ids if blob_set is None else blob_set & ids
+                if not blob_set:
+                    return sorted(self.unindexed)
+        if blob_set is None:
+            return None
+        return sorted({p for p, bid in self.paths.items() if bid in blob_set} | self.unindexed)
+
+
+def _parse_ls_tree(out: bytes) -> Dict[str, Tuple[str, int]]:
+    """`git ls-tree -r -l -z` -> {path: (blob_oid, size)} for regular files."""
+    entries = {}
+    for rec in out.split(b"\x00"):
+        e = parse_ls_tree_entry(rec) if rec else {}
+        if e.get("type") == "blob" and e["mode"] in ("100644", "100755"):
+            entries[e["path"]] = (e["oid"], e["size"] or 0)
+    return entries
+
+
+def _parse_diff_tree(out: bytes) -> Tuple[Dict[str, str], List[str]]:
+    """`git diff-tree -r -z --no-renames` -> ({path: new_blob_oid}, [deleted paths])."""
+    changed: Dict[str, str] = {}
+    deleted: List[str] = []
+    parts = out.split(b"\x00")
+    i = 0
+    while i + 1 < len(parts):
+        meta, path = parts[i], parts[i + 1].decode("utf-8", errors="surrogateescape")
+        i += 2
+        if not meta.startswith(b":"):
+            continue
+        _, new_mode, _, new_oid, status = meta[1:].split()
+        if status == b"D" or new_mode not in (b"100644", b"100755"):
+            deleted.append(path)
+        else:
+            changed[path] = new_oid.decode()
+    return changed, deleted
+
+
+class IndexService:
+    """Trigram-accelerated search over a revision, verified by git grep."""
+
+    def __init__(self, git: GitService):
+        self.git = git
+        self._lock = threading.Lock()
+        self._repo_locks: Dict[str, threading.Lock] = {}
+        # repo -> (index file mtime, loaded index); avoids re-reading the file per query
+        self._loaded: Dict[str, Tuple[float, TrigramIndex]] = {}
+
+    def _repo_lock(self, repo_dir_abs: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(repo_dir_abs, threading.Lock())
+
+    @staticmethod
+    def index_path(repo_dir_abs: str) -> str:
+        return os.path.join(repo_dir_abs, ".git", INDEX_DIR, INDEX_FILE)
+
+    def _load(self, repo_dir_abs: str) -> Optional[TrigramIndex]:
+        path = self.index_path(repo_dir_abs)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = self._loaded.get(repo_dir_abs)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        idx = TrigramIndex.load(path)
+        if idx is not None:
+            self._loaded[repo_dir_abs] = (mtime, idx)
+        return idx
+
+    def _resolve(self, repo_dir_abs: str, rev: str, timeout_sec: int) -> Optional[Tuple[str, str]]:
+        res = run_cmd_blocking(
+            ["git", "rev-parse", "--end-of-options", f"{rev}^{{commit}}", f"{rev}^{{tree}}"],
+            cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=200,
+        )
+        # without --verify, rev-parse echoes --end-of-options back
+        oids = [o for o in res.stdout.split() if o != "--end-of-options"] if res.ok else []
+        return (oids[0], oids[1]) if len(oids) == 2 else None
+
+    def _add_blobs(self, repo_dir_abs: str, idx: TrigramIndex, blobs: Dict[str, str], timeout_sec: int) -> Optional[ToolResult]:
+        """Index the given {path: blob_oid} entries (new blobs only) and map the paths."""
+        todo = sorted({oid for oid in blobs.values() if oid not in idx.blob_ids})
+        sizes = self.git._blob_sizes(repo_dir_abs, todo, timeout_sec)
+        wanted = [oid for oid in todo if 0 < sizes.get(oid, 0) <= MAX_FILE_BYTES]
+        for i in range(0, len(wanted), CAT_FILE_BATCH):
+            chunk = wanted[i:i + CAT_FILE_BATCH]
+            res = run_cmd_blocking(
+                ["git", "cat-file", "--batch"], cwd=repo_dir_abs, timeout_sec=timeout_sec,
+                max_chars=sum(sizes[o] + 100 for o in chunk), binary=True,
+                input_bytes="".join(f"{o}\n" for o in chunk).encode(),
+            )
+            if not res.ok:
+                return _cmd_error(res, "git cat-file failed while building the search index.")
+            try:
+                for oid, content in iter_cat_file_batch(res.stdout_bytes):
+                    # skip binary blobs, like git grep -I
+                    data = bytes(content)
+                    if b"\x00" in data[:8000]:
+                        continue
+                    idx.add_blob(oid, data)
+            except ValueError:
+                return _cmd_error(res, "git cat-file output was cut short while building the search index.")
+        for path, oid in blobs.items():
+            bid = idx.blob_ids.get(oid)
+            idx.unindexed.discard(path)
+            if bid is not None:
+                idx.paths[path] = bid
+                continue
+            idx.paths.pop(path, None)
+            # binary and empty blobs can never match (git grep -I); anything else must still be grepped
+            if sizes.get(oid, MAX_FILE_BYTES + 1) > MAX_FILE_BYTES:
+                idx.unindexed.add(path)
+        return None
+
+    def _build_full(self, repo_dir_abs: str, commit: str, tree: str, timeout_sec: int) -> Tuple[Optional[TrigramIndex], Optional[ToolResult]]:
+        res = run_cmd_blocking(["git", "ls-tree", "-r", "-l", "-z", tree], cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=500_000_000, binary=True)
+        if not res.ok:
+            return None, _cmd_error(res, "git ls-tree failed while building the search index.")
+        idx = TrigramIndex()
+        entries = _parse_ls_tree(bytes(res.stdout_bytes))
+        err = self._add_blobs(repo_dir_abs, idx, {p: oid for p, (oid, _) in entries.items()}, timeout_sec)
+        if err:
+            return None, err
+        idx.commit, idx.tree = commit, tree
+        return idx, None
+
+    def _update(self, repo_dir_abs: str, idx: TrigramIndex, commit: str, tree: str, timeout_sec: int) -> Optional[ToolResult]:
+        res = run_cmd_blocking(
+            ["git", "diff-tree", "-r", "-z", "--no-renames", idx.tree, tree],
+            cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=500_000_000, binary=True,
+        )
+        if not res.ok:
+            return _cmd_error(res, "git diff-tree failed while updating the search index.")
+        changed, deleted = _parse_diff_tree(bytes(res.stdout_bytes))
+        for path in deleted:
+            idx.paths.pop(path, None)
+            idx.unindexed.discard(path)
+        err = self._add_blobs(repo_dir_abs, idx, changed, timeout_sec)
+        if err:
+            return err
+        idx.commit, idx.tree = commit, tree
+        return None
+
+    def ensure_index(self, repo_dir_abs: str, rev: str, timeout_sec: int) -> Tuple[Optional[TrigramIndex], Dict, Optional[ToolResult]]:
+        """
+        Load the index and bring it to `rev`'s tree (incrementally when possible).
+        The returned index is shared and updated in place by later calls; read it
+        under `_repo_lock` (see `query`).
+        """
+        resolved = self._resolve(repo_dir_abs, rev, timeout_sec)
+        if resolved is None:
+            return None, {}, _invalid_input("Unknown revision.", rev=rev)
+        with self._repo_lock(repo_dir_abs):
+            return self._ensure_locked(repo_dir_abs, *resolved, timeout_sec)
+
+    def query(self, repo_dir_abs: str, rev: str, literals: List[str], timeout_sec: int) -> Tuple[str, Optional[List[str]], Dict, Optional[ToolResult]]:
+        """(indexed commit, candidate paths or None, stats, error), all read under the repo lock."""
+        resolved = self._resolve(repo_dir_abs, rev, timeout_sec)
+        if resolved is None:
+            return "", None, {}, _invalid_input("Unknown revision.", rev=rev)
+        with self._repo_lock(repo_dir_abs):
+            idx, stats, err = self._ensure_locked(repo_dir_abs, *resolved, timeout_sec)
+            if err:
+                return "", None, {}, err
+            return idx.commit, idx.candidates(literals), stats, None
+
+    def _ensure_locked(self, repo_dir_abs: str, commit: str, tree: str, timeout_sec: int) -> Tuple[Optional[TrigramIndex], Dict, Optional[ToolResult]]:
+        t0 = time.time()
+        idx = self._load(repo_dir_abs)
+        mode = "cached"
+        if idx is None or idx.stale_ratio() > STALE_REBUILD_RATIO:
+            with span("index.build", repo_dir=repo_dir_abs):
+                idx, err = self._build_full(repo_dir_abs, commit, tree, timeout_sec)
+            mode = "full"
+        elif idx.tree != tree:
+            with span("index.update", repo_dir=repo_dir_abs):
+                err = self._update(repo_dir_abs, idx, commit, tree, timeout_sec)
+            mode = "incremental"
+        else:
+            err = None
+        if err:
+            # a failed incremental update may have left the in-memory index half-applied
+            self._loaded.pop(repo_dir_abs, None)
+            return None, {}, err
+        if mode != "cached":
+            path = self.index_path(repo_dir_abs)
+            idx.save(path)
+            self._loaded[repo_dir_abs] = (os.path.getmtime(path), idx)
+        stats = {"mode": mode, "tree": tree, "files": len(idx.paths), "elapsed_sec": round(time.time() - t0, 3)}
+        return idx, stats, None
+
+    @traced("index.search", "repo_dir", "rev")
+    def search(
+        self,
+        repo_dir: str,
+        pattern: str,
+        rev: str = "HEAD",
+        ignore_case: bool = False,
+        fixed_strings: bool = False,
+        max_results: int = 200,
+        cursor: str = "",
+        timeout_sec: int = 120,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        if not rev or rev.startswith("-"):
+            return _invalid_input("rev must be a revision, not an option.", rev=rev)
+
+        literals = required_literals(pattern, fixed_strings)
+        if ignore_case:
+            # the index only folds ASCII case
+            literals = [lit for lit in literals if lit.isascii()]
+        # commit and candidates come from one locked read; a concurrent search at another rev may update the index next
+        commit, candidates, stats, err = self.query(repo_dir_abs, rev, literals, timeout_sec)
+        if err:
+            return err
+        used_index = candidates is not None and len(candidates) <= MAX_VERIFY_PATHS
+        index_info = {**stats, "used_index": used_index, "candidates": None if candidates is None else len(candidates)}
+
+        if used_index and not candidates:
+            return ToolResult(ok=True, data={
+                "repo_dir": repo_dir_abs, "rev": rev, "matches": [], "count": 0, "next_cursor": "", "index": index_info,
+            })
+
+        # verify candidates (or, without usable trigrams, search everything) with git grep at the indexed commit
+        pathspecs = [f":(literal){p}" for p in candidates] if used_index else []
+        res = self.git.grep(
+            repo_dir_abs, pattern, rev=commit, pathspecs=pathspecs, ignore_case=ignore_case,
+            fixed_strings=fixed_strings, max_results=max_results, cursor=cursor, timeout_sec=timeout_sec,
+        )
+        if not res.ok:
+            return res
+        return ToolResult(ok=True, data={**res.data, "rev": rev, "commit": commit, "index": index_info})
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from models.result import ErrorInfo, ToolResult
+from services.git_service import _cmd_error, _invalid_input, _not_a_repo
+from utils import errors
+from utils.paths import clone_file
+from utils.process import run_cmd_blocking
+from utils.tracing import traced
+from utils.validate import validate_repo_dir
+
+SNAPSHOT_DIR = "mcp-snapshots"
+SNAPSHOT_REF_PREFIX = "refs/mcp-snapshots/"
+META_FILE = "meta.json"
+UNTRACKED_DIR = "untracked"
+
+_SNAPSHOT_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+# Snapshot commits are internal objects; a fixed identity keeps `git stash create`
+# working in repos (and CI containers) without user.name/user.email configured.
+_SNAPSHOT_IDENT = {
+    "GIT_AUTHOR_NAME": "git-mcp-server", "GIT_AUTHOR_EMAIL": "git-mcp-server@localhost",
+    "GIT_COMMITTER_NAME": "git-mcp-server", "GIT_COMMITTER_EMAIL": "git-mcp-server@localhost",
+}
+
+
+def _snapshot_not_found(repo_dir_abs: str, snapshot_id: str) -> ToolResult:
+    return ToolResult(
+        ok=False,
+        error=ErrorInfo(
+            code=errors.SNAPSHOT_NOT_FOUND,
+            message="Unknown snapshot id, or the snapshot was evicted.",
+            hint="List the available snapshots with git_snapshot_list.",
+            details={"repo_dir": repo_dir_abs, "snapshot_id": snapshot_id},
+        ),
+    )
+
+
+def _io_error(repo_dir_abs: str, snapshot_id: str, message: str) -> ToolResult:
+    return ToolResult(ok=False, error=ErrorInfo(
+        code=errors.CMD_FAILED, message=message, details={"repo_dir": repo_dir_abs, "snapshot_id": snapshot_id},
+    ))
+
+
+class SnapshotService:
+    """
+    Cheap working-tree snapshots for try-and-roll-back workflows. Tracked state
+    is stored as git objects (`git write-tree` for the index, `git stash create`
+    for the working tree) pinned by refs/mcp-snapshots/<id>; untracked files are
+    reflinked (or copied) into .git/mcp-snapshots/<id>/. At most `max_per_repo`
+    snapshots are kept per repository, the oldest are evicted first.
+    """
+
+    def __init__(self, max_per_repo: int = 20):
+        self.max_per_repo = max(1, max_per_repo)
+        self._lock = threading.Lock()
+        self._repo_locks: Dict[str, threading.Lock] = {}
+
+    def _repo_lock(self, repo_dir_abs: str) -> threading.Lock:
+        with self._lock:
+            return self._repo_locks.setdefault(repo_dir_abs, threading.Lock())
+
+    @staticmethod
+    def store_dir(repo_dir_abs: str) -> str:
+        return os.path.join(repo_dir_abs, ".git", SNAPSHOT_DIR)
+
+    def _load_meta(self, repo_dir_abs: str, snapshot_id: str) -> Optional[Dict]:
+        if not _SNAPSHOT_ID.match(snapshot_id or ""):
+            return None
+        try:
+            with open(os.path.join(self.store_dir(repo_dir_abs), snapshot_id, META_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _all_meta(self, repo_dir_abs: str) -> List[Dict]:
+        """Complete snapshots (meta.json is written last), oldest first."""
+        try:
+            names = os.listdir(self.store_dir(repo_dir_abs))
+        except OSError:
+            return []
+        metas = [m for m in (self._load_meta(repo_dir_abs, n) for n in names) if m]
+        return sorted(metas, key=lambda m: (m["created_at"], m["id"]))
+
+    def _remove(self, repo_dir_abs: str, snapshot_id: str, timeout_sec: int) -> None:
+        run_cmd_blocking(
+            ["git", "update-ref", "-d", SNAPSHOT_REF_PREFIX + snapshot_id],
+            cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=2000,
+        )
+        shutil.rmtree(os.path.join(self.store_dir(repo_dir_abs), snapshot_id), ignore_errors=True)
+
+    def _git_out(self, repo_dir_abs: str, args: List[str], timeout_sec: int, env: Optional[Dict[str, str]] = None):
+        return run_cmd_blocking(["git", *args], cwd=repo_dir_abs, timeout_sec=timeout_sec, env_overrides=env, max_chars=2000)
+
+    def _untracked(self, repo_dir_abs: str, include_ignored: bool, timeout_sec: int) -> Tuple[Optional[List[str]], Optional[ToolResult]]:
+        cmd = ["git", "ls-files", "-z", "--others"]
+        if not include_ignored:
+            cmd.append("--exclude-standard")
+        res = run_cmd_blocking(cmd, cwd=repo_dir_abs, timeout_sec=timeout_sec, max_chars=100_000_000, binary=True)
+        if not res.ok:
+            return None, _cmd_error(res, "git ls-files failed while listing untracked files.")
+        paths = bytes(res.stdout_bytes).decode("utf-8", errors="surrogateescape").split("\x00")
+        return [p for p in paths if p], None
+
+    @traced("snapshot.create", "repo_dir")
+    def snapshot(
+        self,
+        repo_dir: str,
+        label: str = "",
+        include_ignored: bool = False,
+        hardlink_untracked: bool = False,
+        timeout_sec: int = 120,
+    ) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+
+        with self._repo_lock(repo_dir_abs):
+            t0 = time.time()
+            head_res = self._git_out(repo_dir_abs, ["rev-parse", "--verify", "-q", "HEAD^{commit}"], timeout_sec)
+            if not head_res.ok:
+                return _invalid_input("Repository has no commits yet; nothing to snapshot against.", repo_dir=repo_dir_abs)
+            head = head_res.stdout.strip()
+            branch_res = self._git_out(repo_dir_abs, ["symbolic-ref", "-q", "--short", "HEAD"], timeout_sec)
+            branch = branch_res.stdout.strip() if branch_res.ok else ""
+
+            index_res = self._git_out(repo_dir_abs, ["write-tree"], timeout_sec)
+            if not index_res.ok:
+                return _cmd_error(index_res, "git write-tree failed.", hint="Resolve merge conflicts before taking a snapshot.")
+            index_tree = index_res.stdout.strip()
+
+            stash_res = self._git_out(repo_dir_abs, ["stash", "create", f"mcp snapshot {label}".strip()], timeout_sec, env=_SNAPSHOT_IDENT)
+            if not stash_res.ok:
+                return _cmd_error(stash_res, "git stash create failed.")
+            # empty output: nothing differs from HEAD
+            worktree_commit = stash_res.stdout.strip() or head
+
+            untracked, err = self._untracked(repo_dir_abs, include_ignored, timeout_sec)
+            if err:
+                return err
+
+            snapshot_id = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+            snap_dir = os.path.join(self.store_dir(repo_dir_abs), snapshot_id)
+            methods: Dict[str, int] = {}
+            saved: List[str] = []
+            skipped: List[str] = []
+            total_bytes = 0
+            try:
+                for rel in untracked:
+                    src = os.path.join(repo_dir_abs, rel)
+                    # nested repositories are listed as "dir/"; they are not ours to copy
+                    if rel.endswith("/") or not os.path.lexists(src):
+                        skipped.append(rel)
+                        continue
+                    method = clone_file(src, os.path.join(snap_dir, UNTRACKED_DIR, rel), hardlink=hardlink_untracked)
+                    methods[method] = methods.get(method, 0) + 1
+                    total_bytes += os.lstat(src).st_size
+                    saved.append(rel)
+            except OSError as e:
+                self._remove(repo_dir_abs, snapshot_id, timeout_sec)
+                return _io_error(repo_dir_abs, snapshot_id, f"Could not store untracked files: {e}")
+
+            ref_res = self._git_out(repo_dir_abs, ["update-ref", SNAPSHOT_REF_PREFIX + snapshot_id, worktree_commit], timeout_sec)
+            if not ref_res.ok:
+                self._remove(repo_dir_abs, snapshot_id, timeout_sec)
+                return _cmd_error(ref_res, "git update-ref failed while pinning the snapshot.")
+
+            meta = {
+                "id": snapshot_id,
+                "label": label,
+                "created_at": time.time(),
+                "head": head,
+                "branch": branch,
+                "index_tree": index_tree,
+                "worktree_commit": worktree_commit,
+                "include_ignored": include_ignored,
+                "untracked": saved,
+            }
+            try:
+                os.makedirs(snap_dir, exist_ok=True)
+                tmp = os.path.join(snap_dir, f"{META_FILE}.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+                os.replace(tmp, os.path.join(snap_dir, META_FILE))
+            except OSError as e:
+                self._remove(repo_dir_abs, snapshot_id, timeout_sec)
+                return _io_error(repo_dir_abs, snapshot_id, f"Could not write snapshot metadata: {e}")
+
+            evicted = []
+            metas = self._all_meta(repo_dir_abs)
+            for old in metas[:max(0, len(metas) - self.max_per_repo)]:
+                self._remove(repo_dir_abs, old["id"], timeout_sec)
+                evicted.append(old["id"])
+
+            return ToolResult(ok=True, data={
+                "repo_dir": repo_dir_abs,
+                "snapshot_id": snapshot_id,
+                "label": label,
+                "head": head,
+                "branch": branch,
+                "clean": worktree_commit == head and index_tree == self._tree_of(repo_dir_abs, head, timeout_sec),
+                "untracked_files": len(saved),
+                "untracked_bytes": total_bytes,
+                "copy_methods": methods,
+                "skipped": skipped,
+                "evicted": evicted,
+                "elapsed_sec": round(time.time() - t0, 3),
+            })
+
+    def _tree_of(self, repo_dir_abs: str, commit: str, timeout_sec: int) -> str:
+        res = self._git_out(repo_dir_abs, ["rev-parse", "--verify", "-q", f"{commit}^{{tree}}"], timeout_sec)
+        return res.stdout.strip() if res.ok else ""
+
+    @traced("snapshot.restore", "repo_dir")
+    def restore(self, repo_dir: str, snapshot_id: str, timeout_sec: int = 120) -> ToolResult:
+        """
+        Put HEAD, index, working tree and untracked files back as they were.
+        The branch checked out at snapshot time is checked out again and reset
+        to the snapshot's HEAD; untracked files created since are removed.
+        """
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+
+        with self._repo_lock(repo_dir_abs):
+            meta = self._load_meta(repo_dir_abs, snapshot_id)
+            if meta is None:
+                return _snapshot_not_found(repo_dir_abs, snapshot_id)
+            t0 = time.time()
+
+            prev = self._git_out(repo_dir_abs, ["rev-parse", "--verify", "-q", "HEAD"], timeout_sec).stdout.strip()
+            if meta["branch"]:
+                head_cmd = ["symbolic-ref", "HEAD", f"refs/heads/{meta['branch']}"]
+            else:
+                head_cmd = ["update-ref", "--no-deref", "HEAD", meta["head"]]
+            steps = [
+                head_cmd,
+                ["reset", "-q", "--soft", meta["head"]],
+                # overwrite tracked files (local changes included) with the snapshot's working tree
+                ["read-tree", "--reset", "-u", f"{meta['worktree_commit']}^{{tree}}"],
+                ["clean", "-fdq" + ("x" if meta["include_ignored"] else "")],
+            ]
+            for args in steps:
+                res = self._git_out(repo_dir_abs, args, timeout_sec)
+                if not res.ok:
+                    return _cmd_error(res, f"git {args[0]} failed while restoring snapshot {snapshot_id}.")
+
+            src_root = os.path.join(self.store_dir(repo_dir_abs), snapshot_id, UNTRACKED_DIR)
+            try:
+                for rel in meta["untracked"]:
+                    dst = os.path.join(repo_dir_abs, rel)
+                    if os.path.lexists(dst):
+                        os.unlink(dst)
+                    # never link back: edits after the restore must not reach the snapshot
+                    clone_file(os.path.join(src_root, rel), dst)
+            except OSError as e:
+                return _io_error(repo_dir_abs, snapshot_id, f"Could not restore untracked files: {e}")
+
+            for args in (["read-tree", meta["index_tree"]], ["update-index", "-q", "--refresh"]):
+                res = self._git_out(repo_dir_abs, args, timeout_sec)
+                if not res.ok and args[0] == "read-tree":
+                    return _cmd_error(res, f"git read-tree failed while restoring snapshot {snapshot_id}.")
+
+            return ToolResult(ok=True, data={
+                "repo_dir": repo_dir_abs,
+                "snapshot_id": snapshot_id,
+                "head": meta["head"],
+                "branch": meta["branch"],
+                "previous_head": prev,
+                "untracked_files": len(meta["untracked"]),
+                "elapsed_sec": round(time.time() - t0, 3),
+            })
+
+    @traced("snapshot.list", "repo_dir")
+    def list_snapshots(self, repo_dir: str) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        snapshots = [
+            {
+                "snapshot_id": m["id"], "label": m["label"], "created_at": m["created_at"],
+                "head": m["head"], "branch": m["branch"], "untracked_files": len(m["untracked"]),
+            }
+            for m in reversed(self._all_meta(repo_dir_abs))
+        ]
+        return ToolResult(ok=True, data={"repo_dir": repo_dir_abs, "snapshots": snapshots, "max_per_repo": self.max_per_repo})
+
+    @traced("snapshot.delete", "repo_dir")
+    def delete(self, repo_dir: str, snapshot_id: str, timeout_sec: int = 30) -> ToolResult:
+        ok, repo_dir_abs = validate_repo_dir(repo_dir)
+        if not ok:
+            return _not_a_repo(repo_dir_abs)
+        with self._repo_lock(repo_dir_abs):
+            if self._load_meta(repo_dir_abs, snapshot_id) is None:
+                return _snapshot_not_found(repo_dir_abs, snapshot_id)
+            self._remove(repo_dir_abs, snapshot_id, timeout_sec)
+        return ToolResult(ok=True, data={"repo_dir": repo_dir_abs, "snapshot_id": snapshot_id, "deleted": True})
+
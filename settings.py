@@ -5,6 +5,8 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
+from utils.diff_rules import DEFAULT_SUMMARY_GLOBS
+
 
 def get_default_env_path() -> Path:
     return Path(__file__).with_name(".env")
@@ -17,6 +19,29 @@ def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
     return str(value).strip()
 
 
+def _get_int(name: str, default: int) -> int:
+    raw = _get_env(name)
+    try:
+        return int(raw) if raw else default
+    except ValueError:
+        return default
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    raw = _get_env(name)
+    if not raw:
+        return default
+    return raw.lower() in ("1", "true", "yes", "on")
+
+
+def _get_float(name: str, default: float) -> float:
+    raw = _get_env(name)
+    try:
+        return float(raw) if raw else default
+    except ValueError:
+        return default
+
+
 @dataclass(frozen=True)
 class Settings:
     SMTP_HOST: Optional[str]
@@ -24,6 +49,37 @@ class Settings:
     SMTP_USERNAME: Optional[str]
     SMTP_PASSWORD: Optional[str]
     FROM_EMAIL: Optional[str]
+    # tracing: "" (off) / "jsonl" / "otlp"
+    TRACE_EXPORTER: str = ""
+    TRACE_FILE: str = "traces.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://127.0.0.1:4318/v1/traces"
+    TRACE_SAMPLE_RATE: float = 1.0
+    TRACE_SLOW_MS: int = 0
+    # adaptive timeouts: tighten timeout_sec from recent per-repo/per-command durations
+    ADAPTIVE_TIMEOUTS: bool = False
+    ADAPTIVE_TIMEOUT_FACTOR: float = 3.0
+    ADAPTIVE_TIMEOUT_MIN_SEC: float = 5.0
+    # process supervisor: concurrency limits (0 = unlimited) and per-child caps
+    MAX_PROCS: int = 32
+    PROC_KIND_LIMITS: str = "git clone=4,git push=4,git fetch=8"
+    PROC_MEM_LIMIT_MB: int = 0
+    PROC_CPU_LIMIT_SEC: int = 0
+    PROC_CGROUP: str = ""
+    # server transport and per-client limits (shared HTTP/SSE mode)
+    MCP_TRANSPORT: str = "stdio"
+    MCP_HOST: str = "127.0.0.1"
+    MCP_PORT: int = 8000
+    CLIENT_MAX_CONCURRENCY: int = 0
+    # background jobs (git_clone/git_push with background=true)
+    JOB_MAX_JOBS: int = 256
+    JOB_RESULT_TTL_SEC: int = 3600
+    # git_diff: files summarized in one line instead of diffed (see utils/diff_rules.py)
+    DIFF_SUMMARY_GLOBS: str = ",".join(DEFAULT_SUMMARY_GLOBS)
+    DIFF_MAX_CHANGED_LINES: int = 2000
+    # git_snapshot: snapshots kept per repository before the oldest is evicted
+    SNAPSHOT_MAX_PER_REPO: int = 20
+    # record every tool call (name, args, timing) as JSON lines for benchmarks/replay.py; "" = off
+    CALL_RECORD_FILE: str = ""
 
 
 def build_settings() -> Settings:
@@ -39,4 +95,27 @@ def build_settings() -> Settings:
         SMTP_USERNAME=_get_env("SMTP_USERNAME"),
         SMTP_PASSWORD=_get_env("SMTP_PASSWORD"),
         FROM_EMAIL=_get_env("FROM_EMAIL"),
+        TRACE_EXPORTER=_get_env("TRACE_EXPORTER", "") or "",
+        TRACE_FILE=_get_env("TRACE_FILE", "traces.jsonl") or "traces.jsonl",
+        TRACE_OTLP_ENDPOINT=_get_env("TRACE_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces") or "",
+        TRACE_SAMPLE_RATE=_get_float("TRACE_SAMPLE_RATE", 1.0),
+        TRACE_SLOW_MS=_get_int("TRACE_SLOW_MS", 0),
+        ADAPTIVE_TIMEOUTS=_get_bool("ADAPTIVE_TIMEOUTS", False),
+        ADAPTIVE_TIMEOUT_FACTOR=_get_float("ADAPTIVE_TIMEOUT_FACTOR", 3.0),
+        ADAPTIVE_TIMEOUT_MIN_SEC=_get_float("ADAPTIVE_TIMEOUT_MIN_SEC", 5.0),
+        MAX_PROCS=_get_int("MAX_PROCS", 32),
+        PROC_KIND_LIMITS=_get_env("PROC_KIND_LIMITS", "git clone=4,git push=4,git fetch=8") or "",
+        PROC_MEM_LIMIT_MB=_get_int("PROC_MEM_LIMIT_MB", 0),
+        PROC_CPU_LIMIT_SEC=_get_int("PROC_CPU_LIMIT_SEC", 0),
+        PROC_CGROUP=_get_env("PROC_CGROUP", "") or "",
+        MCP_TRANSPORT=_get_env("MCP_TRANSPORT", "stdio") or "stdio",
+        MCP_HOST=_get_env("MCP_HOST", "127.0.0.1") or "127.0.0.1",
+        MCP_PORT=_get_int("MCP_PORT", 8000),
+        CLIENT_MAX_CONCURRENCY=_get_int("CLIENT_MAX_CONCURRENCY", 0),
+        JOB_MAX_JOBS=_get_int("JOB_MAX_JOBS", 256),
+        JOB_RESULT_TTL_SEC=_get_int("JOB_RESULT_TTL_SEC", 3600),
+        DIFF_SUMMARY_GLOBS=_get_env("DIFF_SUMMARY_GLOBS", ",".join(DEFAULT_SUMMARY_GLOBS)) or "",
+        DIFF_MAX_CHANGED_LINES=_get_int("DIFF_MAX_CHANGED_LINES", 2000),
+        SNAPSHOT_MAX_PER_REPO=_get_int("SNAPSHOT_MAX_PER_REPO", 20),
+        CALL_RECORD_FILE=_get_env("CALL_RECORD_FILE", "") or "",
     )
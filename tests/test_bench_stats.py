@@ -0,0 +1,15 @@
+from benchmarks.stats import compare, percentile, summarize
+
+
+def test_percentile_nearest_rank():
+    values = [0.01 * i for i in range(1, 101)]
+    assert percentile(values, 50) == 0.5
+    assert percentile(values, 99) == 0.99
+    assert percentile([0.2], 99) == 0.2
+
+
+def test_summarize_and_compare():
+    base = {"results": {"status": summarize([0.01, 0.02], 0.03)}}
+    cur = {"results": {"status": summarize([0.02, 0.04], 0.06)}}
+    assert cur["results"]["status"]["count"] == 2
+    assert compare(base, cur)["status"]["p50_ms"] == 2.0
@@ -0,0 +1,47 @@
+from utils.diff_summary import parse_unified_zero, python_symbols, register_parser, summarize_file
+
+PATCH = """diff --git a/lib.go b/lib.go
+index 1111111111111111111111111111111111111111..2222222222222222222222222222222222222222 100644
+--- a/lib.go
++++ b/lib.go
+@@ -10,2 +10,3 @@ func Handle(w http.ResponseWriter) {
+-	old()
+--- looks like a header but is a removed line
++	new()
++	more()
++++ also body
+@@ -40 +41,0 @@ func Close() {
+-	x := 1
+diff --git a/new.txt b/new.txt
+new file mode 100644
+index 0000000000000000000000000000000000000000..3333333333333333333333333333333333333333
+--- /dev/null
++++ b/new.txt
+@@ -0,0 +1 @@
++hello
+"""
+
+
+def test_parse_and_hunk_header_fallback():
+    files = parse_unified_zero(PATCH)
+    assert [(f["path"], f["status"]) for f in files] == [("lib.go", "modified"), ("new.txt", "added")]
+    assert files[0]["hunks"][1] == (40, 1, 41, 0, "func Close() {")
+
+    s = summarize_file(files[0])
+    assert s["method"] == "hunk-header" and (s["added"], s["deleted"]) == (3, 3)
+    assert s["symbols"] == [
+        {"symbol": "func Handle(w http.ResponseWriter) {", "added": 3, "deleted": 2},
+        {"symbol": "func Close() {", "added": 0, "deleted": 1},
+    ]
+
+
+def test_python_symbols_nested_and_decorated():
+    src = "class A:\n    @staticmethod\n    def f():\n        pass\n\n\nasync def g():\n    pass\n"
+    assert python_symbols(src) == [("A", 1, 4), ("A.f", 2, 4), ("g", 7, 8)]
+
+
+def test_registered_parser_is_used():
+    register_parser(".toy", lambda src: [("block", 1, 2)])
+    f = {"path": "x.toy", "old_path": "x.toy", "status": "modified", "binary": False, "hunks": [(2, 1, 2, 1, "")]}
+    s = summarize_file(f, "a\nb\nc\n", "a\nB\nc\n")
+    assert s["method"] == "parser" and s["symbols"] == [{"symbol": "block", "added": 1, "deleted": 1}]
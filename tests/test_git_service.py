@@ -61,3 +61,431 @@ def test_diff_success(monkeypatch, tmp_path):
     res = gs.diff(str(tmp_path), staged=False, name_only=False, stat=False, max_chars=20000, timeout_sec=10)
     assert res.ok is True
     assert "diff --git" in res.data["diff"]
+
+def test_diff_gzip_and_resource_outputs(monkeypatch, tmp_path):
+    import base64, gzip
+    from utils.payload import diff_store
+
+    raw = b"diff --git a/x b/x\n\xff\xfe binary-ish\n"
+    calls = []
+
+    def fake_run(cmd, cwd, timeout_sec, max_chars=4000, binary=False):
+        calls.append((cmd, binary))
+        return CmdResult(
+            ok=True, cmd=" ".join(cmd), cwd=cwd, code=0, elapsed_sec=0.01,
+            stdout="", stderr="", stdout_truncated=False, stderr_truncated=False,
+            stdout_bytes=memoryview(raw),
+        )
+
+    monkeypatch.setattr("services.git_service.validate_repo_dir", lambda p: (True, str(tmp_path)))
+    monkeypatch.setattr("services.git_service.run_cmd_blocking", fake_run)
+
+    gs = GitService()
+    res = gs.diff(str(tmp_path), staged=False, output="gzip_base64")
+    assert res.ok is True
+    assert gzip.decompress(base64.b64decode(res.data["diff_gzip_base64"])) == raw
+    diff_calls = [c for c in calls if "--binary" in c[0]]
+    assert diff_calls and diff_calls[0][1] is True
+
+    res = gs.diff(str(tmp_path), staged=False, output="resource")
+    digest = res.data["resource_uri"].split("://", 1)[1]
+    assert diff_store.get(digest) == raw
+    assert res.data["diff_bytes"] == len(raw)
+
+def test_log_parses_records_and_paginates(monkeypatch, tmp_path):
+    from utils.git_parse import FIELD_SEP
+
+    recs = [
+        FIELD_SEP.join([f"{i:040x}", f"{i + 1:040x}", "Ann", "ann@example.com", "2024-01-01T00:00:00+00:00", f"subject {i}"])
+        for i in range(3)
+    ]
+    seen = []
+
+    def fake_run(cmd, cwd, timeout_sec, max_chars=4000):
+        seen.append(cmd)
+        return CmdResult(
+            ok=True, cmd=" ".join(cmd), cwd=cwd, code=0, elapsed_sec=0.01,
+            stdout="\x00".join(recs) + "\x00", stderr="", stdout_truncated=False, stderr_truncated=False,
+        )
+
+    monkeypatch.setattr("services.git_service.validate_repo_dir", lambda p: (True, str(tmp_path)))
+    monkeypatch.setattr("services.git_service.run_cmd_blocking", fake_run)
+
+    res = GitService().log(str(tmp_path), rev_range="main", paths=["src"], max_count=2, cursor="4")
+    assert res.ok is True
+    assert [c["subject"] for c in res.data["commits"]] == ["subject 0", "subject 1"]
+    assert res.data["commits"][0]["parents"] == [f"{1:040x}"]
+    assert res.data["next_cursor"] == "6"
+    cmd = seen[0]
+    assert "--max-count=3" in cmd and "--skip=4" in cmd
+    assert cmd[-3:] == ["main", "--", "src"]
+
+
+def test_log_rejects_option_like_range(monkeypatch, tmp_path):
+    monkeypatch.setattr("services.git_service.validate_repo_dir", lambda p: (True, str(tmp_path)))
+    res = GitService().log(str(tmp_path), rev_range="--output=/tmp/x")
+    assert res.ok is False
+    assert res.error.code == errors.INVALID_INPUT
+
+def test_compare_branches_counts_and_cache(git_repo, git):
+    from services import git_service
+
+    git(git_repo, "checkout", "-q", "-b", "feature")
+    (git_repo / "b.txt").write_text("b\n")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "feature work")
+    git_service._compare_cache.clear()
+
+    gs = GitService()
+    res = gs.compare_branches(str(git_repo), [("master", "feature"), ("feature", "master"), ("master", "missing")])
+    assert res.ok is True
+    fwd, back, missing = res.data["results"]
+    assert (fwd["ahead"], fwd["behind"], fwd["fully_merged"]) == (1, 0, False)
+    assert fwd["merge_base"] == git(git_repo, "rev-parse", "master")
+    assert (back["ahead"], back["behind"], back["fully_merged"]) == (0, 1, True)
+    assert back["cached"] is True  # mirrored from the first pair
+    assert missing["error"] == "unknown revision"
+
+    again = gs.compare_branches(str(git_repo), [("master", "feature")])
+    assert again.data["results"][0]["cached"] is True
+
+def test_fetch_many_from_local_bare_remote(git_repo, git, tmp_path):
+    import os
+
+    remote = tmp_path / "remote.git"
+    git(tmp_path, "clone", "-q", "--bare", str(git_repo), str(remote))
+    clones = []
+    for name in ("c1", "c2"):
+        git(tmp_path, "clone", "-q", str(remote), str(tmp_path / name))
+        clones.append(str(tmp_path / name))
+
+    (git_repo / "new.txt").write_text("x" * 5000)
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "more")
+    git(git_repo, "push", "-q", str(remote), "master")
+
+    res = GitService().fetch_many(clones + [str(tmp_path / "missing")], max_parallel=2, no_tags=True, refspecs=["master"], keep_pack=True)
+    assert res.ok is True
+    assert (res.data["succeeded"], res.data["failed"]) == (2, 1)
+    first = res.data["results"][0]
+    assert first["ok"] is True
+    assert 0 < first["data"]["bytes_received"] < 20000
+    assert "\r" not in first["data"]["stderr"]
+    again = GitService().fetch(clones[0], no_tags=True, refspecs=["master"])
+    assert again.data["bytes_received"] == 0
+    assert git(clones[0], "rev-parse", "origin/master") == git(git_repo, "rev-parse", "master")
+    assert res.data["results"][2]["error"]["code"] == errors.NOT_A_GIT_REPO
+
+    # without keep_pack the few new objects stay loose: no pack written, size not reported
+    packs = set(os.listdir(os.path.join(clones[1], ".git", "objects", "pack")))
+    (git_repo / "more.txt").write_text("y" * 100)
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "even more")
+    git(git_repo, "push", "-q", str(remote), "master")
+    loose = GitService().fetch(clones[1], no_tags=True, refspecs=["master"])
+    assert loose.ok and loose.data["bytes_received"] is None
+    assert set(os.listdir(os.path.join(clones[1], ".git", "objects", "pack"))) == packs
+
+def test_push_multi_atomic_to_two_remotes(git_repo, git, tmp_path):
+    remotes = []
+    for name in ("r1.git", "r2.git"):
+        git(tmp_path, "init", "-q", "--bare", str(tmp_path / name))
+        remotes.append(str(tmp_path / name))
+    git(git_repo, "tag", "v1")
+
+    gs = GitService()
+    res = gs.push_multi(str(git_repo), remotes, ["master", "refs/tags/v1"])
+    assert res.ok is True
+    for item in res.data["remotes"]:
+        assert sorted(r["status"] for r in item["refs"]) == ["new", "new"]
+    assert git(remotes[1], "rev-parse", "v1") == git(git_repo, "rev-parse", "v1")
+
+    # diverge one remote: atomic push must reject both refs there and leave its tags alone
+    git(git_repo, "commit", "-q", "--amend", "-m", "rewritten")
+    git(git_repo, "tag", "v2")
+    res = gs.push_multi(str(git_repo), remotes[:1], ["master", "refs/tags/v2"])
+    assert res.ok is False
+    item = res.error.details["remotes"][0]
+    assert "refs/heads/master" in item["rejected"]
+    assert git(tmp_path, "--git-dir", remotes[0], "tag", "--list", "v2") == ""
+
+
+def test_parse_push_porcelain():
+    from utils.git_parse import parse_push_porcelain
+
+    out = (
+        "To /tmp/remote.git\n"
+        "=\trefs/heads/main:refs/heads/main\t[up to date]\n"
+        "!\trefs/heads/x:refs/heads/x\t[rejected] (non-fast-forward)\n"
+        "Done"
+    )
+    refs = parse_push_porcelain(out)
+    assert [r["status"] for r in refs] == ["up_to_date", "rejected"]
+    assert refs[1]["reason"] == "non-fast-forward"
+
+def test_parse_fetch_progress():
+    from utils.git_parse import parse_fetch_progress
+
+    err = (
+        "remote: Total 52 (delta 0), reused 0 (delta 0)\n"
+        "Receiving objects:  50% (26/52)\rReceiving objects: 100% (52/52), 1.50 MiB | 2.00 MiB/s, done.\n"
+        "From /tmp/remote"
+    )
+    text, received = parse_fetch_progress(err)
+    assert received == 1572864
+    assert text.splitlines()[1] == "Receiving objects: 100% (52/52), 1.50 MiB | 2.00 MiB/s, done."
+    assert parse_fetch_progress("remote: Total 3 (delta 0)")[1] is None
+    assert parse_fetch_progress("")[1] == 0
+
+def test_grep_worktree_and_revision_with_pagination(git_repo, git):
+    (git_repo / "src").mkdir()
+    (git_repo / "src" / "m.py").write_text("".join(f"def f{i}(): pass\n" for i in range(5)))
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "src")
+
+    gs = GitService()
+    page1 = gs.grep(str(git_repo), r"def f[0-9]", max_results=2)
+    assert page1.ok is True
+    assert [(m["path"], m["line"], m["column"]) for m in page1.data["matches"]] == [("src/m.py", 1, 1), ("src/m.py", 2, 1)]
+    page3 = gs.grep(str(git_repo), "def f", rev="HEAD", pathspecs=["src"], max_results=2, cursor="4")
+    assert [m["text"] for m in page3.data["matches"]] == ["def f4(): pass"]
+    assert page3.data["next_cursor"] == ""
+
+    none = gs.grep(str(git_repo), "no-such-text", fixed_strings=True)
+    assert none.ok is True and none.data["matches"] == []
+    bad = gs.grep(str(git_repo), "(")
+    assert bad.ok is False and bad.error.code == errors.CMD_FAILED
+
+
+def test_blame_ranges_and_cache(git_repo, git):
+    (git_repo / "a.txt").write_text("one\nTWO\nthree\n")
+    git(git_repo, "commit", "-q", "-am", "second")
+    head = git(git_repo, "rev-parse", "HEAD")
+
+    svc = GitService()
+    res = svc.blame(str(git_repo), "a.txt")
+    assert res.ok and res.data["cached"] is False
+    # line 1 comes from the initial commit, lines 2-3 from HEAD
+    assert [(r["start"], r["end"], r["commit"] == head) for r in res.data["ranges"]] == [(1, 1, False), (2, 3, True)]
+    assert res.data["commits"][head]["summary"] == "second"
+
+    res = svc.blame(str(git_repo), "a.txt", start_line=2, end_line=2, include_text=True)
+    assert [(r["start"], r["end"], r["text"]) for r in res.data["ranges"]] == [(2, 2, ["TWO"])]
+    assert svc.blame(str(git_repo), "a.txt", start_line=2, end_line=2, include_text=True).data["cached"] is True
+
+    assert svc.blame(str(git_repo), "a.txt", start_line=3, end_line=1).error.code == "invalid_input"
+    assert svc.blame(str(git_repo), "missing.txt").ok is False
+
+
+def test_show_file_ranges_and_binary(git_repo, git):
+    import base64
+
+    (git_repo / "bin.dat").write_bytes(b"ab\x00cd")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "binary")
+
+    svc = GitService()
+    res = svc.show_file(str(git_repo), "a.txt", offset=1, max_bytes=2)
+    assert res.data["content"] == "ne" and res.data["truncated"] is True and res.data["size"] == 4
+
+    res = svc.show_file(str(git_repo), "bin.dat")
+    assert res.data["binary"] is True and base64.b64decode(res.data["content"]) == b"ab\x00cd"
+
+    assert svc.show_file(str(git_repo), "missing.txt").error.code == "invalid_input"
+    assert svc.show_file(str(git_repo), "a.txt", rev="--help").error.code == "invalid_input"
+
+
+def test_ls_tree_recursive_pagination(git_repo, git):
+    (git_repo / "src" / "pkg").mkdir(parents=True)
+    (git_repo / "src" / "x.py").write_text("x\n")
+    (git_repo / "src" / "pkg" / "y.py").write_text("y\n")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "src")
+
+    svc = GitService()
+    top = svc.ls_tree(str(git_repo))
+    assert [(e["path"], e["type"]) for e in top.data["entries"]] == [("a.txt", "blob"), ("src", "tree")]
+
+    page = svc.ls_tree(str(git_repo), path="src", recursive=True, max_entries=1)
+    assert [e["path"] for e in page.data["entries"]] == ["src/pkg/y.py"]
+    page = svc.ls_tree(str(git_repo), path="src", recursive=True, max_entries=1, cursor=page.data["next_cursor"])
+    assert [e["path"] for e in page.data["entries"]] == ["src/x.py"] and page.data["next_cursor"] == ""
+
+    (entry,) = svc.ls_tree(str(git_repo), path="src/x.py").data["entries"]
+    assert (entry["path"], entry["type"], entry["size"]) == ("src/x.py", "blob", 2)
+    assert svc.ls_tree(str(git_repo), path="src/missing.py").error.code == errors.INVALID_INPUT
+
+
+def test_diff_summarizes_lockfiles_generated_and_lfs_pointers(git_repo, git):
+    pointer = "version https://git-lfs.github.com/spec/v1\noid sha256:{}\nsize 10\n"
+    (git_repo / "model.bin").write_text(pointer.format("1" * 64))
+    (git_repo / "package-lock.json").write_text("{}\n")
+    (git_repo / "gen.py").write_text("x = 1\n")
+    (git_repo / ".gitattributes").write_text("gen.py linguist-generated\n")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "setup")
+
+    (git_repo / "model.bin").write_text(pointer.format("2" * 64))
+    (git_repo / "package-lock.json").write_text('{"a": 1}\n')
+    (git_repo / "gen.py").write_text("x = 2\n")
+    (git_repo / "a.txt").write_text("one\ntwo\n")
+
+    res = GitService().diff(str(git_repo), staged=False, summarize_noise=True)
+    assert res.ok
+    assert {f["path"]: f["reason"] for f in res.data["summarized_files"]} == {
+        "package-lock.json": "matches package-lock.json",
+        "gen.py": "linguist-generated",
+        "model.bin": "lfs pointer",
+    }
+    assert "a/a.txt" in res.data["diff"]
+    assert "package-lock" not in res.data["diff"] and "gen.py" not in res.data["diff"] and "model.bin" not in res.data["diff"]
+
+    # off by default: one git process, full patch
+    res = GitService().diff(str(git_repo), staged=False)
+    assert res.data["summarized_files"] == [] and "gen.py" in res.data["diff"]
+
+
+def test_diff_noise_pass_skips_pointer_check_for_ordinary_small_edits(monkeypatch, git_repo):
+    import services.git_service as gsmod
+
+    real = gsmod.run_cmd_blocking
+    cmds = []
+    monkeypatch.setattr(gsmod, "run_cmd_blocking", lambda cmd, *a, **kw: cmds.append(cmd) or real(cmd, *a, **kw))
+    (git_repo / "a.txt").write_text("two\n")
+
+    assert GitService().diff(str(git_repo), staged=False).ok
+    # the diff itself plus the rename-budget probe; no noise pass
+    assert len(cmds) == 2 and "--name-status" in cmds[0]
+    cmds.clear()
+    assert GitService().diff(str(git_repo), staged=False, summarize_noise=True).ok
+    assert not any(arg.startswith("-G") for cmd in cmds for arg in cmd)
+
+
+def test_diff_disables_renames_after_budget(monkeypatch, tmp_path):
+    import dataclasses
+
+    calls = []
+    name_status = ["A\x00new.py\x00D\x00old.py"]
+
+    def fake_run(cmd, cwd, timeout_sec, max_chars=4000):
+        if "--name-status" in cmd:
+            return dataclasses.replace(_ok_cmd(cmd, cwd, timeout_sec, max_chars), stdout=name_status[0])
+        calls.append((cmd, timeout_sec))
+        if "-M50%" in cmd and timeout_sec < 30:
+            return CmdResult(
+                ok=False, cmd=" ".join(cmd), cwd=cwd, code=None, elapsed_sec=timeout_sec, error="timeout",
+                stdout="", stderr="Command timed out", stdout_truncated=False, stderr_truncated=False,
+            )
+        return _ok_cmd(cmd, cwd, timeout_sec, max_chars)
+
+    monkeypatch.setattr("services.git_service.validate_repo_dir", lambda p: (True, str(tmp_path)))
+    monkeypatch.setattr("services.git_service.run_cmd_blocking", fake_run)
+
+    res = GitService().diff(str(tmp_path), staged=False, summarize_noise=False, diff_algorithm="histogram", rename_limit=50, rename_budget_sec=2, timeout_sec=30)
+    assert res.ok is True
+    assert res.data["renames"] == "disabled_after_budget"
+    (first, first_timeout), (second, second_timeout) = calls
+    assert first_timeout == 2 and "diff.renameLimit=50" in first and "--diff-algorithm=histogram" in first
+    assert "--no-renames" in second and second_timeout == 28
+
+    # nothing to pair up: a slow diff is not killed and redone
+    calls.clear()
+    name_status[0] = "M\x00a.py\x00A\x00b.py"
+    res = GitService().diff(str(tmp_path), staged=False, rename_budget_sec=2, timeout_sec=30)
+    assert res.ok is True and res.data["renames"] == "detected"
+    ((cmd, timeout),) = calls
+    assert timeout == 30 and "-M50%" in cmd
+
+    assert GitService().diff(str(tmp_path), staged=False, diff_algorithm="bogus").error.code == errors.INVALID_INPUT
+
+
+def test_diff_summary_python_symbols_and_tree_cache(git_repo, git):
+    (git_repo / "m.py").write_text("class A:\n    def f(self):\n        return 1\n\n\ndef top():\n    pass\n")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "add m.py")
+    (git_repo / "m.py").write_text("class A:\n    def f(self):\n        return 2\n\n\ndef other():\n    pass\n")
+
+    svc = GitService()
+    res = svc.diff_summary(str(git_repo))
+    assert res.ok and res.data["cached"] is False
+    (f,) = res.data["files"]
+    assert f["method"] == "parser"
+    assert {s["symbol"]: (s["added"], s["deleted"]) for s in f["symbols"]} == {"A.f": (1, 1), "other": (1, 0), "top": (0, 1)}
+
+    git(git_repo, "add", "-A")
+    objects = set(git(git_repo, "cat-file", "--batch-all-objects", "--batch-check=%(objectname)").split())
+    assert svc.diff_summary(str(git_repo), staged=True).data["cached"] is False
+    again = svc.diff_summary(str(git_repo), staged=True)
+    assert again.data["cached"] is True and again.data["files"][0]["symbols"] == f["symbols"]
+    # read-only: no tree objects written for the index
+    assert set(git(git_repo, "cat-file", "--batch-all-objects", "--batch-check=%(objectname)").split()) == objects
+
+    # restaging changes the index checksum
+    (git_repo / "m.py").write_text("def only():\n    pass\n")
+    git(git_repo, "add", "-A")
+    fresh = svc.diff_summary(str(git_repo), staged=True)
+    assert fresh.data["cached"] is False and "only" in {s["symbol"] for s in fresh.data["files"][0]["symbols"]}
+
+    assert svc.diff_summary(str(git_repo), base="HEAD").error.code == errors.INVALID_INPUT
+
+
+def test_read_blobs_skips_oversized_blobs_without_starving_the_rest(git_repo, git, tmp_path):
+    import pytest
+    from utils.git_parse import iter_cat_file_batch
+
+    (tmp_path / "big.py").write_text("x = 1\n" * 1000)
+    (tmp_path / "small.py").write_text("def f():\n    pass\n")
+    big = git(git_repo, "hash-object", "-w", str(tmp_path / "big.py"))
+    small = git(git_repo, "hash-object", "-w", str(tmp_path / "small.py"))
+
+    blobs = GitService()._read_blobs(str(git_repo), sorted([big, small]), 10, max_bytes=100)
+    assert blobs == {small: "def f():\n    pass\n"}
+
+    with pytest.raises(ValueError):
+        list(iter_cat_file_batch(memoryview(f"{small} blob 20\ndef f():\n".encode())))
+
+
+def test_commit_error_details_are_plain_dicts(monkeypatch, tmp_path):
+    import json
+
+    monkeypatch.setattr("services.git_service.validate_repo_dir", lambda p: (True, str(tmp_path)))
+    monkeypatch.setattr("services.git_service.run_cmd_blocking", _fail_cmd)
+
+    res = GitService().commit(str(tmp_path), "msg", 10)
+    assert res.error.code == errors.CMD_FAILED
+    assert res.error.details["stderr"] == "boom"
+    out = res.to_dict()
+    assert out["ok"] is False and out["error"]["details"]["cmd"] == "git status --porcelain"
+    json.dumps(out)
+
+
+def test_clone_and_status_with_submodules(monkeypatch, tmp_path, git_repo, git):
+    # local file:// submodules are blocked by default since git 2.38
+    monkeypatch.setenv("GIT_CONFIG_COUNT", "1")
+    monkeypatch.setenv("GIT_CONFIG_KEY_0", "protocol.file.allow")
+    monkeypatch.setenv("GIT_CONFIG_VALUE_0", "always")
+    lib = tmp_path / "lib"
+    lib.mkdir()
+    git(lib, "init", "-q", "-b", "master")
+    (lib / "lib.py").write_text("x = 1\n")
+    git(lib, "add", "-A")
+    git(lib, "commit", "-q", "-m", "lib")
+    git(git_repo, "submodule", "add", "-q", str(lib), "libs/lib")
+    git(git_repo, "commit", "-q", "-m", "add submodule")
+
+    gs = GitService()
+    dest = tmp_path / "clone"
+    res = gs.clone(str(git_repo), str(dest), recurse_submodules=True, submodule_jobs=4, shallow_submodules=True)
+    assert res.ok, res.error
+    assert [(s["path"], s["state"]) for s in res.data["submodules"]] == [("libs/lib", "in_sync")]
+    assert (dest / "libs" / "lib" / "lib.py").read_text() == "x = 1\n"
+
+    (dest / "libs" / "lib" / "lib.py").write_text("x = 2\n")
+    (dest / "libs" / "lib" / "new.py").write_text("")
+    res = gs.status(str(dest), submodules=True)
+    assert res.ok, res.error
+    sub = res.data["submodules"][0]
+    assert (sub["state"], sub["modified"], sub["untracked"], sub["dirty"]) == ("in_sync", 1, 1, True)
+    assert res.data["submodule_summary"] == {"total": 1, "not_initialized": 0, "commit_changed": 0, "conflict": 0, "dirty": 1}
+
+    assert gs.push(str(dest), recurse_submodules="sometimes").error.code == errors.INVALID_INPUT
@@ -0,0 +1,114 @@
+from services.git_service import GitService
+from services.index_service import IndexService, required_literals
+
+
+def test_required_literals():
+    assert required_literals("def +handle_(request|event)") == ["def", "handle_"]
+    assert required_literals(r"foo\.bar{2}") == ["foo.ba"]
+    assert required_literals("foo.*bar") == ["foo", "bar"]
+    assert required_literals("(ab|cd)e") == []
+    assert required_literals("x(abc)?") == []
+    assert required_literals("a.b", fixed_strings=True) == ["a.b"]
+    assert required_literals(r"\<word\>") == []
+    # bracket expressions and escapes git's ERE may read differently from Python give up
+    assert required_literals("[[:alpha:]]foo") == []
+    assert required_literals(r"\d+\tabc") == []
+    assert required_literals(r"def\s+handle_") == []
+
+
+def test_index_search_builds_then_updates_incrementally(git_repo, git):
+    (git_repo / "b.py").write_text("def handle_request():\n    pass\n")
+    (git_repo / "c.py").write_text("def other():\n    pass\n")
+    (git_repo / "bin.dat").write_bytes(b"handle_request\x00\x01")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "add files")
+
+    svc = IndexService(GitService())
+    res = svc.search(str(git_repo), "def +handle_")
+    assert res.ok
+    assert res.data["index"]["mode"] == "full"
+    assert res.data["index"]["candidates"] == 1
+    assert [(m["path"], m["line"]) for m in res.data["matches"]] == [("b.py", 1)]
+    assert (git_repo / ".git" / "mcp-index" / "trigrams.json.gz").exists()
+
+    res = svc.search(str(git_repo), "HANDLE_REQUEST", ignore_case=True)
+    assert res.data["index"]["mode"] == "cached"
+    assert [m["path"] for m in res.data["matches"]] == ["b.py"]
+
+    (git_repo / "c.py").write_text("def handle_event():\n    pass\n")
+    git(git_repo, "rm", "-q", "b.py")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "move handler")
+
+    # a fresh service reloads the persisted index and only applies the diff
+    res = IndexService(GitService()).search(str(git_repo), "handle_")
+    assert res.data["index"]["mode"] == "incremental"
+    assert [m["path"] for m in res.data["matches"]] == ["c.py"]
+
+    res = svc.search(str(git_repo), "handle_request")
+    assert res.ok and res.data["matches"] == []
+    assert res.data["index"]["candidates"] == 0
+
+    # no usable trigram: plain git grep over the whole tree
+    res = svc.search(str(git_repo), "e")
+    assert res.data["index"]["used_index"] is False
+    assert {m["path"] for m in res.data["matches"]} == {"a.txt", "c.py"}
+
+
+def test_index_search_rejects_bad_input(git_repo):
+    svc = IndexService(GitService())
+    # the pattern is git's ERE, so git grep (not Python's re) reports it as invalid
+    assert svc.search(str(git_repo), "(unclosed").error.code == "command_failed"
+    assert svc.search(str(git_repo), "x", rev="--output=/tmp/x").error.code == "invalid_input"
+    assert svc.search(str(git_repo), "x", rev="nope").error.code == "invalid_input"
+
+
+def test_index_search_verifies_files_too_large_to_index(git_repo, git, monkeypatch):
+    monkeypatch.setattr("services.index_service.MAX_FILE_BYTES", 100)
+    (git_repo / "big.txt").write_text("x = 0\n" * 50 + "needle_value = 1\n")
+    (git_repo / "small.txt").write_text("nothing here\n")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "big file")
+
+    svc = IndexService(GitService())
+    res = svc.search(str(git_repo), "needle_value")
+    assert res.data["index"]["used_index"] is True
+    assert [m["path"] for m in res.data["matches"]] == ["big.txt"]
+
+    git(git_repo, "rm", "-q", "big.txt")
+    git(git_repo, "commit", "-q", "-m", "drop big file")
+    res = svc.search(str(git_repo), "needle_value")
+    assert res.data["index"]["mode"] == "incremental"
+    assert res.data["index"]["candidates"] == 0 and res.data["matches"] == []
+
+
+def test_index_search_matches_posix_classes_like_git_grep(git_repo, git):
+    (git_repo / "x.txt").write_text("xfoo\n")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "x")
+
+    res = IndexService(GitService()).search(str(git_repo), "[[:alpha:]]foo")
+    assert res.data["index"]["candidates"] is None
+    assert [m["path"] for m in res.data["matches"]] == ["x.txt"]
+
+
+def test_concurrent_searches_at_different_revs_stay_consistent(git_repo, git):
+    from utils.concurrency import map_in_threads
+
+    (git_repo / "old.txt").write_text("marker_old\n")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "old")
+    old = git(git_repo, "rev-parse", "HEAD")
+    git(git_repo, "rm", "-q", "old.txt")
+    (git_repo / "new.txt").write_text("marker_new\n")
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "new")
+    new = git(git_repo, "rev-parse", "HEAD")
+
+    svc = IndexService(GitService())
+    revs = [old, new] * 10
+    results = map_in_threads(lambda rev: svc.search(str(git_repo), "marker_", rev=rev), revs, max_workers=4)
+    for rev, res in zip(revs, results):
+        assert res.ok, res.error
+        assert res.data["commit"] == rev
+        assert [m["path"] for m in res.data["matches"]] == (["old.txt"] if rev == old else ["new.txt"])
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+import time
+
+from models.result import ToolResult
+from utils.jobs import JobTable
+from utils.process import run_cmd_blocking
+
+
+def _sleep(sec):
+    res = run_cmd_blocking([sys.executable, "-c", f"import time; time.sleep({sec})"], None, 60)
+    return ToolResult(ok=res.ok, data={"error": res.error})
+
+
+def test_job_runs_in_background_and_returns_result():
+    async def scenario():
+        table = JobTable()
+        job = table.start("sleep", {}, _sleep, 0.2)
+        assert table.get(job.id).to_dict()["status"] == "running"
+        done = await table.wait(job.id, timeout_sec=10)
+        return done.to_dict()
+
+    out = asyncio.run(scenario())
+    assert out["status"] == "succeeded" and out["result"]["ok"] is True
+
+
+def test_cancel_kills_running_job():
+    async def scenario():
+        table = JobTable()
+        job = table.start("sleep", {}, _sleep, 60)
+        await asyncio.sleep(0.2)
+        t0 = time.time()
+        table.cancel(job.id)
+        await table.wait(job.id, timeout_sec=10)
+        return job.status, time.time() - t0
+
+    status, elapsed = asyncio.run(scenario())
+    assert status == "cancelled" and elapsed < 5
+
+
+def test_table_is_bounded_and_finished_jobs_expire():
+    async def scenario():
+        table = JobTable(max_jobs=1, ttl_sec=0.1)
+        first = table.start("sleep", {}, _sleep, 60)
+        assert table.start("sleep", {}, _sleep, 0) is None  # full of running jobs
+        table.cancel(first.id)
+        await table.wait(first.id, timeout_sec=10)
+        # a finished job makes room for a new one
+        second = table.start("sleep", {}, _sleep, 0)
+        await table.wait(second.id, timeout_sec=10)
+        await asyncio.sleep(0.2)
+        return table.get(first.id), table.get(second.id)
+
+    assert asyncio.run(scenario()) == (None, None)
@@ -0,0 +1,38 @@
+from utils.quotas import ClientQuotas
+
+
+def test_client_quota_is_per_client():
+    q = ClientQuotas(max_concurrent=2)
+    assert q.try_acquire("a") and q.try_acquire("a")
+    assert q.try_acquire("a") is False
+    assert q.try_acquire("b") is True
+    q.release("a")
+    assert q.try_acquire("a") is True
+    assert q.active("a") == 2
+
+
+def test_client_quota_zero_is_unlimited():
+    q = ClientQuotas(max_concurrent=0)
+    assert all(q.try_acquire("a") for _ in range(100))
+
+
+def test_quota_key_is_the_server_session_not_request_meta(monkeypatch):
+    import main
+
+    class FakeSession:
+        pass
+
+    class FakeContext:
+        def __init__(self, session, client_id):
+            self.session = session
+            self.client_id = client_id  # client-chosen _meta value, must not matter
+
+    a, b = FakeSession(), FakeSession()
+    ctx = {"current": FakeContext(a, "x")}
+    monkeypatch.setattr(main.mcp, "get_context", lambda: ctx["current"])
+
+    key_a = main._client_key()
+    ctx["current"] = FakeContext(a, "y")
+    assert main._client_key() == key_a
+    ctx["current"] = FakeContext(b, "x")
+    assert main._client_key() != key_a
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+
+from benchmarks.replay import RepoMapper, load_calls, prepare, replay
+from benchmarks.synthetic import RepoSpec
+from utils import recorder
+
+
+def test_recorded_calls_replay_against_synthetic_repos(tmp_path):
+    log = tmp_path / "calls.jsonl"
+
+    @recorder.recorded
+    async def git_status(repo_dir: str, timeout_sec: int = 30) -> dict:
+        ok = repo_dir.startswith("/srv") or os.path.isdir(os.path.join(repo_dir, ".git"))
+        return {"ok": ok, "error": None if ok else {"code": "not_a_git_repo"}}
+
+    @recorder.recorded
+    async def send_email(to: str, subject: str, body: str) -> dict:
+        return {"ok": True}
+
+    recorder.configure(str(log))
+    try:
+        asyncio.run(git_status("/srv/repos/app", timeout_sec=5))
+        asyncio.run(git_status("/gone"))
+        asyncio.run(send_email("a@example.com", "s", "b"))
+    finally:
+        recorder.configure("")
+    asyncio.run(git_status("/not/recorded"))
+
+    calls = load_calls(str(log))
+    assert [(c["tool"], c["ok"], c["error_code"]) for c in calls] == [
+        ("git_status", True, None), ("git_status", False, "not_a_git_repo"), ("send_email", True, None),
+    ]
+    assert calls[0]["args"] == {"repo_dir": "/srv/repos/app", "timeout_sec": 5}
+    json.dumps(calls)
+
+    prepared, skipped = prepare(calls, RepoMapper(str(tmp_path / "work"), RepoSpec(files=5, depth=2, diff_files=1)))
+    assert skipped == {"send_email": 1}
+    synthetic = prepared[0]["args"]["repo_dir"]
+    assert (tmp_path / "work" / "repos" / "0" / ".git").is_dir() and synthetic.endswith("repos/0")
+    assert prepared[1]["args"]["repo_dir"].endswith("not-a-repo")
+
+    seen = []
+
+    async def call_tool(name, args):
+        seen.append((name, args["repo_dir"]))
+        return await git_status(**args)
+
+    out = asyncio.run(replay(prepared, call_tool, concurrency=2))
+    assert len(seen) == 2 and seen[0] == ("git_status", synthetic)
+    assert out["overall"]["count"] == 2
+    assert out["per_tool"]["git_status"]["count"] == 2
+    assert out["errors"] == {"git_status:not_a_git_repo": 1}
+
+
+def test_model_arguments_survive_record_and_replay(tmp_path, git_repo, git):
+    import main
+    from benchmarks.replay import _inprocess_caller
+
+    git(git_repo, "commit", "-q", "--allow-empty", "-m", "second")
+    log = tmp_path / "calls.jsonl"
+    args = {"repo_dir": str(git_repo), "pairs": [{"base": "HEAD~1", "head": "HEAD"}]}
+    recorder.configure(str(log))
+    try:
+        asyncio.run(main.mcp.call_tool("git_compare_branches", args))
+    finally:
+        recorder.configure("")
+
+    (call,) = load_calls(str(log))
+    assert call["ok"] is True
+    assert call["args"]["pairs"] == [{"base": "HEAD~1", "head": "HEAD"}]
+
+    prepared, _ = prepare([call], RepoMapper(str(tmp_path / "work"), RepoSpec(files=5, depth=3, diff_files=1)))
+    out = asyncio.run(replay(prepared, _inprocess_caller(), concurrency=1))
+    assert out["errors"] == {}
+    assert out["per_tool"]["git_compare_branches"]["count"] == 1
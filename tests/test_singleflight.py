@@ -0,0 +1,70 @@
+import threading
+import time
+
+from utils.cancel import CancelToken, _current
+from utils.concurrency import map_in_threads
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_run():
+    sf = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow(x):
+        calls.append(x)
+        started.set()
+        time.sleep(0.3)
+        return x * 2
+
+    def call(_):
+        return sf.do(("slow", 21), slow, 21)
+
+    leader = threading.Thread(target=call, args=(None,))
+    leader.start()
+    started.wait(5)
+    results = map_in_threads(call, range(4), max_workers=4)
+    leader.join()
+
+    assert calls == [21]
+    assert results == [(42, True)] * 4
+    # nothing is kept once the call has finished
+    assert sf.do(("slow", 21), slow, 21) == (42, False)
+    assert calls == [21, 21]
+
+
+def test_followers_rerun_when_the_leader_is_cancelled():
+    sf = SingleFlight()
+    runs = []
+    leader_started = threading.Event()
+    release = threading.Event()
+
+    def fn():
+        runs.append(threading.current_thread().name)
+        if len(runs) == 1:
+            leader_started.set()
+            release.wait(5)
+            return "cancelled"
+        return "fresh"
+
+    token = CancelToken()
+
+    def leader():
+        _current.set(token)
+        out["leader"] = sf.do("k", fn)
+
+    out = {}
+    t = threading.Thread(target=leader)
+    t.start()
+    leader_started.wait(5)
+    follower = threading.Thread(target=lambda: out.__setitem__("follower", sf.do("k", fn)))
+    follower.start()
+    time.sleep(0.1)
+    token.cancel()
+    release.set()
+    t.join()
+    follower.join()
+
+    assert out["leader"] == ("cancelled", False)
+    assert out["follower"] == ("fresh", False)
+    assert len(runs) == 2
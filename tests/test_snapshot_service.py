@@ -0,0 +1,64 @@
+from services.snapshot_service import SnapshotService
+
+
+def test_snapshot_restore_round_trip(git_repo, git):
+    (git_repo / ".gitignore").write_text("*.log\n")
+    git(git_repo, "add", ".gitignore")
+    git(git_repo, "commit", "-q", "-m", "ignore logs")
+
+    (git_repo / "a.txt").write_text("modified\n")
+    (git_repo / "staged.txt").write_text("staged\n")
+    git(git_repo, "add", "staged.txt")
+    (git_repo / "notes").mkdir()
+    (git_repo / "notes" / "todo.md").write_text("untracked\n")
+    (git_repo / "build.log").write_text("ignored\n")
+
+    svc = SnapshotService()
+    snap = svc.snapshot(str(git_repo), label="before experiment")
+    assert snap.ok, snap.error
+    sid = snap.data["snapshot_id"]
+    assert snap.data["untracked_files"] == 1
+    assert snap.data["clean"] is False
+
+    # experiment: commit, edit, delete and add files
+    git(git_repo, "add", "-A")
+    git(git_repo, "commit", "-q", "-m", "experiment")
+    (git_repo / "a.txt").write_text("broken\n")
+    (git_repo / "notes" / "todo.md").write_text("overwritten\n")
+    (git_repo / "staged.txt").unlink()
+    (git_repo / "junk.py").write_text("x = 1\n")
+
+    res = svc.restore(str(git_repo), sid)
+    assert res.ok, res.error
+    assert git(git_repo, "log", "-1", "--format=%s") == "ignore logs"
+    assert (git_repo / "a.txt").read_text() == "modified\n"
+    assert (git_repo / "staged.txt").read_text() == "staged\n"
+    assert (git_repo / "notes" / "todo.md").read_text() == "untracked\n"
+    assert not (git_repo / "junk.py").exists()
+    assert (git_repo / "build.log").exists()  # ignored files are left alone by default
+    # (the fixture strips the leading blank of " M a.txt")
+    assert git(git_repo, "status", "--porcelain").splitlines() == ["M a.txt", "A  staged.txt", "?? notes/"]
+
+    # restoring does not consume the snapshot
+    assert [s["snapshot_id"] for s in svc.list_snapshots(str(git_repo)).data["snapshots"]] == [sid]
+
+
+def test_snapshot_store_is_bounded(git_repo, git):
+    svc = SnapshotService(max_per_repo=2)
+    ids = []
+    for i in range(3):
+        (git_repo / f"u{i}.txt").write_text(f"{i}\n")
+        res = svc.snapshot(str(git_repo))
+        assert res.ok, res.error
+        ids.append(res.data["snapshot_id"])
+
+    assert res.data["evicted"] == [ids[0]]
+    listed = [s["snapshot_id"] for s in svc.list_snapshots(str(git_repo)).data["snapshots"]]
+    assert listed == [ids[2], ids[1]]
+    assert git(git_repo, "for-each-ref", "--format=%(refname)", "refs/mcp-snapshots/").splitlines() == [
+        f"refs/mcp-snapshots/{i}" for i in sorted(ids[1:])
+    ]
+
+    assert svc.restore(str(git_repo), ids[0]).error.code == "snapshot_not_found"
+    assert svc.delete(str(git_repo), ids[1]).ok
+    assert svc.delete(str(git_repo), "../../etc").error.code == "snapshot_not_found"
@@ -0,0 +1,41 @@
+import importlib.util
+
+import pytest
+
+from utils.startup import is_project_module, measure_import, parse_importtime
+
+HEAVY_OPTIONAL = ("smtplib", "email.mime.text", "email_validator")
+
+# Generous budget for our own modules' self time; the mcp/pydantic imports are excluded.
+PROJECT_IMPORT_BUDGET_MS = 500
+
+
+def _imported(rows):
+    return {r["module"] for r in rows}
+
+
+def test_parse_importtime():
+    rows = parse_importtime(
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        150 |   utils.errors\n"
+        "import time:       300 |        450 | main\n"
+    )
+    assert rows == [
+        {"module": "utils.errors", "self_us": 120, "cumulative_us": 150, "depth": 1},
+        {"module": "main", "self_us": 300, "cumulative_us": 450, "depth": 0},
+    ]
+
+
+def test_git_service_import_does_not_load_email_stack():
+    m = measure_import("services.git_service")
+    assert m["ok"], m["stderr"]
+    assert not _imported(m["rows"]) & set(HEAVY_OPTIONAL)
+
+
+@pytest.mark.skipif(importlib.util.find_spec("mcp.server.fastmcp") is None, reason="FastMCP not installed")
+def test_server_import_budget():
+    m = measure_import("main")
+    assert m["ok"], m["stderr"]
+    assert not _imported(m["rows"]) & set(HEAVY_OPTIONAL)
+    project_ms = sum(r["self_us"] for r in m["rows"] if is_project_module(r["module"])) / 1000
+    assert project_ms < PROJECT_IMPORT_BUDGET_MS
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from utils import supervisor as sup
+from utils.process import run_cmd_blocking
+from utils.supervisor import ProcessSupervisor, parse_kind_limits
+
+
+def test_parse_kind_limits():
+    assert parse_kind_limits("git clone=4, git push=2,bad,x=0,y=z") == {"git clone": 4, "git push": 2}
+
+
+def test_kind_limit_serializes_commands():
+    s = ProcessSupervisor(max_procs=10, kind_limits={"python sleep": 1})
+    peak = []
+    active = [0]
+    lock = threading.Lock()
+
+    def worker():
+        with s.slot("python sleep", 5) as ok:
+            assert ok
+            with lock:
+                active[0] += 1
+                peak.append(active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(peak) == 1
+
+
+def test_slot_wait_times_out_as_command_timeout():
+    sup.configure(ProcessSupervisor(max_procs=1))
+    try:
+        with sup.supervisor().slot("other", 1) as ok:
+            assert ok
+            res = run_cmd_blocking(["python", "-c", "print('hi')"], cwd=None, timeout_sec=0.2)
+        assert res.ok is False
+        assert res.error == "timeout"
+        assert "process slot" in res.stderr
+    finally:
+        sup.configure(ProcessSupervisor())
+
+
+def test_rlimits_are_in_place_when_the_command_starts():
+    sup.configure(ProcessSupervisor(mem_limit_mb=512, cpu_limit_sec=7))
+    try:
+        res = run_cmd_blocking(
+            ["python", "-c", "import resource; print(resource.getrlimit(resource.RLIMIT_AS)[0], resource.getrlimit(resource.RLIMIT_CPU)[0])"],
+            cwd=None, timeout_sec=10,
+        )
+        assert res.ok, res.stderr
+        assert res.stdout.split() == [str(512 * 1024 * 1024), "7"]
+    finally:
+        sup.configure(ProcessSupervisor())
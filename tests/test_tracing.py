@@ -0,0 +1,125 @@
+import contextvars
+import json
+import threading
+
+from utils import tracing
+from utils.process import run_cmd_blocking
+
+
+def _read(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_nested_spans_exported_to_jsonl(tmp_path):
+    out = tmp_path / "traces.jsonl"
+    tracing.configure(tracing.JsonlExporter(str(out)), sample_rate=1.0)
+    try:
+        with tracing.span("tool.x", repo_dir="r"):
+            # contextvars are copied into threads the same way asyncio.to_thread does
+            ctx = contextvars.copy_context()
+            t = threading.Thread(target=ctx.run, args=(run_cmd_blocking, ["python", "-c", "print('hi')"], None, 5))
+            t.start()
+            t.join()
+    finally:
+        tracing.configure()
+
+    spans = {s["name"]: s for s in _read(out)}
+    assert set(spans) == {"tool.x", "cmd"}
+    assert spans["cmd"]["parent_id"] == spans["tool.x"]["span_id"]
+    assert spans["cmd"]["trace_id"] == spans["tool.x"]["trace_id"]
+    assert spans["cmd"]["attributes"]["exit_code"] == 0
+    assert spans["cmd"]["attributes"]["stdout_bytes"] > 0
+
+
+def test_unsampled_traces_are_dropped_unless_failed(tmp_path):
+    out = tmp_path / "traces.jsonl"
+    tracing.configure(tracing.JsonlExporter(str(out)), sample_rate=0.0)
+    try:
+        with tracing.span("dropped"):
+            pass
+
+        @tracing.traced("kept")
+        def failing():
+            return {"ok": False, "error": {"code": "command_failed"}}
+
+        failing()
+    finally:
+        tracing.configure()
+
+    spans = _read(out)
+    assert [s["name"] for s in spans] == ["kept"]
+    assert spans[0]["status"] == "error"
+    assert spans[0]["attributes"]["error_code"] == "command_failed"
+
+
+def test_background_job_spans_are_exported_as_their_own_trace(tmp_path):
+    import asyncio
+    from models.result import ToolResult
+    from utils.jobs import JobTable
+
+    out = tmp_path / "traces.jsonl"
+    tracing.configure(tracing.JsonlExporter(str(out)), sample_rate=1.0)
+
+    def work():
+        res = run_cmd_blocking(["python", "-c", "pass"], None, 10)
+        return ToolResult(ok=res.ok)
+
+    async def scenario():
+        table = JobTable()
+        with tracing.span("tool.start_job"):
+            job = table.start("work", {}, work)
+        # the tool span has been flushed before the job runs
+        await table.wait(job.id, timeout_sec=10)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        tracing.configure()
+
+    spans = {s["name"]: s for s in _read(out)}
+    assert set(spans) == {"tool.start_job", "job.work", "cmd"}
+    assert spans["job.work"]["parent_id"] is None
+    assert spans["job.work"]["attributes"]["link_span_id"] == spans["tool.start_job"]["span_id"]
+    assert spans["cmd"]["parent_id"] == spans["job.work"]["span_id"]
+    assert spans["cmd"]["trace_id"] == spans["job.work"]["trace_id"] != spans["tool.start_job"]["trace_id"]
+
+
+def test_slow_exporter_does_not_block_the_caller():
+    import time
+
+    exported = []
+
+    class SlowExporter:
+        def export(self, spans):
+            time.sleep(0.3)
+            exported.extend(spans)
+
+    tracing.configure(SlowExporter(), sample_rate=1.0)
+    try:
+        t0 = time.perf_counter()
+        for i in range(4):
+            with tracing.span(f"tool.{i}"):
+                pass
+        assert time.perf_counter() - t0 < 0.2
+    finally:
+        tracing.configure()  # drains the queue of the replaced tracer
+    assert sorted(s.name for s in exported) == ["tool.0", "tool.1", "tool.2", "tool.3"]
+
+
+def test_full_export_queue_drops_traces():
+    import threading
+
+    release = threading.Event()
+
+    class BlockedExporter:
+        def export(self, spans):
+            release.wait(5)
+
+    tracer = tracing.Tracer(BlockedExporter(), queue_size=1)
+    root = tracing.Span(name="t", trace_id="a", span_id="b", parent_id=None, start_ns=0, end_ns=1)
+    root.finished.append(root)
+    for _ in range(5):
+        tracer.flush(root, sampled=True)
+    assert tracer.dropped >= 3
+    release.set()
+    tracer.close()
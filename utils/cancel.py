@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import threading
+from typing import Any, Callable, Optional, Set
+
+
+class CancelToken:
+    """
+    Cancellation handle shared between an MCP request and the worker thread
+    running its blocking service call. Cancelling kills every child process
+    registered with the token (see utils.process) and makes later spawns fail fast.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._procs: Set[Any] = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def register(self, proc) -> bool:
+        """Track a running process. Returns False if the token is already cancelled."""
+        with self._lock:
+            if self._cancelled:
+                return False
+            self._procs.add(proc)
+            return True
+
+    def unregister(self, proc) -> None:
+        with self._lock:
+            self._procs.discard(proc)
+
+    def cancel(self) -> None:
+        from utils.process import kill_process_tree
+
+        with self._lock:
+            self._cancelled = True
+            procs = list(self._procs)
+            self._procs.clear()
+        for proc in procs:
+            kill_process_tree(proc)
+
+
+_current: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current.get()
+
+
+async def run_cancellable(fn: Callable, *args: Any, token: Optional[CancelToken] = None) -> Any:
+    """
+    asyncio.to_thread() that propagates cancellation: if the awaiting task is
+    cancelled (e.g. the MCP client gave up), the git child processes started
+    by `fn` are killed instead of running to completion in the background.
+    """
+    token = token or CancelToken()
+    reset = _current.set(token)
+    try:
+        # to_thread copies the current context, so the worker sees the token
+        return await asyncio.to_thread(fn, *args)
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
+    finally:
+        _current.reset(reset)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def map_in_threads(fn: Callable[[T], R], items: Iterable[T], max_workers: int) -> List[R]:
+    """
+    Run `fn` over `items` with bounded parallelism, preserving order. Each call
+    runs in a copy of the caller's context, so trace spans and the request's
+    cancel token follow the work into the pool threads.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if max_workers <= 1 or len(items) == 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        return [f.result() for f in futures]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import fnmatch
+import os
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Files whose diffs are noise for a reviewer: lockfiles, minified/bundled output, generated code.
+DEFAULT_SUMMARY_GLOBS = (
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml",
+    "poetry.lock", "Pipfile.lock", "uv.lock", "Cargo.lock", "Gemfile.lock",
+    "composer.lock", "go.sum", "*.min.js", "*.min.css", "*.map", "*.pb.go", "*_pb2.py",
+)
+
+# Attributes read with git check-attr
+CHECK_ATTRS = ("linguist-generated", "diff", "filter")
+
+# `git diff -G` regex for the oid line of a Git LFS pointer file
+LFS_POINTER_OID_RE = "^oid sha256:[0-9a-f]{64}$"
+# pointer files are three lines; a changed pointer touches at most all of them
+LFS_POINTER_MAX_LINES = 3
+# the LFS spec caps pointer files at 1024 bytes, and they start with the version line
+LFS_POINTER_MAX_BYTES = 1024
+LFS_POINTER_PREFIX = b"version https://git-lfs.github.com/spec/"
+
+
+def looks_like_lfs_pointer(path: str) -> bool:
+    """Cheap on-disk check (size + first line) that picks the files worth confirming with `git diff -G`."""
+    try:
+        if os.path.getsize(path) > LFS_POINTER_MAX_BYTES:
+            return False
+        with open(path, "rb") as f:
+            return f.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+    except OSError:
+        return False
+
+
+def parse_globs(spec: str) -> Tuple[str, ...]:
+    return tuple(g.strip() for g in (spec or "").split(",") if g.strip())
+
+
+@dataclass(frozen=True)
+class DiffRules:
+    """
+    Which changed files git_diff reports as one-line summaries instead of
+    patches. Checked in order: glob, gitattributes (linguist-generated, -diff,
+    filter=lfs), changed-line threshold. LFS pointers are detected separately.
+    """
+    globs: Tuple[str, ...] = DEFAULT_SUMMARY_GLOBS
+    max_changed_lines: int = 2000  # 0 = no limit
+    use_attributes: bool = True
+    detect_lfs_pointers: bool = True
+
+    def match_glob(self, path: str, extra_globs: Iterable[str] = ()) -> Optional[str]:
+        base = path.rsplit("/", 1)[-1]
+        for g in (*self.globs, *extra_globs):
+            # patterns without a slash match the file name anywhere, like .gitignore
+            if fnmatch.fnmatchcase(path, g) or ("/" not in g and fnmatch.fnmatchcase(base, g)):
+                return g
+        return None
+
+    def classify(
+        self,
+        path: str,
+        added: Optional[int],
+        deleted: Optional[int],
+        attrs: Dict[str, str],
+        extra_globs: Iterable[str] = (),
+    ) -> Optional[str]:
+        """Reason to summarize this file, or None to diff it normally."""
+        g = self.match_glob(path, extra_globs)
+        if g:
+            return f"matches {g}"
+        if attrs.get("filter") == "lfs":
+            return "lfs"
+        if attrs.get("linguist-generated") in ("set", "true"):
+            return "linguist-generated"
+        if attrs.get("diff") == "unset":
+            return "-diff"
+        if self.max_changed_lines and added is not None and deleted is not None and added + deleted > self.max_changed_lines:
+            return f"more than {self.max_changed_lines} changed lines"
+        return None
+
+
+def parse_numstat(out: str) -> List[Tuple[str, Optional[int], Optional[int]]]:
+    """`git diff --numstat -z --no-renames` -> [(path, added, deleted)]; counts are None for binary files."""
+    rows = []
+    for rec in out.split("\x00"):
+        parts = rec.strip("\n").split("\t")
+        if len(parts) != 3 or not parts[2]:
+            continue
+        a, d, path = parts
+        try:
+            rows.append((path, None if a == "-" else int(a), None if d == "-" else int(d)))
+        except ValueError:
+            continue
+    return rows
+
+
+def parse_check_attr(out: str) -> Dict[str, Dict[str, str]]:
+    """`git check-attr -z` (path NUL attr NUL value NUL ...) -> {path: {attr: value}}."""
+    parts = out.split("\x00")
+    attrs: Dict[str, Dict[str, str]] = {}
+    for i in range(0, len(parts) - 2, 3):
+        path, attr, value = parts[i], parts[i + 1], parts[i + 2]
+        if value != "unspecified":
+            attrs.setdefault(path, {})[attr] = value
+    return attrs
+
+
+_rules = DiffRules()
+
+
+def configure(globs: Tuple[str, ...] = DEFAULT_SUMMARY_GLOBS, max_changed_lines: int = 2000) -> None:
+    global _rules
+    _rules = DiffRules(globs=globs, max_changed_lines=max_changed_lines)
+
+
+def configure_from_settings(settings) -> None:
+    configure(parse_globs(settings.DIFF_SUMMARY_GLOBS), settings.DIFF_MAX_CHANGED_LINES)
+
+
+def rules() -> DiffRules:
+    return _rules
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import ast
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+# A symbol parser maps source text to [(qualified_name, first_line, last_line)], 1-based inclusive.
+SymbolParser = Callable[[str], List[Tuple[str, int, int]]]
+
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@ ?(.*)$")
+
+
+def python_symbols(source: str) -> List[Tuple[str, int, int]]:
+    """Classes and functions (methods as Class.method) with their line spans, decorators included."""
+    symbols: List[Tuple[str, int, int]] = []
+
+    def visit(node: ast.AST, prefix: str) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                name = f"{prefix}{child.name}"
+                start = min([child.lineno] + [d.lineno for d in child.decorator_list])
+                symbols.append((name, start, child.end_lineno or child.lineno))
+                visit(child, f"{name}.")
+            else:
+                visit(child, prefix)
+
+    visit(ast.parse(source), "")
+    return symbols
+
+
+_parsers: Dict[str, SymbolParser] = {".py": python_symbols, ".pyi": python_symbols}
+
+
+def register_parser(extension: str, parser: SymbolParser) -> None:
+    """Use `parser` for files ending in `extension` (e.g. ".go"). Files without one fall back to hunk headers."""
+    _parsers[extension] = parser
+
+
+def parser_for(path: str) -> Optional[SymbolParser]:
+    dot = path.rfind(".")
+    return _parsers.get(path[dot:]) if dot > path.rfind("/") else None
+
+
+_UNQUOTE = {"t": "\t", "n": "\n", '"': '"', "\\": "\\"}
+
+
+def _path(header_path: str, prefix: str) -> str:
+    """Strip the a/ or b/ prefix; undo git's C-style quoting (run with core.quotePath=false)."""
+    if header_path.startswith('"') and header_path.endswith('"'):
+        header_path = re.sub(r'\\(.)', lambda m: _UNQUOTE.get(m.group(1), m.group(1)), header_path[1:-1])
+    return header_path[len(prefix):] if header_path.startswith(prefix) else header_path
+
+
+def parse_unified_zero(patch: str) -> List[Dict]:
+    """
+    Parse `git diff -U0 --full-index` output into per-file records:
+    {path, old_path, status, old_oid, new_oid, binary, hunks: [(old_start, old_count, new_start, new_count, header)]}.
+    """
+    files: List[Dict] = []
+    cur: Optional[Dict] = None
+    for line in patch.split("\n"):
+        if line.startswith("diff --git "):
+            a, _, b = line[len("diff --git "):].partition(" b/")
+            cur = {
+                "path": _path(b, ""), "old_path": _path(a, "a/"), "status": "modified",
+                "old_oid": "", "new_oid": "", "binary": False, "hunks": [],
+            }
+            files.append(cur)
+        elif cur is None:
+            continue
+        elif line.startswith("@@"):
+            m = _HUNK.match(line)
+            if m:
+                cur["hunks"].append((
+                    int(m.group(1)), int(m.group(2) if m.group(2) is not None else 1),
+                    int(m.group(3)), int(m.group(4) if m.group(4) is not None else 1),
+                    m.group(5).strip(),
+                ))
+        elif cur["hunks"] and line.startswith(("+", "-", " ", "\\")):
+            # hunk body (or "\ No newline"); only the hunk headers carry what we need
+            continue
+        elif line.startswith("new file mode"):
+            cur["status"] = "added"
+        elif line.startswith("deleted file mode"):
+            cur["status"] = "deleted"
+        elif line.startswith("rename from "):
+            cur["status"], cur["old_path"] = "renamed", _path(line[len("rename from "):], "")
+        elif line.startswith("rename to "):
+            cur["path"] = _path(line[len("rename to "):], "")
+        elif line.startswith("copy from "):
+            cur["status"], cur["old_path"] = "copied", _path(line[len("copy from "):], "")
+        elif line.startswith("copy to "):
+            cur["path"] = _path(line[len("copy to "):], "")
+        elif line.startswith("index "):
+            oids = line.split()[1]
+            cur["old_oid"], _, cur["new_oid"] = oids.partition("..")
+        elif line.startswith("+++ ") and line != "+++ /dev/null":
+            cur["path"] = _path(line[4:], "b/")
+        elif line.startswith("--- ") and line != "--- /dev/null":
+            cur["old_path"] = _path(line[4:], "a/")
+        elif line.startswith("Binary files "):
+            cur["binary"] = True
+    return files
+
+
+def _line_owners(symbols: List[Tuple[str, int, int]], n_lines: int) -> List[Optional[str]]:
+    """Innermost symbol for every line (index = line number)."""
+    owners: List[Optional[str]] = [None] * (n_lines + 2)
+    # outer symbols start first, so painting in start order lets nested ones win
+    for name, start, end in sorted(symbols, key=lambda s: (s[1], -s[2])):
+        for i in range(max(start, 1), min(end, n_lines + 1) + 1):
+            owners[i] = name
+    return owners
+
+
+def summarize_file(
+    f: Dict,
+    old_source: Optional[str] = None,
+    new_source: Optional[str] = None,
+) -> Dict:
+    """
+    Changed-line counts per symbol for one parsed file. With a symbol parser and
+    both sides' source (where they exist) lines are attributed via the parser;
+    otherwise the hunk header (git's funcname context) names the symbol.
+    """
+    parser = parser_for(f["path"])
+    old_owners = new_owners = None
+    method = "hunk-header"
+    if parser is not None and not f["binary"]:
+        try:
+            if new_source is not None:
+                new_owners = _line_owners(parser(new_source), new_source.count("\n") + 1)
+            if old_source is not None:
+                old_owners = _line_owners(parser(old_source), old_source.count("\n") + 1)
+            if (new_owners is not None or f["status"] == "deleted") and (old_owners is not None or f["status"] == "added"):
+                method = "parser"
+        except (SyntaxError, ValueError, RecursionError):
+            old_owners = new_owners = None
+
+    counts: Dict[str, List[int]] = {}
+    added = deleted = 0
+    for old_start, old_count, new_start, new_count, header in f["hunks"]:
+        added += new_count
+        deleted += old_count
+        if method == "parser":
+            for ln in range(new_start, new_start + new_count):
+                name = (new_owners[ln] if ln < len(new_owners) else None) or "<module>"
+                counts.setdefault(name, [0, 0])[0] += 1
+            for ln in range(old_start, old_start + old_count):
+                name = (old_owners[ln] if ln < len(old_owners) else None) or "<module>"
+                counts.setdefault(name, [0, 0])[1] += 1
+        else:
+            c = counts.setdefault(header or "<top>", [0, 0])
+            c[0] += new_count
+            c[1] += old_count
+
+    out = {
+        "path": f["path"],
+        "status": f["status"],
+        "added": added,
+        "deleted": deleted,
+        "binary": f["binary"],
+        "method": method,
+        "symbols": [{"symbol": k, "added": v[0], "deleted": v[1]} for k, v in counts.items()],
+    }
+    if f["old_path"] != f["path"]:
+        out["old_path"] = f["old_path"]
+    return out
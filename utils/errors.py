@@ -12,3 +12,8 @@ EMAIL_CONFIG_MISSING = "email_config_missing"
 EMAIL_SEND_FAILED = "email_send_failed"
 BRANCH_DETECT_FAILED = "branch_detect_failed"
 ON_BASE_BRANCH = "on_base_branch"
+CLIENT_QUOTA_EXCEEDED = "client_quota_exceeded"
+JOB_NOT_FOUND = "job_not_found"
+JOB_TABLE_FULL = "job_table_full"
+JOB_FAILED = "job_failed"
+SNAPSHOT_NOT_FOUND = "snapshot_not_found"
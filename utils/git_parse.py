@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Tuple
+
+# Field separator for custom --format strings; records are NUL-terminated via -z.
+FIELD_SEP = "\x1f"
+
+LOG_FORMAT = FIELD_SEP.join(["%H", "%P", "%an", "%ae", "%aI", "%s"])
+
+
+def parse_log_records(out: str) -> List[Dict[str, Any]]:
+    """Parse `git log -z --format=LOG_FORMAT` output into commit records."""
+    records = []
+    for rec in out.split("\x00"):
+        rec = rec.strip("\n")
+        if not rec:
+            continue
+        parts = rec.split(FIELD_SEP)
+        if len(parts) != 6:
+            continue  # truncated tail
+        oid, parents, name, email, date, subject = parts
+        records.append({
+            "oid": oid,
+            "parents": parents.split() if parents else [],
+            "author": name,
+            "author_email": email,
+            "date": date,
+            "subject": subject,
+        })
+    return records
+
+
+PUSH_FLAGS = {
+    " ": "fast_forward",
+    "+": "forced",
+    "-": "deleted",
+    "*": "new",
+    "!": "rejected",
+    "=": "up_to_date",
+}
+
+
+def parse_push_porcelain(out: str) -> List[Dict[str, Any]]:
+    """
+    Parse `git push --porcelain` ref lines:
+        <flag> TAB <from>:<to> TAB <summary> [(<reason>)]
+    "To <url>" and "Done" lines are skipped.
+    """
+    refs = []
+    for line in out.splitlines():
+        if len(line) < 2 or line[1] != "\t" or line[0] not in PUSH_FLAGS:
+            continue
+        parts = line[2:].split("\t")
+        if len(parts) < 2:
+            continue
+        src, _, dst = parts[0].partition(":")
+        summary = parts[1]
+        reason = ""
+        if summary.endswith(")") and " (" in summary:
+            summary, _, reason = summary[:-1].partition(" (")
+        refs.append({
+            "status": PUSH_FLAGS[line[0]],
+            "src": src,
+            "dst": dst,
+            "summary": summary,
+            "reason": reason,
+        })
+    return refs
+
+
+
+_SIZE_UNITS = {"byte": 1, "bytes": 1, "KiB": 1 << 10, "MiB": 1 << 20, "GiB": 1 << 30}
+# final state of index-pack's progress line, e.g. "Receiving objects: 100% (52/52), 978.81 KiB | 26.45 MiB/s, done."
+_RECEIVED = re.compile(r"Receiving objects: .*?, (\d+(?:\.\d+)?) (GiB|MiB|KiB|bytes?)\b")
+_REMOTE_TOTAL = re.compile(r"^remote: Total (\d+)", re.MULTILINE)
+
+
+def parse_fetch_progress(err: str) -> Tuple[str, Any]:
+    """
+    Split `git fetch --progress` stderr into (stderr without the progress
+    redraws, bytes received). Each progress line is reduced to its final state
+    (the text after the last "\r"). Bytes come from index-pack's "Receiving
+    objects" line, precise to git's two decimals of the unit; 0 if nothing was
+    transferred, None if objects arrived but git did not report a size.
+    """
+    lines = [line.rsplit("\r", 1)[-1].rstrip() for line in err.split("\n")]  # splitlines() would split on "\r" too
+    text = "\n".join(line for line in lines if line)
+    received = None
+    for m in _RECEIVED.finditer(text):
+        received = round(float(m.group(1)) * _SIZE_UNITS[m.group(2)])
+    if received is None:
+        total = _REMOTE_TOTAL.search(text)
+        if total is None or int(total.group(1)) == 0:
+            received = 0
+    return text, received
+
+
+# `git submodule status` prefix characters
+SUBMODULE_FLAGS = {" ": "in_sync", "-": "not_initialized", "+": "commit_changed", "U": "conflict"}
+# the flag is optional: a blank flag on the first line is lost when the output is stripped
+_SUBMODULE_LINE = re.compile(r"^([ +\-U]?)([0-9a-f]{40,64}) (.+?)(?: \((.*)\))?$")
+
+
+def parse_submodule_status(out: str) -> List[Dict[str, Any]]:
+    """
+    Parse `git submodule status [--recursive]` lines:
+        <flag><oid> SP <path> [SP (<describe>)]
+    The oid is the checked-out commit (the recorded one when not initialized).
+    """
+    subs = []
+    for line in out.splitlines():
+        m = _SUBMODULE_LINE.match(line)
+        if not m:
+            continue
+        subs.append({
+            "path": m.group(3),
+            "commit": m.group(2),
+            "state": SUBMODULE_FLAGS[m.group(1) or " "],
+            "describe": m.group(4) or "",
+        })
+    return subs
+
+def decode_path(raw: bytes) -> str:
+    """
+    Path bytes from git output as text. Every parser uses this one policy
+    (undecodable bytes become U+FFFD, as in command output), so a non-UTF-8
+    name looks the same in every tool.
+    """
+    return raw.decode("utf-8", errors="replace")
+
+
+def parse_grep_line(line: bytes, rev: str = "", max_text: int = 500) -> Dict[str, Any]:
+    """
+    Parse one `git grep -z -n --column` line: path NUL line NUL column NUL text.
+    When grepping a revision git prefixes the path with "<rev>:".
+    """
+    parts = line.rstrip(b"\n").split(b"\x00", 3)
+    if len(parts) != 4:
+        return {}
+    path = decode_path(parts[0])
+    if rev and path.startswith(rev + ":"):
+        path = path[len(rev) + 1:]
+    text = parts[3].decode("utf-8", errors="replace")
+    try:
+        line_no, column = int(parts[1]), int(parts[2])
+    except ValueError:
+        return {}
+    return {"path": path, "line": line_no, "column": column, "text": text[:max_text]}
+
+
+def parse_ls_tree_entry(rec: bytes) -> Dict[str, Any]:
+    """Parse one `git ls-tree -l -z` record: mode SP type SP oid SP size TAB path."""
+    meta, _, path = rec.partition(b"\t")
+    parts = meta.split()
+    if len(parts) != 4 or not path:
+        return {}
+    mode, otype, oid, size = (p.decode() for p in parts)
+    return {
+        "path": decode_path(path),
+        "type": otype,
+        "mode": mode,
+        "oid": oid,
+        "size": int(size) if size != "-" else None,
+    }
+
+
+def iter_cat_file_batch(buf: memoryview):
+    """
+    Yield (oid, content) from `git cat-file --batch` output without copying the
+    whole buffer. Raises ValueError when the output ends inside a header or an
+    object (e.g. cut off by an output cap), instead of yielding a partial blob.
+    """
+    pos, end = 0, len(buf)
+    raw = buf.obj if isinstance(buf.obj, bytes) else bytes(buf)
+    while pos < end:
+        nl = raw.find(b"\n", pos, end)
+        if nl < 0:
+            raise ValueError("truncated git cat-file --batch output")
+        header = raw[pos:nl].split()
+        pos = nl + 1
+        if len(header) < 3 or header[1] == b"missing":
+            continue
+        size = int(header[2])
+        if pos + size > end:
+            raise ValueError("truncated git cat-file --batch output")
+        yield header[0].decode(), buf[pos:pos + size]
+        pos += size + 1
+
+
+_BLAME_HEADER = re.compile(r"^([0-9a-f]{40,64}) (\d+) (\d+)(?: (\d+))?$")
+
+
+def parse_blame(out: str) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Parse `git blame --incremental` or `--porcelain` output into line ranges
+    sorted by final line, plus per-commit info (emitted by git only the first
+    time a commit appears). Adjacent lines from the same commit are merged.
+    Porcelain output also carries the line text ("\t" lines).
+    """
+    commits: Dict[str, Dict[str, Any]] = {}
+    entries: List[Dict[str, Any]] = []
+    cur: Dict[str, Any] = {}
+    for line in out.split("\n"):
+        if line.startswith("\t"):
+            if cur:
+                cur["text"].append(line[1:])
+            continue
+        m = _BLAME_HEADER.match(line)
+        if m:
+            oid = m.group(1)
+            prev_path = entries[-1]["orig_path"] if entries else ""
+            cur = {
+                "commit": oid,
+                "orig_start": int(m.group(2)),
+                "start": int(m.group(3)),
+                "lines": int(m.group(4) or 1),
+                # porcelain repeats the filename only on a group's first line
+                "orig_path": "" if m.group(4) else prev_path,
+                "text": [],
+            }
+            entries.append(cur)
+            commits.setdefault(oid, {})
+            continue
+        if not cur or not line:
+            continue
+        key, _, val = line.partition(" ")
+        info = commits[cur["commit"]]
+        if key == "filename":
+            cur["orig_path"] = val
+        elif key == "author":
+            info["author"] = val
+        elif key == "author-mail":
+            info["author_email"] = val.strip("<>")
+        elif key == "author-time":
+            info["author_time"] = int(val)
+        elif key == "summary":
+            info["summary"] = val
+        elif key == "boundary":
+            info["boundary"] = True
+
+    ranges: List[Dict[str, Any]] = []
+    for e in sorted(entries, key=lambda e: e["start"]):
+        last = ranges[-1] if ranges else None
+        if (
+            last is not None
+            and last["commit"] == e["commit"]
+            and last["orig_path"] == e["orig_path"]
+            and last["end"] + 1 == e["start"]
+            and last["orig_start"] + (last["end"] - last["start"]) + 1 == e["orig_start"]
+        ):
+            last["end"] += e["lines"]
+            last["text"] += e["text"]
+            continue
+        ranges.append({
+            "start": e["start"],
+            "end": e["start"] + e["lines"] - 1,
+            "commit": e["commit"],
+            "orig_start": e["orig_start"],
+            "orig_path": e["orig_path"],
+            "text": e["text"],
+        })
+    return ranges, commits
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from models.result import ToolResult, ErrorInfo
+from utils import errors
+from utils.cancel import CancelToken, run_cancellable
+from utils.tracing import mark_result, detached_span
+
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class Job:
+    """One background tool call. `result` is the ToolResult dict once finished."""
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.params = params
+        self.status = RUNNING
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.token = CancelToken()
+        self.task: Optional[asyncio.Task] = None
+        self.done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status != RUNNING
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        end = self.finished_at or time.time()
+        out = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "elapsed_sec": round(end - self.created_at, 3),
+        }
+        if include_result and self.finished:
+            out["result"] = self.result
+        return out
+
+
+class JobTable:
+    """
+    Bounded table of background jobs. Finished jobs are kept for `ttl_sec` so
+    clients can collect their result, then dropped; when the table is full the
+    oldest finished job is evicted, and new jobs are refused if all are running.
+    """
+
+    def __init__(self, max_jobs: int = 256, ttl_sec: float = 3600.0):
+        self.max_jobs = max_jobs
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def _expire(self, now: float) -> None:
+        for job_id in [j.id for j in self._jobs.values() if j.finished and now - j.finished_at > self.ttl_sec]:
+            del self._jobs[job_id]
+
+    def _make_room(self) -> bool:
+        self._expire(time.time())
+        if len(self._jobs) < self.max_jobs:
+            return True
+        oldest_finished = next((j.id for j in self._jobs.values() if j.finished), None)
+        if oldest_finished is None:
+            return False
+        del self._jobs[oldest_finished]
+        return True
+
+    def start(self, kind: str, params: Dict[str, Any], fn: Callable, *args: Any) -> Optional[Job]:
+        """Run `fn(*args)` (a blocking service call returning a ToolResult) as a job; None if the table is full."""
+        with self._lock:
+            if not self._make_room():
+                return None
+            job = Job(kind, params)
+            self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, fn, *args))
+        return job
+
+    async def _run(self, job: Job, fn: Callable, *args: Any) -> None:
+        try:
+            # its own trace: the tool call that started the job has returned (and flushed) by now
+            with detached_span(f"job.{job.kind}", job_id=job.id) as sp:
+                res = await run_cancellable(fn, *args, token=job.token)
+                mark_result(sp, res)
+            job.result = res.to_dict()
+            job.status = SUCCEEDED if res.ok else FAILED
+            if job.token.cancelled:
+                job.status = CANCELLED
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+            raise
+        except Exception as e:  # keep the job table consistent whatever the service raises
+            job.status = FAILED
+            job.result = ToolResult(
+                ok=False,
+                error=ErrorInfo(code=errors.JOB_FAILED, message=f"Background job raised: {e}", details={"kind": job.kind}),
+            ).to_dict()
+        finally:
+            job.finished_at = time.time()
+            job.done.set()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._expire(time.time())
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        with self._lock:
+            self._expire(time.time())
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            # kills the git process tree and makes later spawns fail fast; the worker
+            # thread then returns a "cancelled" result and _run marks the job
+            job.token.cancel()
+        return job
+
+    async def wait(self, job_id: str, timeout_sec: float) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            try:
+                await asyncio.wait_for(job.done.wait(), timeout=timeout_sec)
+            except asyncio.TimeoutError:
+                pass
+        return job
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import shutil
 
 
 def abspath(p: str) -> str:
@@ -25,3 +26,48 @@ def is_dir_empty(path: str) -> bool:
 
 def is_git_repo(repo_dir_abs: str) -> bool:
     return os.path.isdir(os.path.join(repo_dir_abs, ".git"))
+
+
+# Linux FICLONE ioctl: copy-on-write clone of a file on btrfs/XFS/overlay-capable filesystems.
+_FICLONE = 0x40049409
+
+
+def _reflink(src: str, dst: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:  # Windows
+        return False
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        return False
+
+
+def clone_file(src: str, dst: str, hardlink: bool = False) -> str:
+    """
+    Cheapest independent copy of `src` at `dst`: a reflink where the filesystem
+    supports it, otherwise a plain copy. With hardlink=True a hard link is tried
+    first; it shares the inode, so in-place edits of either path show up in both.
+    Symlinks are recreated, not followed. Returns the method used.
+    """
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    if os.path.islink(src):
+        os.symlink(os.readlink(src), dst)
+        return "symlink"
+    if hardlink:
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    if _reflink(src, dst):
+        shutil.copymode(src, dst)
+        return "reflink"
+    shutil.copy2(src, dst)
+    return "copy"
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def gzip_base64(buf: Buffer, level: int = 6) -> str:
+    """Compress a buffer and return it as base64 text (one copy per stage, no decode)."""
+    return base64.b64encode(gzip.compress(buf, compresslevel=level)).decode("ascii")
+
+
+class BlobStore:
+    """
+    In-memory, byte-bounded LRU of large payloads (e.g. diffs) that are handed
+    to clients as MCP resource URIs instead of inline JSON. Keys are content
+    hashes, so identical payloads are stored once.
+    """
+
+    def __init__(self, scheme: str, max_bytes: int = 256 * 1024 * 1024):
+        self.scheme = scheme
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+
+    def put(self, buf: Buffer) -> str:
+        digest = hashlib.sha256(buf).hexdigest()
+        with self._lock:
+            if digest in self._items:
+                self._items.move_to_end(digest)
+            else:
+                data = bytes(buf)
+                self._items[digest] = data
+                self._size += len(data)
+                while self._size > self.max_bytes and len(self._items) > 1:
+                    _, old = self._items.popitem(last=False)
+                    self._size -= len(old)
+        return f"{self.scheme}://{digest}"
+
+    def get(self, digest: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._items.get(digest)
+            if data is not None:
+                self._items.move_to_end(digest)
+            return data
+
+
+diff_store = BlobStore("git-diff")
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
-from typing import Optional, Dict, List
-import os, subprocess, time
+from contextlib import contextmanager
+from typing import Optional, Dict, Iterator, List
+import os, signal, subprocess, threading, time
 
 from models.cmd_result import CmdResult
+from utils.cancel import current_token
+from utils.supervisor import supervisor
+from utils.timeouts import adaptive
+from utils.tracing import span
 
 DEFAULT_ENV_OVERRIDES = {
     "GIT_TERMINAL_PROMPT": "0",
@@ -26,56 +31,196 @@ def _truncate(s: str, max_chars: int) -> tuple[str, bool]:
     return s[:max_chars] + "\n... [truncated]", True
 
 
+def command_kind(cmd: List[str]) -> str:
+    """
+    Short label for a command, e.g. "git status" for
+    ["git", "-c", "core.longpaths=true", "status", "--porcelain"].
+    """
+    if not cmd:
+        return ""
+    prog = os.path.basename(cmd[0])
+    i = 1
+    while i < len(cmd):
+        arg = cmd[i]
+        if arg in ("-c", "-C"):
+            i += 2
+            continue
+        if arg.startswith("-"):
+            i += 1
+            continue
+        return f"{prog} {arg}"
+    return prog
+
+
+def kill_process_tree(proc: subprocess.Popen) -> None:
+    """
+    Kill the child and everything it spawned (git-remote-https, pack-objects, ...).
+    Children are started in their own session/process group for this purpose.
+    The group is signalled even if the child itself has already exited: its
+    helpers can outlive it (and keep the group id) until they are killed.
+    """
+    try:
+        if os.name == "nt":
+            subprocess.run(
+                ["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        # ProcessLookupError: the whole group is already gone
+        pass
+    if proc.poll() is None:
+        try:
+            proc.kill()
+        except OSError:
+            pass
+
+
+def _error_result(cmd: List[str], cwd: Optional[str], error: str, stderr: str, elapsed: float = 0.0) -> CmdResult:
+    return CmdResult(
+        ok=False,
+        error=error,
+        cmd=" ".join(cmd),
+        cwd=cwd,
+        code=None,
+        elapsed_sec=elapsed,
+        stdout="",
+        stderr=stderr,
+        stdout_truncated=False,
+        stderr_truncated=False,
+    )
+
+
 def run_cmd_blocking(
     cmd: List[str],
     cwd: Optional[str],
     timeout_sec: int = 60,
     env_overrides: Optional[Dict[str, str]] = None,
     max_chars: int = 4000,
+    binary: bool = False,
+    input_bytes: Optional[bytes] = None,
+    timeout_key: Optional[str] = None,
 ) -> CmdResult:
+    """
+    Run a command to completion. With binary=True stdout is returned undecoded
+    as CmdResult.stdout_bytes (a memoryview capped at max_chars bytes).
+    input_bytes, if given, is written to the command's stdin.
+    Adaptive timeout history is kept per (timeout_key or cwd, command kind);
+    commands with neither (e.g. a clone without a URL key) are not adapted, so
+    unrelated runs never share one history.
+    """
     cmd = [_to_text(c) for c in cmd]
+    env = _build_env(env_overrides)
 
+    scope = timeout_key or cwd
+    key = (scope or "", command_kind(cmd))
+    effective_timeout = adaptive().timeout_for(key, timeout_sec) if scope else timeout_sec
+
+    with span("cmd", cmd=" ".join(cmd), cwd=cwd) as sp:
+        if effective_timeout != timeout_sec:
+            sp.set(adaptive_timeout_sec=round(effective_timeout, 3))
+        res = _run(cmd, cwd, effective_timeout, timeout_sec, env, max_chars, binary, input_bytes, sp)
+        sp.set(exit_code=res.code, elapsed_sec=res.elapsed_sec)
+        if res.ok and scope:
+            adaptive().record(key, res.elapsed_sec)
+        else:
+            sp.set(error=res.error or "exit_code")
+        return res
+
+
+def _build_env(env_overrides: Optional[Dict[str, str]]) -> Dict[str, str]:
     env = os.environ.copy()
     env.update(DEFAULT_ENV_OVERRIDES)
     if env_overrides:
         env.update(env_overrides)
+    return env
 
-    t0 = time.time()
+
+def _popen(cmd: List[str], cwd: Optional[str], env: Dict[str, str], token, stdin_pipe: bool = False) -> subprocess.Popen:
     proc = subprocess.Popen(
-        cmd,
+        supervisor().wrap(cmd),
         cwd=cwd,
-        stdin=subprocess.DEVNULL,
+        stdin=subprocess.PIPE if stdin_pipe else subprocess.DEVNULL,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         env=env,
         shell=False,
+        start_new_session=(os.name != "nt"),
+        creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0,
     )
+    if token is not None and not token.register(proc):
+        kill_process_tree(proc)
+    return proc
+
+
+def _spawn_and_wait(cmd: List[str], cwd: Optional[str], env: Dict[str, str], timeout_sec: float, token, t0: float, input_bytes: Optional[bytes] = None):
+    proc = _popen(cmd, cwd, env, token, stdin_pipe=input_bytes is not None)
 
     try:
-        out_b, err_b = proc.communicate(timeout=timeout_sec)
-        code = proc.returncode
-        elapsed = round(time.time() - t0, 3)
+        out_b, err_b = proc.communicate(input=input_bytes, timeout=max(timeout_sec, 0.001))
+        return out_b, err_b, proc.returncode, round(time.time() - t0, 3), False
     except subprocess.TimeoutExpired:
-        proc.kill()
+        kill_process_tree(proc)
         proc.communicate(timeout=1)
-        elapsed = round(time.time() - t0, 3)
-        return CmdResult(
-            ok=False,
-            error="timeout",
-            cmd=" ".join(cmd),
-            cwd=cwd,
-            code=None,
-            elapsed_sec=elapsed,
-            stdout="",
-            stderr=f"Command timed out after {timeout_sec}s",
-            stdout_truncated=False,
-            stderr_truncated=False,
-        )
-
-    out = _to_text(out_b).strip()
+        return b"", b"", None, round(time.time() - t0, 3), True
+    finally:
+        if token is not None:
+            token.unregister(proc)
+
+
+def _run(
+    cmd: List[str],
+    cwd: Optional[str],
+    timeout_sec: float,
+    requested_timeout_sec: float,
+    env: Dict[str, str],
+    max_chars: int,
+    binary: bool,
+    input_bytes: Optional[bytes],
+    sp,
+) -> CmdResult:
+    token = current_token()
+    if token is not None and token.cancelled:
+        return _error_result(cmd, cwd, "cancelled", "Command cancelled before it started")
+
+    t0 = time.time()
+    should_stop = (lambda: token.cancelled) if token is not None else (lambda: False)
+    with supervisor().slot(command_kind(cmd), timeout_sec, should_stop) as acquired:
+        waited = time.time() - t0
+        sp.set(queue_wait_sec=round(waited, 3))
+        if not acquired:
+            if token is not None and token.cancelled:
+                return _error_result(cmd, cwd, "cancelled", "Command cancelled while waiting for a process slot")
+            return _error_result(
+                cmd, cwd, "timeout",
+                f"Command timed out after {timeout_sec}s waiting for a free process slot (server is busy)",
+                round(waited, 3),
+            )
+        out_b, err_b, code, elapsed, timed_out = _spawn_and_wait(cmd, cwd, env, timeout_sec - waited, token, t0, input_bytes)
+
+    if timed_out:
+        msg = f"Command timed out after {timeout_sec}s"
+        if timeout_sec != requested_timeout_sec:
+            msg += f" (adaptive limit from recent runs; requested {requested_timeout_sec}s)"
+        return _error_result(cmd, cwd, "timeout", msg, elapsed)
+
+    if token is not None and token.cancelled:
+        return _error_result(cmd, cwd, "cancelled", "Command cancelled by the client", elapsed)
+
+    sp.set(stdout_bytes=len(out_b or b""), stderr_bytes=len(err_b or b""))
     err = _to_text(err_b).strip()
-    out, out_tr = _truncate(out, max_chars)
     err, err_tr = _truncate(err, max_chars)
+    raw = None
+    if binary:
+        # slicing a memoryview does not copy the underlying buffer
+        raw = memoryview(out_b or b"")
+        out, out_tr = "", len(raw) > max_chars
+        raw = raw[:max_chars]
+    else:
+        out = _to_text(out_b).strip()
+        out, out_tr = _truncate(out, max_chars)
 
     return CmdResult(
         ok=(code == 0),
@@ -87,4 +232,123 @@ def run_cmd_blocking(
         stderr=err,
         stdout_truncated=out_tr,
         stderr_truncated=err_tr,
+        stdout_bytes=raw,
     )
+
+
+class CmdStream:
+    """
+    Handle for a command whose stdout is consumed incrementally (see stream_cmd).
+    `result` is filled in when the `with` block exits; stdout is not buffered there.
+    """
+
+    def __init__(self, proc: Optional[subprocess.Popen] = None):
+        self.proc = proc
+        self.result: Optional[CmdResult] = None
+        self.stopped_early = False
+        self.eof = proc is None
+
+    def lines(self) -> Iterator[bytes]:
+        if self.proc is None:
+            return
+        for line in self.proc.stdout:
+            yield line
+        self.eof = True
+
+    def chunks(self, size: int = 65536) -> Iterator[bytes]:
+        """Raw stdout in chunks of up to `size` bytes, for output that is not line-oriented."""
+        if self.proc is None:
+            return
+        while True:
+            chunk = self.proc.stdout.read1(size)
+            if not chunk:
+                break
+            yield chunk
+        self.eof = True
+
+
+@contextmanager
+def stream_cmd(
+    cmd: List[str],
+    cwd: Optional[str],
+    timeout_sec: int = 60,
+    env_overrides: Optional[Dict[str, str]] = None,
+    max_chars: int = 4000,
+) -> Iterator[CmdStream]:
+    """
+    Run a command and stream its stdout line by line. Leaving the `with` block
+    before EOF kills the process group (stream.stopped_early is set), so callers
+    can stop as soon as they have enough output. Same supervisor slot, timeout,
+    cancellation and tracing behaviour as run_cmd_blocking.
+    """
+    cmd = [_to_text(c) for c in cmd]
+    env = _build_env(env_overrides)
+    token = current_token()
+    should_stop = (lambda: token.cancelled) if token is not None else (lambda: False)
+
+    with span("cmd", cmd=" ".join(cmd), cwd=cwd, streaming=True) as sp:
+        if token is not None and token.cancelled:
+            stream = CmdStream()
+            stream.result = _error_result(cmd, cwd, "cancelled", "Command cancelled before it started")
+            yield stream
+            return
+
+        t0 = time.time()
+        with supervisor().slot(command_kind(cmd), timeout_sec, should_stop) as acquired:
+            if not acquired:
+                stream = CmdStream()
+                stream.result = _error_result(
+                    cmd, cwd, "cancelled" if should_stop() else "timeout",
+                    f"Command timed out after {timeout_sec}s waiting for a free process slot (server is busy)",
+                    round(time.time() - t0, 3),
+                )
+                yield stream
+                return
+
+            proc = _popen(cmd, cwd, env, token)
+            stream = CmdStream(proc)
+            err_chunks: List[bytes] = []
+            drain = threading.Thread(target=lambda: err_chunks.append(proc.stderr.read()), daemon=True)
+            drain.start()
+            timed_out = threading.Event()
+
+            def _on_timeout():
+                timed_out.set()
+                kill_process_tree(proc)
+
+            timer = threading.Timer(max(timeout_sec - (time.time() - t0), 0.001), _on_timeout)
+            timer.daemon = True
+            timer.start()
+            try:
+                yield stream
+            finally:
+                if not stream.eof and proc.poll() is None and not timed_out.is_set():
+                    stream.stopped_early = True
+                    kill_process_tree(proc)
+                proc.stdout.close()
+                proc.wait()
+                timer.cancel()
+                drain.join(timeout=1)
+                if token is not None:
+                    token.unregister(proc)
+
+        elapsed = round(time.time() - t0, 3)
+        err, err_tr = _truncate(_to_text(b"".join(c for c in err_chunks if c)).strip(), max_chars)
+        if timed_out.is_set():
+            stream.result = _error_result(cmd, cwd, "timeout", f"Command timed out after {timeout_sec}s", elapsed)
+        elif token is not None and token.cancelled:
+            stream.result = _error_result(cmd, cwd, "cancelled", "Command cancelled by the client", elapsed)
+        else:
+            code = proc.returncode
+            stream.result = CmdResult(
+                ok=(code == 0) or stream.stopped_early,
+                cmd=" ".join(cmd),
+                cwd=cwd,
+                code=code,
+                elapsed_sec=elapsed,
+                stdout="",
+                stderr=err,
+                stdout_truncated=stream.stopped_early,
+                stderr_truncated=err_tr,
+            )
+        sp.set(exit_code=stream.result.code, elapsed_sec=elapsed, stopped_early=stream.stopped_early)
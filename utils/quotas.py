@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict
+
+
+class ClientQuotas:
+    """
+    Per-client cap on concurrently running tool calls, so one busy agent
+    cannot take every process slot of a shared server. 0 means unlimited.
+    """
+
+    def __init__(self, max_concurrent: int = 0):
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}
+
+    def try_acquire(self, client: str) -> bool:
+        with self._lock:
+            n = self._active.get(client, 0)
+            if self.max_concurrent > 0 and n >= self.max_concurrent:
+                return False
+            self._active[client] = n + 1
+            return True
+
+    def release(self, client: str) -> None:
+        with self._lock:
+            n = self._active.get(client, 0) - 1
+            if n > 0:
+                self._active[client] = n
+            else:
+                self._active.pop(client, None)
+
+    def active(self, client: str) -> int:
+        with self._lock:
+            return self._active.get(client, 0)
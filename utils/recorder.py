@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+
+def _jsonable(value: Any) -> Any:
+    """Pydantic arguments (e.g. list[BranchPair]) as plain JSON, so replay can validate them again."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+class CallRecorder:
+    """
+    Append one JSON object per MCP tool call (tool name, arguments, start time,
+    duration, outcome) to a local file, for replay with benchmarks/replay.py.
+    Arguments are recorded verbatim, so the log can contain commit messages,
+    email bodies and paths.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, tool: str, args: Dict[str, Any], started_at: float, elapsed_sec: float, result: Any) -> None:
+        ok = result.get("ok") if isinstance(result, dict) else None
+        err = result.get("error") if isinstance(result, dict) else None
+        line = json.dumps({
+            "ts": round(started_at, 6),
+            "tool": tool,
+            "args": _jsonable(args),
+            "elapsed_sec": round(elapsed_sec, 6),
+            "ok": ok,
+            "error_code": err.get("code") if isinstance(err, dict) else None,
+        }, default=str) + "\n"
+        try:
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError:
+            # Recording must never break a tool call.
+            pass
+
+
+_recorder: Optional[CallRecorder] = None
+
+
+def configure(path: str = "") -> None:
+    global _recorder
+    _recorder = CallRecorder(path) if path else None
+
+
+def configure_from_settings(settings) -> None:
+    configure(settings.CALL_RECORD_FILE)
+
+
+def recorder() -> Optional[CallRecorder]:
+    return _recorder
+
+
+def recorded(fn: Callable) -> Callable:
+    """Record calls of an async tool function while a recorder is configured."""
+    sig = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        rec = _recorder
+        if rec is None:
+            return await fn(*args, **kwargs)
+        started_at, t0 = time.time(), time.perf_counter()
+        result: Any = None
+        try:
+            result = await fn(*args, **kwargs)
+            return result
+        finally:
+            try:
+                bound = dict(sig.bind_partial(*args, **kwargs).arguments)
+            except TypeError:
+                bound = dict(kwargs)
+            rec.record(fn.__name__, bound, started_at, time.perf_counter() - t0, result)
+    return wrapper
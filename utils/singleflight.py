@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from utils.cancel import current_token
+from utils.tracing import current_span
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.exc: BaseException | None = None
+        self.cancelled = False
+
+
+class SingleFlight:
+    """
+    Deduplicates identical calls that are in flight at the same time: the first
+    caller (leader) runs the function, concurrent callers with the same key wait
+    for it and share its result. Nothing is cached after the call returns.
+
+    If the leader's request is cancelled, its "cancelled" result is not handed
+    to the others; they run the call again themselves.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable, *args: Any, **kwargs: Any) -> Tuple[Any, bool]:
+        """Returns (result, shared) where shared is True if another caller's run was reused."""
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    leader = True
+                else:
+                    leader = False
+
+            if leader:
+                return self._lead(key, call, fn, args, kwargs), False
+
+            token = current_token()
+            while not call.done.wait(0.05):
+                if token is not None and token.cancelled:
+                    # stop waiting; our own run fails fast on the cancelled token
+                    return fn(*args, **kwargs), False
+            if call.cancelled:
+                continue
+            with self._lock:
+                self.shared += 1
+            if call.exc is not None:
+                raise call.exc
+            return call.result, True
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable, args, kwargs) -> Any:
+        token = current_token()
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.exc = e
+            raise
+        finally:
+            call.cancelled = token is not None and token.cancelled
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+_flights = SingleFlight()
+
+
+def single_flight(fn: Callable) -> Callable:
+    """
+    Coalesce concurrent identical calls of a read-only method. The key is the
+    method name plus the repr of its arguments (excluding self).
+    """
+    @functools.wraps(fn)
+    def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        key = (fn.__qualname__, repr(args), repr(sorted(kwargs.items())))
+        result, shared = _flights.do(key, fn, self, *args, **kwargs)
+        sp = current_span()
+        if shared and sp is not None:
+            sp.set(coalesced=True)
+        return result
+    return wrapper
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROJECT_PACKAGES = ("main", "settings", "models", "services", "utils")
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """
+    Parse `python -X importtime` lines:
+        import time: self [us] | cumulative | imported package
+        import time:       189 |      72705 |     mcp.server.lowlevel
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cum_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append({"module": name.strip(), "self_us": self_us, "cumulative_us": cum_us, "depth": depth})
+    return rows
+
+
+def is_project_module(name: str) -> bool:
+    return name.split(".", 1)[0] in PROJECT_PACKAGES
+
+
+def measure_import(module: str = "main", cwd: str = PROJECT_ROOT) -> Dict[str, Any]:
+    """Import `module` in a fresh interpreter and return wall time plus per-module import rows."""
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+    return {"ok": proc.returncode == 0, "wall_ms": round(wall_ms, 1), "rows": parse_importtime(proc.stderr), "stderr": proc.stderr}
+
+
+def direct_imports(rows: List[Dict[str, Any]], module: str) -> List[Dict[str, Any]]:
+    """
+    Rows imported directly by top-level `module`. importtime prints children
+    before their parent, so they are the depth-1 rows just above its own row.
+    """
+    idx = next((i for i, r in enumerate(rows) if r["module"] == module and r["depth"] == 0), None)
+    if idx is None:
+        return []
+    out = []
+    for r in reversed(rows[:idx]):
+        if r["depth"] == 0:
+            break
+        if r["depth"] == 1:
+            out.append(r)
+    return out
+
+
+def startup_report(top: int = 20) -> Dict[str, Any]:
+    m = measure_import("main")
+    rows = m["rows"]
+    direct = sorted(direct_imports(rows, "main"), key=lambda r: -r["cumulative_us"])
+    heaviest = sorted(rows, key=lambda r: -r["self_us"])[:top]
+    return {
+        "ok": m["ok"],
+        "interpreter_wall_ms": m["wall_ms"],
+        "import_main_ms": round(next((r["cumulative_us"] for r in rows if r["module"] == "main"), 0) / 1000, 1),
+        "project_self_ms": round(sum(r["self_us"] for r in rows if is_project_module(r["module"])) / 1000, 1),
+        "direct_imports_ms": {r["module"]: round(r["cumulative_us"] / 1000, 1) for r in direct[:top]},
+        "heaviest_modules_self_ms": {r["module"]: round(r["self_us"] / 1000, 1) for r in heaviest},
+        "modules_imported": len(rows),
+    }
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import os
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+def parse_kind_limits(raw: str) -> Dict[str, int]:
+    """
+    Parse "git clone=4,git push=4" into {"git clone": 4, "git push": 4}.
+    Malformed entries are ignored.
+    """
+    limits: Dict[str, int] = {}
+    for part in (raw or "").split(","):
+        name, sep, value = part.partition("=")
+        if not sep:
+            continue
+        try:
+            n = int(value.strip())
+        except ValueError:
+            continue
+        if name.strip() and n > 0:
+            limits[name.strip()] = n
+    return limits
+
+
+class ProcessSupervisor:
+    """
+    Gate for every spawned command: a global concurrency limit, optional
+    per-command-kind limits ("git clone", "git push", ...), and optional
+    resource caps applied to each child (rlimits on POSIX, cgroup v2 membership).
+    A limit of 0 means unlimited.
+    """
+
+    def __init__(
+        self,
+        max_procs: int = 0,
+        kind_limits: Optional[Dict[str, int]] = None,
+        mem_limit_mb: int = 0,
+        cpu_limit_sec: int = 0,
+        cgroup_path: str = "",
+    ):
+        self.max_procs = max_procs
+        self.kind_limits = dict(kind_limits or {})
+        self.mem_limit_mb = mem_limit_mb
+        self.cpu_limit_sec = cpu_limit_sec
+        self.cgroup_path = cgroup_path
+        self._global = threading.BoundedSemaphore(max_procs) if max_procs > 0 else None
+        self._kinds = {k: threading.BoundedSemaphore(n) for k, n in self.kind_limits.items()}
+        self._lock = threading.Lock()
+        self._running = 0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @staticmethod
+    def _acquire(sem: threading.BoundedSemaphore, deadline: float, should_stop: Callable[[], bool]) -> bool:
+        # poll in short slices so a cancelled request stops waiting promptly
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or should_stop():
+                return False
+            if sem.acquire(timeout=min(remaining, 0.1)):
+                return True
+
+    @contextmanager
+    def slot(self, kind: str, timeout_sec: float, should_stop: Callable[[], bool] = lambda: False) -> Iterator[bool]:
+        """
+        Reserve a process slot for `kind`, waiting at most `timeout_sec`.
+        Yields False if no slot could be acquired in time.
+        """
+        deadline = time.monotonic() + timeout_sec
+        held = []
+        try:
+            # per-kind first, so a queue of clones does not sit on global slots
+            for sem in (self._kinds.get(kind), self._global):
+                if sem is None:
+                    continue
+                if not self._acquire(sem, deadline, should_stop):
+                    yield False
+                    return
+                held.append(sem)
+            with self._lock:
+                self._running += 1
+            try:
+                yield True
+            finally:
+                with self._lock:
+                    self._running -= 1
+        finally:
+            for sem in reversed(held):
+                sem.release()
+
+    def wrap(self, cmd: List[str]) -> List[str]:
+        """
+        Return `cmd` prefixed with a tiny /bin/sh stub that applies the rlimits
+        and joins the cgroup before exec'ing the real command, so the caps hold
+        from the first instruction (prlimit() after Popen left a window, and
+        preexec_fn is not safe with the worker threads commands run from).
+        The shell execs in place: same pid, same process group. Helpers forked
+        later by git inherit both. Failing to apply a cap (e.g. a cgroup that is
+        not writable) does not stop the command. No-op when nothing is capped
+        or on Windows.
+        """
+        if os.name == "nt":
+            return cmd
+        steps = []
+        if self.mem_limit_mb > 0:
+            steps.append(f"ulimit -v {self.mem_limit_mb * 1024}")  # KiB, i.e. RLIMIT_AS
+        if self.cpu_limit_sec > 0:
+            steps.append(f"ulimit -t {self.cpu_limit_sec}")
+        if self.cgroup_path:
+            steps.append("echo $$ > " + shlex.quote(os.path.join(self.cgroup_path, "cgroup.procs")))
+        if not steps:
+            return cmd
+        script = "".join(f"{step} 2>/dev/null; " for step in steps) + 'exec "$@"'
+        return ["/bin/sh", "-c", script, "sh", *cmd]
+
+_supervisor = ProcessSupervisor()
+
+
+def configure(supervisor: ProcessSupervisor) -> None:
+    global _supervisor
+    _supervisor = supervisor
+
+
+def configure_from_settings(settings) -> None:
+    configure(ProcessSupervisor(
+        max_procs=settings.MAX_PROCS,
+        kind_limits=parse_kind_limits(settings.PROC_KIND_LIMITS),
+        mem_limit_mb=settings.PROC_MEM_LIMIT_MB,
+        cpu_limit_sec=settings.PROC_CPU_LIMIT_SEC,
+        cgroup_path=settings.PROC_CGROUP,
+    ))
+
+
+def supervisor() -> ProcessSupervisor:
+    return _supervisor
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import deque
+from typing import Deque, Dict, Tuple
+from urllib.parse import urlsplit
+
+Key = Tuple[str, str]  # (repo / cwd or remote URL, command kind such as "git status")
+
+_SCP_LIKE = re.compile(r"^(?:[^@/]+@)?([^:/]+):(?!//)(.*)$")
+
+
+def normalize_remote_url(url: str) -> str:
+    """
+    Reduce a remote URL to "host/path" so spellings of the same repository share
+    one timeout history: scheme, credentials, port-less scp syntax
+    (git@host:org/repo), case of the host, trailing "/" and ".git" are dropped.
+    Local paths are returned with only the trailing "/" and ".git" stripped.
+    """
+    url = (url or "").strip()
+    parts = urlsplit(url)
+    if parts.scheme and parts.netloc:
+        host, path = (parts.hostname or "").lower(), parts.path
+        if parts.port:
+            host = f"{host}:{parts.port}"
+    else:
+        m = _SCP_LIKE.match(url) if "://" not in url else None
+        # "C:/x" is a Windows drive, not host "C"
+        if m and len(m.group(1)) > 1 and not url.startswith(("/", ".")):
+            host, path = m.group(1).lower(), m.group(2)
+        else:
+            host, path = "", url
+    path = path.rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    return f"{host}/{path.lstrip('/')}" if host else path
+
+
+class AdaptiveTimeouts:
+    """
+    Derive a per-(repo, command) timeout from recent successful durations:
+    p95 * factor, never below `min_sec` and never above the caller's timeout_sec.
+    Until `min_samples` runs are known, the requested timeout is used as is.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        factor: float = 3.0,
+        min_sec: float = 5.0,
+        window: int = 50,
+        min_samples: int = 5,
+    ):
+        self.enabled = enabled
+        self.factor = factor
+        self.min_sec = min_sec
+        self.window = window
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+        self._history: Dict[Key, Deque[float]] = {}
+
+    def record(self, key: Key, elapsed_sec: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._history.get(key)
+            if hist is None:
+                hist = self._history[key] = deque(maxlen=self.window)
+            hist.append(elapsed_sec)
+
+    def timeout_for(self, key: Key, requested_sec: float) -> float:
+        if not self.enabled:
+            return requested_sec
+        with self._lock:
+            samples = sorted(self._history.get(key, ()))
+        if len(samples) < self.min_samples:
+            return requested_sec
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return min(requested_sec, max(self.min_sec, p95 * self.factor))
+
+
+_adaptive = AdaptiveTimeouts()
+
+
+def configure(enabled: bool, factor: float = 3.0, min_sec: float = 5.0) -> None:
+    global _adaptive
+    _adaptive = AdaptiveTimeouts(enabled=enabled, factor=factor, min_sec=min_sec)
+
+
+def configure_from_settings(settings) -> None:
+    configure(settings.ADAPTIVE_TIMEOUTS, settings.ADAPTIVE_TIMEOUT_FACTOR, settings.ADAPTIVE_TIMEOUT_MIN_SEC)
+
+
+def adaptive() -> AdaptiveTimeouts:
+    return _adaptive
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+@dataclass
+class Span:
+    """
+    A single timed operation inside a trace (tool -> service -> subprocess).
+    Spans of one trace are buffered on the root span and exported together
+    when the root finishes, so sampling can also look at the whole trace.
+    """
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    root: Optional["Span"] = field(default=None, repr=False)
+    finished: List["Span"] = field(default_factory=list, repr=False)
+
+    def set(self, **attrs: Any) -> None:
+        self.attributes.update(attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class JsonlExporter:
+    """Append one JSON object per span to a local file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+
+class OtlpHttpExporter:
+    """
+    POST traces as OTLP/JSON to a collector (or any stand-in that accepts
+    the /v1/traces payload shape).
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "git-mcp-server", timeout_sec: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout_sec = timeout_sec
+
+    def _otlp_span(self, s: Span) -> Dict[str, Any]:
+        return {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "parentSpanId": s.parent_id or "",
+            "name": s.name,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "status": {"code": 2 if s.status == "error" else 1},
+            "attributes": [
+                {"key": k, "value": {"stringValue": str(v)}} for k, v in s.attributes.items()
+            ],
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "git-mcp-server"}, "spans": [self._otlp_span(s) for s in spans]}],
+            }]
+        }
+        req = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout_sec):
+            pass
+
+
+class Tracer:
+    """
+    Sampling plus export. Finished traces are handed to a bounded queue and
+    exported in batches by a background thread, so a slow collector never
+    blocks the event loop (root tool spans finish on it). When the queue is
+    full, traces are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, exporter=None, sample_rate: float = 1.0, slow_ms: int = 0, queue_size: int = 1024, batch_size: int = 512):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[List[Span]]]" = queue.Queue(maxsize=queue_size)
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def should_export(self, root: Span, sampled: bool) -> bool:
+        # Head sampling decides up front; slow or failed traces are always kept.
+        if sampled:
+            return True
+        if root.status == "error":
+            return True
+        duration_ms = (root.end_ns - root.start_ns) / 1e6
+        return bool(self.slow_ms) and duration_ms >= self.slow_ms
+
+    def flush(self, root: Span, sampled: bool) -> None:
+        if not self.should_export(root, sampled):
+            return
+        try:
+            self._queue.put_nowait(sorted(root.finished, key=lambda s: s.start_ns))
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self._worker is None:
+            with self._worker_lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._export_loop, name="trace-export", daemon=True)
+                    self._worker.start()
+
+    def _export_loop(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = list(item)
+            # coalesce whatever else is queued into one export call
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.extend(item)
+            try:
+                self.exporter.export(batch)
+            except Exception:
+                # Tracing must never break a tool call.
+                pass
+
+    def close(self, timeout_sec: float = 5.0) -> None:
+        """Export what is still queued (waiting at most `timeout_sec`) and stop the worker."""
+        worker = self._worker
+        if worker is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout_sec)
+        except queue.Full:
+            return
+        worker.join(timeout_sec)
+
+
+_tracer = Tracer()
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_sampled: contextvars.ContextVar[bool] = contextvars.ContextVar("trace_sampled", default=False)
+
+
+def configure(exporter=None, sample_rate: float = 1.0, slow_ms: int = 0) -> None:
+    global _tracer
+    previous, _tracer = _tracer, Tracer(exporter=exporter, sample_rate=sample_rate, slow_ms=slow_ms)
+    previous.close()
+
+
+# export traces still queued when the server exits
+atexit.register(lambda: _tracer.close(timeout_sec=2.0))
+
+
+def configure_from_settings(settings) -> None:
+    kind = (settings.TRACE_EXPORTER or "").lower()
+    if kind == "jsonl":
+        exporter = JsonlExporter(settings.TRACE_FILE)
+    elif kind == "otlp":
+        exporter = OtlpHttpExporter(settings.TRACE_OTLP_ENDPOINT)
+    else:
+        exporter = None
+    configure(exporter, settings.TRACE_SAMPLE_RATE, settings.TRACE_SLOW_MS)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Any]:
+    """
+    Open a span nested under the current one (contextvars propagate through
+    asyncio.to_thread, so worker threads join the caller's trace).
+    """
+    tracer = _tracer
+    if not tracer.enabled:
+        yield _NOOP
+        return
+
+    parent = _current.get()
+    if parent is None:
+        trace_id = os.urandom(16).hex()
+        sampled = random.random() < tracer.sample_rate
+    else:
+        trace_id = parent.trace_id
+        sampled = _sampled.get()
+
+    s = Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=dict(attrs),
+    )
+    s.root = parent.root if parent else s
+
+    tok_span = _current.set(s)
+    tok_sampled = _sampled.set(sampled)
+    try:
+        yield s
+    except BaseException as e:
+        s.status = "error"
+        s.set(exception=type(e).__name__)
+        raise
+    finally:
+        _current.reset(tok_span)
+        _sampled.reset(tok_sampled)
+        s.end_ns = time.time_ns()
+        s.root.finished.append(s)
+        if parent is None:
+            tracer.flush(s, sampled)
+
+
+@contextmanager
+def detached_span(name: str, **attrs: Any) -> Iterator[Any]:
+    """
+    Open a span that starts a new trace instead of joining the current one,
+    for work that outlives the call that started it (background jobs). A
+    child of the caller's span would land in a root buffer that has already
+    been flushed, so it would never be exported. The caller's span is
+    recorded as link_trace_id / link_span_id.
+    """
+    caller = _current.get()
+    if caller is not None:
+        attrs = {**attrs, "link_trace_id": caller.trace_id, "link_span_id": caller.span_id}
+    tok = _current.set(None)
+    try:
+        with span(name, **attrs) as s:
+            yield s
+    finally:
+        _current.reset(tok)
+
+
+def mark_result(s: Any, result: Any) -> None:
+    """Flag the span as failed when a ToolResult (object or dict) says ok=false."""
+    if not isinstance(s, Span):
+        return
+    ok = result.get("ok") if isinstance(result, dict) else getattr(result, "ok", None)
+    if ok is False:
+        s.status = "error"
+        err = result.get("error") if isinstance(result, dict) else getattr(result, "error", None)
+        code = err.get("code") if isinstance(err, dict) else getattr(err, "code", None)
+        if code:
+            s.set(error_code=code)
+
+
+def traced(name: str, *arg_names: str) -> Callable:
+    """
+    Decorator wrapping a sync or async function in a span. Named arguments
+    (e.g. "repo_dir") are copied into the span attributes when present.
+    """
+    def decorator(fn: Callable) -> Callable:
+        sig = inspect.signature(fn)
+
+        def _attrs(args, kwargs) -> Dict[str, Any]:
+            if not arg_names:
+                return {}
+            try:
+                bound = sig.bind_partial(*args, **kwargs).arguments
+            except TypeError:
+                return {}
+            return {n: bound[n] for n in arg_names if n in bound}
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **_attrs(args, kwargs)) as s:
+                    result = await fn(*args, **kwargs)
+                    mark_result(s, result)
+                    return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, **_attrs(args, kwargs)) as s:
+                result = fn(*args, **kwargs)
+                mark_result(s, result)
+                return result
+        return wrapper
+
+    return decorator